@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+限流
+令牌桶用于限制发往腾讯接口的请求速率，以及按客户端限制API请求速率。
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class TokenBucket:
+    """令牌桶：每秒补充rate个令牌，最多积攒burst个"""
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = float(burst or rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, max_wait=0.0):
+        """预定一个令牌，返回 (是否成功, 秒数)
+
+        成功时秒数为拿到令牌前需要等待的时间；等待时间超过max_wait时不预定，
+        秒数为建议的重试间隔
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            wait = (1 - self._tokens) / self.rate if self._tokens < 1 else 0.0
+            if wait > max_wait:
+                return False, wait
+            self._tokens -= 1
+            return True, wait
+
+    def acquire(self, max_wait=0.0):
+        """取一个令牌，最多等待max_wait秒，返回 (是否成功, 秒数)"""
+        ok, wait = self.reserve(max_wait)
+        if ok and wait > 0:
+            time.sleep(wait)
+        return ok, wait
+
+
+class ClientLimiter:
+    """按客户端（IP）分别限速，只保留最近活跃的max_clients个客户端的令牌桶"""
+
+    def __init__(self, rate, burst=None, max_clients=4096):
+        self.rate = rate
+        self.burst = burst or rate
+        self.max_clients = max_clients
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def check(self, client):
+        """允许时返回0，超限时返回建议的重试间隔（秒）"""
+        with self._lock:
+            bucket = self._buckets.get(client)
+            if bucket is None:
+                bucket = TokenBucket(self.rate, self.burst)
+                self._buckets[client] = bucket
+            self._buckets.move_to_end(client)
+            while len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        ok, wait = bucket.reserve()
+        return 0 if ok else wait
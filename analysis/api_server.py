@@ -5,144 +5,1171 @@
 """
 
 from http.server import HTTPServer, SimpleHTTPRequestHandler
+from concurrent.futures import ThreadPoolExecutor
+import argparse
 import json
+import math
+import os
+import posixpath
+import re
+import signal
+import threading
+import time
 import urllib.parse
-import urllib.request
-from datetime import datetime, timedelta
 import ssl
+from datetime import datetime
+
+import eastmoney_client
+import market_data
+import metrics
+import symbol_master
+import tencent_client
+from admission import ClientLimiter
+from bar_store import DEFAULT_PATH as DEFAULT_BAR_STORE, BarStore
+from stock_lists import HOT_STOCKS, get_extended_stock_list
+from http_payload import EncodedPayload
+from indicators import IndicatorEngine, parse_indicator_set
+from quote_stream import QuoteStreamHub
+from sector_index import DEFAULT_SOURCE as DEFAULT_SECTOR_SOURCE, MAX_K as MAX_SECTOR_K, SectorIndex
+from sector_live import MAX_LEADERS, LiveSectors
+from static_files import StaticFileStore
+from symbol_master import resolve_symbol
+from kline_compare import DEFAULT_WINDOW as DEFAULT_COMPARE_WINDOW, MAX_WINDOW as MAX_COMPARE_WINDOW, \
+    MIN_WINDOW as MIN_COMPARE_WINDOW, compare
+from kline_resample import SAMPLING_METHODS, downsample, parse_period, period_name, resample
+from kline_format import (BINARY_CONTENT_TYPE, FORMATS, bars_after_cursor, bars_since, make_cursor,
+                          to_binary, to_columnar)
+from server_cache import DEFAULT_CACHE_DIR, CacheSnapshot, SharedFileCache, TTLCache
 
 # 忽略SSL证书验证
 ssl._create_default_https_context = ssl._create_unverified_context
 
+MAX_BATCH_CODES = 200   # /api/batch 单次最多查询的股票数
+MAX_STREAM_CODES = 200  # /api/stream 单个连接最多订阅的股票数
+MAX_SEARCH_RESULTS = 50  # /api/search 单次最多返回的结果数
+MAX_COMPARE_CODES = 10   # /api/compare 单次最多对比的股票数
+MAX_POINTS_LIMIT = 5000  # /api/kline max_points 的上限
+MAX_INDICATOR_COUNT = 5000  # /api/indicators count 的上限
+STATIC_CACHE_CONTROL = 'public, max-age=60'
+QUEUE_FULL_RETRY_AFTER = 1  # 排队已满时建议客户端重试的间隔（秒）
+
+def fetch_quotes(symbols):
+    """批量获取实时行情，腾讯接口一次可查询多只股票；每条行情的source为实际提供数据的数据源"""
+    quotes, source = market_data.fetch('fetch_quotes', symbols)
+    for quote in quotes.values():
+        quote['source'] = source
+    return quotes
+
+def fetch_quote(symbol, code):
+    """获取股票实时信息（名称、价格、涨跌幅）"""
+    quotes = fetch_quotes([symbol])
+    if symbol not in quotes:
+        raise Exception(f"股票 {code} 不存在或已退市")
+    return quotes[symbol]
+
+def fetch_history(symbol, code):
+    """获取日K线数据 - 腾讯日K线接口，不可用时改用备用数据源，返回 (K线, 数据源)"""
+    day_data, source = market_data.fetch('fetch_kline', symbol, 320)
+    
+    # 解析K线数据
+    kline_data = []
+    with metrics.STAGE_LATENCY.time(stage='kline_parse'):
+        for item in day_data:
+            if len(item) >= 5:
+                # 腾讯API格式: [日期, 开盘, 收盘, 最高, 最低, 成交量]
+                kline_data.append({
+                    'date': item[0],
+                    'open': float(item[1]),
+                    'close': float(item[2]),
+                    'high': float(item[3]),
+                    'low': float(item[4]),
+                    'volume': float(item[5]) if len(item) > 5 else 0,
+                    'amount': 0
+                })
+    
+    if not kline_data:
+        raise Exception(f"获取 {code} K线数据失败")
+    
+    return kline_data, source
+
+def build_kline_response(code, market, quote, kline_data, period='day', kline_source='cache'):
+    return {
+        'code': code,
+        'name': quote['name'],
+        'market': market,
+        'price': quote['price'],
+        'change': quote['change'],
+        'period': period,
+        'source': {'quote': quote.get('source', 'cache'), 'kline': kline_source},
+        'cursor': make_cursor(kline_data),
+        'kline': kline_data
+    }
+
+def resample_history(kline_data, period):
+    """由日K线合成其他周期"""
+    if period[0] == 'day':
+        return kline_data
+    with metrics.STAGE_LATENCY.time(stage='resample'):
+        return resample(kline_data, period)
+
+def encode_kline_payload(data, fmt='rows'):
+    """按指定传输格式编码K线响应"""
+    with metrics.STAGE_LATENCY.time(stage=f'serialize_{fmt}'):
+        return _encode_kline_payload(data, fmt)
+
+def _encode_kline_payload(data, fmt):
+    if fmt == 'columnar':
+        return EncodedPayload.from_json(dict(data, format='columnar', kline=to_columnar(data['kline'])))
+    if fmt == 'binary':
+        meta = {key: value for key, value in data.items() if key != 'kline'}
+        return EncodedPayload(to_binary(meta, data['kline']), BINARY_CONTENT_TYPE)
+    return EncodedPayload.from_json(data)
+
 class StockAPIHandler(SimpleHTTPRequestHandler):
+    # API路由: 路径 -> 处理方法名
+    API_ROUTES = {
+        '/api/kline': 'handle_kline_api',
+        '/api/batch': 'handle_batch_api',
+        '/api/indicators': 'handle_indicators_api',
+        '/api/stream': 'handle_stream_api',
+        '/api/search': 'handle_search_api',
+        '/api/compare': 'handle_compare_api',
+        '/api/sectors/top': 'handle_sectors_top',
+        '/api/sectors/history': 'handle_sectors_history',
+        '/api/sectors/leaderboard': 'handle_sectors_leaderboard',
+        '/api/sectors/summary': 'handle_sectors_summary',
+        '/api/sectors/live': 'handle_sectors_live',
+        '/metrics': 'handle_metrics',
+    }
+    
     def do_GET(self):
         parsed_path = urllib.parse.urlparse(self.path)
+        handler_name = self.API_ROUTES.get(parsed_path.path)
+        self.route = parsed_path.path if handler_name else 'static'
+        self.status_code = 0
         
-        # API路由
-        if parsed_path.path == '/api/kline':
-            self.handle_kline_api(parsed_path.query)
-        else:
-            # 静态文件服务
-            super().do_GET()
+        started = time.perf_counter()
+        with metrics.API_IN_FLIGHT.track(route=self.route):
+            try:
+                if handler_name:
+                    if self.admit():
+                        getattr(self, handler_name)(parsed_path.query)
+                else:
+                    # 静态文件服务
+                    self.serve_static(parsed_path.path)
+            finally:
+                metrics.API_LATENCY.observe(time.perf_counter() - started, route=self.route)
+                metrics.API_REQUESTS.inc(route=self.route, status=self.status_code)
+    
+    def admit(self):
+        """按客户端IP限速，超限时直接返回429"""
+        limiter = self.server.client_limiter
+        if limiter is None or self.route == '/metrics':
+            return True
+        retry_after = limiter.check(self.client_address[0])
+        if not retry_after:
+            return True
+        metrics.API_REJECTED.inc(reason='client_limit')
+        self.send_json_response({'error': '请求过于频繁，请稍后重试'}, 429, retry_after)
+        return False
+    
+    def send_response(self, code, message=None):
+        self.status_code = code
+        super().send_response(code, message)
+    
+    def handle_metrics(self, query_string):
+        """Prometheus文本格式的运行指标"""
+        server = self.server
+        for name in ('quote', 'history', 'response'):
+            metrics.CACHE_ENTRIES.set(len(getattr(server, f'{name}_cache')), cache=name)
+        body = metrics.REGISTRY.render().encode('utf-8')
+        self.send_payload(EncodedPayload(body, metrics.CONTENT_TYPE), cache_control='no-store')
+    
+    def serve_static(self, url_path):
+        """预加载的文件直接从内存返回；data/ 下的其他文件是服务器状态，不对外提供；其余文件交给父类从磁盘读取"""
+        payload = self.server.static_store.get(url_path)
+        if payload is not None:
+            self.send_payload(payload, cache_control=STATIC_CACHE_CONTROL)
+            return
+        rel = posixpath.normpath(urllib.parse.unquote(url_path)).lstrip('/')
+        if rel == 'data' or rel.startswith('data/'):
+            self.send_error(404, 'File not found')
+            return
+        super().do_GET()
     
     def handle_kline_api(self, query_string):
         """处理K线数据请求"""
         params = urllib.parse.parse_qs(query_string)
         code = params.get('code', [''])[0]
+        fmt = params.get('format', ['rows'])[0]
+        since = params.get('since', [''])[0]
+        cursor = params.get('cursor', [''])[0]
         
         if not code:
             self.send_json_response({'error': '请提供股票代码'}, 400)
             return
+        if fmt not in FORMATS:
+            self.send_json_response({'error': f'format 仅支持 {", ".join(FORMATS)}'}, 400)
+            return
+        max_points = params.get('max_points', [''])[0]
+        sampling = params.get('sampling', ['merge'])[0]
+        try:
+            if since:
+                parse_date(since, 'since')
+            period = parse_period(params.get('period', ['day'])[0])
+            max_points = parse_int(max_points, 'max_points', 2, MAX_POINTS_LIMIT) if max_points else None
+            if sampling not in SAMPLING_METHODS:
+                raise ValueError(f'sampling 仅支持 {", ".join(SAMPLING_METHODS)}')
+            if max_points and (since or cursor):
+                raise ValueError('max_points 不能与 since/cursor 同时使用')
+        except ValueError as e:
+            self.send_json_response({'error': str(e)}, 400)
+            return
         
         try:
             # 获取股票数据
-            data = self.get_stock_kline(code)
+            if since or cursor:
+                self.send_payload(self.get_incremental_payload(code, fmt, since, cursor, period))
+            else:
+                self.send_payload(self.get_kline_payload(code, fmt, period, max_points, sampling))
+        except ValueError as e:
+            self.send_json_response({'error': str(e)}, 400)
+        except Exception as e:
+            self.send_failure(e)
+    
+    def handle_batch_api(self, query_string):
+        """处理批量查询请求: /api/batch?codes=600519,000001&kline=1"""
+        params = urllib.parse.parse_qs(query_string)
+        codes = [c.strip() for c in params.get('codes', [''])[0].split(',') if c.strip()]
+        codes = list(dict.fromkeys(codes))
+        with_kline = params.get('kline', ['1'])[0] != '0'
+        
+        if not codes:
+            self.send_json_response({'error': '请提供股票代码'}, 400)
+            return
+        if len(codes) > MAX_BATCH_CODES:
+            self.send_json_response({'error': f'单次最多查询 {MAX_BATCH_CODES} 只股票'}, 400)
+            return
+        
+        try:
+            data = self.get_batch(codes, with_kline)
             self.send_json_response(data)
         except Exception as e:
-            self.send_json_response({'error': str(e)}, 500)
-    
-    def get_stock_kline(self, code):
-        """获取股票K线数据 - 使用腾讯财经接口"""
-        import re
-        
-        # 确定市场前缀
-        if code.startswith('6'):
-            symbol = f"sh{code}"
-            market = "上海"
-        elif code.startswith('0') or code.startswith('3'):
-            symbol = f"sz{code}"
-            market = "深圳"
-        else:
-            symbol = f"sh{code}"
-            market = "未知"
-        
-        try:
-            # 1. 获取股票实时信息（名称、价格）
-            info_url = f"http://qt.gtimg.cn/q={symbol}"
-            headers = {'User-Agent': 'Mozilla/5.0'}
-            req = urllib.request.Request(info_url, headers=headers)
-            
-            with urllib.request.urlopen(req, timeout=10) as response:
-                info_content = response.read().decode('gbk')
-            
-            # 解析腾讯数据格式: v_sh600519="1~贵州茅台~600519~1856.00~1868.00~..."
-            info_parts = info_content.split('~')
-            if len(info_parts) < 5:
-                raise Exception(f"股票 {code} 不存在或已退市")
-            
-            name = info_parts[1]
-            price = float(info_parts[3])
-            yesterday_close = float(info_parts[4])
-            change = (price - yesterday_close) / yesterday_close * 100 if yesterday_close > 0 else 0
-            
-            # 2. 获取K线数据
-            # 腾讯日K线接口
-            kline_url = f"http://web.ifzq.gtimg.cn/appstock/app/fqkline/get?param={symbol},day,,,320,qfq"
-            req = urllib.request.Request(kline_url, headers=headers)
-            
-            with urllib.request.urlopen(req, timeout=10) as response:
-                kline_content = response.read().decode('utf-8')
-            
-            kline_json = json.loads(kline_content)
-            
-            # 解析K线数据
-            kline_data = []
-            if 'data' in kline_json and symbol in kline_json['data']:
-                stock_data = kline_json['data'][symbol]
-                day_data = stock_data.get('qfqday', stock_data.get('day', []))
-                
-                for item in day_data:
-                    if len(item) >= 5:
-                        # 腾讯API格式: [日期, 开盘, 收盘, 最高, 最低, 成交量]
-                        kline_data.append({
-                            'date': item[0],
-                            'open': float(item[1]),
-                            'close': float(item[2]),
-                            'high': float(item[3]),
-                            'low': float(item[4]),
-                            'volume': float(item[5]) if len(item) > 5 else 0,
-                            'amount': 0
-                        })
-            
-            if not kline_data:
-                raise Exception(f"获取 {code} K线数据失败")
-            
-            print(f"[成功] 获取 {name}({code}) 数据，共 {len(kline_data)} 条")
-            
-            return {
+            self.send_failure(e)
+    
+    def handle_indicators_api(self, query_string):
+        """处理技术指标请求: /api/indicators?code=600519&set=ma5,macd,boll,kdj&count=120"""
+        params = urllib.parse.parse_qs(query_string)
+        code = params.get('code', [''])[0]
+        count = params.get('count', [''])[0]
+        
+        if not code:
+            self.send_json_response({'error': '请提供股票代码'}, 400)
+            return
+        try:
+            names = parse_indicator_set(params.get('set', [''])[0])
+            count = parse_int(count, 'count', 1, MAX_INDICATOR_COUNT) if count else None
+        except ValueError as e:
+            self.send_json_response({'error': str(e)}, 400)
+            return
+        
+        try:
+            self.send_payload(self.get_indicators_payload(code, names, count))
+        except Exception as e:
+            self.send_failure(e)
+    
+    def get_indicators_payload(self, code, names, count=None):
+        """计算技术指标，同一份K线数据和参数只计算一次"""
+        symbol, market = resolve_symbol(code)
+        try:
+            kline_data = self.get_history(symbol, code)
+        except Exception as e:
+            raise Exception(f"获取数据失败: {str(e)}")
+        
+        cache_key = f'indicators:{code}:{",".join(names)}:{count}'
+        entry = self.server.response_cache.get(cache_key)
+        if entry is not None and entry[0][0] is kline_data:
+            return entry[0][1]
+        
+        result = self.server.indicator_engine.compute(code, kline_data, names, count)
+        payload = EncodedPayload.from_json({'code': code, **result})
+        self.server.response_cache.set(cache_key, (kline_data, payload))
+        return payload
+    
+    def handle_compare_api(self, query_string):
+        """多只股票走势对比: /api/compare?codes=300308,300502&from=2025-01-01&window=20&benchmark=300308"""
+        params = urllib.parse.parse_qs(query_string)
+        codes = [c.strip() for c in params.get('codes', [''])[0].split(',') if c.strip()]
+        codes = list(dict.fromkeys(codes))
+        start = params.get('from', [''])[0]
+        benchmark = params.get('benchmark', [''])[0] or None
+        
+        try:
+            if not 2 <= len(codes) <= MAX_COMPARE_CODES:
+                raise ValueError(f'请提供 2-{MAX_COMPARE_CODES} 个股票代码')
+            if start:
+                parse_date(start, 'from')
+            if benchmark is not None and benchmark not in codes:
+                raise ValueError('benchmark 应为 codes 中的股票')
+            window = parse_int(params.get('window', [str(DEFAULT_COMPARE_WINDOW)])[0], 'window',
+                               MIN_COMPARE_WINDOW, MAX_COMPARE_WINDOW)
+        except ValueError as e:
+            self.send_json_response({'error': str(e)}, 400)
+            return
+        
+        try:
+            self.send_payload(self.get_compare_payload(codes, start, window, benchmark))
+        except ValueError as e:
+            self.send_json_response({'error': str(e)}, 400)
+        except Exception as e:
+            self.send_failure(e)
+    
+    def get_compare_payload(self, codes, start='', window=DEFAULT_COMPARE_WINDOW, benchmark=None):
+        """读取缓存的日K线并计算对比序列，各股票K线数据都未变化时复用上次的结果"""
+        futures = {
+            code: self.server.fetch_executor.submit(self.get_history, resolve_symbol(code)[0], code)
+            for code in codes
+        }
+        histories = {}
+        errors = {}
+        for code, future in futures.items():
+            try:
+                histories[code] = future.result()
+            except Exception as e:
+                errors[code] = f"获取数据失败: {str(e)}"
+        if not histories:
+            raise futures[codes[0]].exception()
+        
+        cache_key = f'compare:{",".join(codes)}:{start}:{window}:{benchmark}'
+        entry = self.server.response_cache.get(cache_key)
+        if entry is not None:
+            cached_histories, payload = entry[0]
+            if cached_histories.keys() == histories.keys() and \
+                    all(cached_histories[code] is kline_data for code, kline_data in histories.items()):
+                return payload
+        
+        with metrics.STAGE_LATENCY.time(stage='compare'):
+            data = compare(histories, start, window, benchmark)
+        master = symbol_master.get_master()
+        data['names'] = {code: (master.get(code) or (code, '', ''))[2] for code in histories}
+        data['errors'] = errors
+        payload = EncodedPayload.from_json(data)
+        self.server.response_cache.set(cache_key, (histories, payload))
+        return payload
+    
+    def handle_search_api(self, query_string):
+        """股票搜索: /api/search?q=gzmt&limit=10，支持代码、拼音首字母、名称前缀"""
+        params = urllib.parse.parse_qs(query_string)
+        query = params.get('q', [''])[0].strip()
+        
+        if not query:
+            self.send_json_response({'error': '请提供搜索关键字'}, 400)
+            return
+        try:
+            limit = parse_int(params.get('limit', ['10'])[0], 'limit', 1, MAX_SEARCH_RESULTS)
+        except ValueError as e:
+            self.send_json_response({'error': str(e)}, 400)
+            return
+        
+        results = [
+            {'code': code, 'symbol': f'{exchange}{code}', 'name': name, 'initials': initials,
+             'market': symbol_master.EXCHANGE_NAMES[exchange], 'board': board}
+            for code, exchange, name, initials, board in symbol_master.get_master().search(query, limit)
+        ]
+        self.send_payload(EncodedPayload.from_json({'query': query, 'results': results}),
+                          cache_control='public, max-age=300')
+    
+    def handle_sectors_top(self, query_string):
+        """某月涨幅前k的板块: /api/sectors/top?month=2024-03&k=3&source=sw"""
+        params = urllib.parse.parse_qs(query_string)
+        month = params.get('month', [''])[0]
+        
+        def build():
+            if not re.fullmatch(r'\d{4}-\d{2}', month):
+                raise ValueError('month 格式应为 YYYY-MM')
+            k = parse_int(params.get('k', ['3'])[0], 'k', 1, MAX_SECTOR_K)
+            return f'top:{month}:{k}', lambda dataset: dataset.top(month, k)
+        self.send_sector_payload(params, build)
+    
+    def handle_sectors_history(self, query_string):
+        """单个板块的月度涨幅和排名: /api/sectors/history?industry=银行&from=2024-01&to=2024-12"""
+        params = urllib.parse.parse_qs(query_string)
+        industry = params.get('industry', [''])[0].strip()
+        start = params.get('from', [''])[0]
+        end = params.get('to', [''])[0]
+        
+        def build():
+            if not industry:
+                raise ValueError('请提供板块名称')
+            for value in (start, end):
+                if value and not re.fullmatch(r'\d{4}-\d{2}', value):
+                    raise ValueError('from/to 格式应为 YYYY-MM')
+            return f'history:{industry}:{start}:{end}', lambda dataset: dataset.history(industry, start, end)
+        self.send_sector_payload(params, build)
+    
+    def handle_sectors_leaderboard(self, query_string):
+        """板块上榜次数排行和每月最强板块: /api/sectors/leaderboard?year=2024&k=10"""
+        params = urllib.parse.parse_qs(query_string)
+        year = params.get('year', ['all'])[0] or 'all'
+        
+        def build():
+            if year != 'all' and not re.fullmatch(r'\d{4}', year):
+                raise ValueError('year 应为四位年份或 all')
+            k = params.get('k', [''])[0]
+            k = parse_int(k, 'k', 1, MAX_SECTOR_K) if k else None
+            return f'leaderboard:{year}:{k}', lambda dataset: dataset.leaderboard(year, k)
+        self.send_sector_payload(params, build)
+    
+    def handle_sectors_summary(self, query_string):
+        """某个自然月的历年平均表现（monthly_summary）: /api/sectors/summary?month=3&source=sw"""
+        params = urllib.parse.parse_qs(query_string)
+        
+        def build():
+            month = parse_int(params.get('month', [''])[0], 'month', 1, 12)
+            return f'summary:{month}', lambda dataset: dataset.summary(month)
+        self.send_sector_payload(params, build)
+    
+    def handle_sectors_live(self, query_string):
+        """盘中板块热度排行: /api/sectors/live?source=sw&sort=avg&k=20&leaders=3"""
+        params = urllib.parse.parse_qs(query_string)
+        try:
+            k = parse_int(params.get('k', ['20'])[0], 'k', 1, MAX_SECTOR_K)
+            leaders = parse_int(params.get('leaders', ['3'])[0], 'leaders', 0, MAX_LEADERS)
+            payload = self.server.sector_live.ranking(params.get('source', [DEFAULT_SECTOR_SOURCE])[0],
+                                                      params.get('sort', ['avg'])[0], k, leaders)
+        except ValueError as e:
+            self.send_json_response({'error': str(e)}, 400)
+            return
+        except KeyError as e:
+            self.send_json_response({'error': e.args[0]}, 404)
+            return
+        self.send_payload(payload)
+    
+    def send_sector_payload(self, params, build):
+        """build() 校验参数并返回 (缓存key, 查询函数)；同一份数据的同一查询只计算一次"""
+        try:
+            key, query = build()
+            dataset = self.server.sector_index.dataset(params.get('source', [DEFAULT_SECTOR_SOURCE])[0])
+            payload = dataset.payload(key, lambda: query(dataset))
+        except ValueError as e:
+            self.send_json_response({'error': str(e)}, 400)
+            return
+        except KeyError as e:
+            self.send_json_response({'error': e.args[0]}, 404)
+            return
+        self.send_payload(payload)
+    
+    def handle_stream_api(self, query_string):
+        """实时行情推送: /api/stream?codes=600519,000001 (text/event-stream)
+
+        响应头发送后连接交给推送线程，当前工作线程立即返回
+        """
+        params = urllib.parse.parse_qs(query_string)
+        codes = [c.strip() for c in params.get('codes', [''])[0].split(',') if c.strip()]
+        
+        if not codes:
+            self.send_json_response({'error': '请提供股票代码'}, 400)
+            return
+        if len(codes) > MAX_STREAM_CODES:
+            self.send_json_response({'error': f'单个连接最多订阅 {MAX_STREAM_CODES} 只股票'}, 400)
+            return
+        hub = self.server.stream_hub
+        if hub.is_full():
+            self.send_json_response({'error': '推送连接数已满，请稍后重试'}, 503)
+            return
+        
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream; charset=utf-8')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('X-Accel-Buffering', 'no')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        self.wfile.flush()
+        
+        self.close_connection = True
+        self.server.detach_request(self.request)
+        hub.subscribe(self.request, {resolve_symbol(code)[0]: code for code in codes})
+    
+    def get_batch(self, codes, with_kline=True):
+        """批量获取行情和K线：行情合并为一次上游请求，K线并行获取或读缓存"""
+        symbols = {code: resolve_symbol(code) for code in codes}
+        quotes = self.get_quotes([symbol for symbol, _ in symbols.values()])
+        
+        histories = {}
+        errors = {}
+        if with_kline:
+            futures = {
+                code: self.server.fetch_executor.submit(self.get_history, symbol, code)
+                for code, (symbol, _) in symbols.items()
+                if symbol in quotes
+            }
+            for code, future in futures.items():
+                try:
+                    histories[code] = future.result()
+                except Exception as e:
+                    errors[code] = f"获取数据失败: {str(e)}"
+        
+        stocks = []
+        for code, (symbol, market) in symbols.items():
+            if symbol not in quotes:
+                errors[code] = f"股票 {code} 不存在或已退市"
+                continue
+            if code in errors:
+                continue
+            quote = quotes[symbol]
+            item = {
                 'code': code,
-                'name': name,
+                'name': quote['name'],
                 'market': market,
-                'price': price,
-                'change': round(change, 2),
-                'kline': kline_data
+                'price': quote['price'],
+                'change': quote['change'],
+                'source': {'quote': quote.get('source', 'cache')}
             }
-            
+            if with_kline:
+                item['kline'] = histories[code]
+                item['source']['kline'] = self.server.history_sources.get(symbol, 'cache')
+            stocks.append(item)
+        
+        return {'stocks': stocks, 'errors': errors}
+    
+    def get_quotes(self, symbols):
+        """批量读取实时行情，缓存未命中的股票合并为一次上游请求"""
+        return load_quotes(self.server, symbols)
+    
+    def get_stock_kline(self, code, period=('day', 1)):
+        """获取股票K线数据 - 行情和历史K线分别缓存，周K/月K/N日K由日K线合成"""
+        symbol, market = resolve_symbol(code)
+        quote, kline_data = self.get_quote_and_history(symbol, code)
+        return build_kline_response(code, market, quote, resample_history(kline_data, period),
+                                    period_name(period), self.server.history_sources.get(symbol, 'cache'))
+    
+    def get_kline_payload(self, code, fmt='rows', period=('day', 1), max_points=None, sampling='merge'):
+        """获取K线响应体，行情或历史数据未变化时复用已序列化/压缩的字节
+
+        指定max_points时K线降采样到不超过该根数，cursor仍按完整K线生成
+        """
+        symbol, market = resolve_symbol(code)
+        quote, kline_data = self.get_quote_and_history(symbol, code)
+        kline_source = self.server.history_sources.get(symbol, 'cache')
+        
+        cache_key = f'kline:{code}:{fmt}:{period_name(period)}:{max_points}:{sampling}:{kline_source}'
+        entry = self.server.response_cache.get(cache_key)
+        if entry is not None:
+            cached_quote, cached_history, payload = entry[0]
+            if cached_quote is quote and cached_history is kline_data:
+                return payload
+        
+        data = build_kline_response(code, market, quote, resample_history(kline_data, period),
+                                    period_name(period), kline_source)
+        if max_points and len(data['kline']) > max_points:
+            with metrics.STAGE_LATENCY.time(stage=f'downsample_{sampling}'):
+                bars = downsample(data['kline'], max_points, sampling)
+            data.update(kline=bars, source_bars=len(data['kline']), sampling=sampling)
+        payload = encode_kline_payload(data, fmt)
+        self.server.response_cache.set(cache_key, (quote, kline_data, payload))
+        return payload
+    
+    def get_incremental_payload(self, code, fmt, since='', cursor='', period=('day', 1)):
+        """只返回客户端最后一根K线之后的数据，前复权历史被改写时返回全量并标记reset"""
+        data = self.get_stock_kline(code, period)
+        kline_data = data['kline']
+        if cursor:
+            bars, reset = bars_after_cursor(kline_data, cursor)
+        else:
+            bars, reset = bars_since(kline_data, since)
+        data.update(kline=bars, incremental=True, reset=reset)
+        return encode_kline_payload(data, fmt)
+    
+    def get_quote_and_history(self, symbol, code):
+        try:
+            return self.get_quote(symbol, code), self.get_history(symbol, code)
+        except tencent_client.UpstreamThrottled:
+            raise
         except Exception as e:
             raise Exception(f"获取数据失败: {str(e)}")
     
-    def send_json_response(self, data, status=200):
+    def get_quote(self, symbol, code):
+        """实时行情，有效期较短"""
+        return load_quote(self.server, symbol, code)
+    
+    def get_history(self, symbol, code):
+        """历史K线，过期后先返回旧数据并在后台刷新"""
+        return load_history(self.server, symbol, code)
+    
+    def send_json_response(self, data, status=200, retry_after=None):
         """发送JSON响应"""
+        self.send_payload(EncodedPayload.from_json(data), status, retry_after=retry_after)
+    
+    def send_failure(self, error):
+        """上游被限速时返回503和Retry-After，其他错误返回500"""
+        if isinstance(error, tencent_client.UpstreamThrottled):
+            metrics.API_REJECTED.inc(reason='upstream_limit')
+            self.send_json_response({'error': '数据源繁忙，请稍后重试'}, 503, error.retry_after)
+        else:
+            self.send_json_response({'error': str(error)}, 500)
+    
+    def send_payload(self, payload, status=200, cache_control='no-cache', retry_after=None):
+        """发送预编码的响应，支持gzip/br压缩和ETag协商缓存"""
+        content_encoding = payload.choose_encoding(self.headers.get('Accept-Encoding'))
+        if status == 200 and payload.matches(self.headers.get('If-None-Match'), content_encoding):
+            self.send_response(304)
+            self.send_header('ETag', payload.etag_for(content_encoding))
+            self.send_header('Cache-Control', cache_control)
+            self.send_header('Vary', 'Accept-Encoding')
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.end_headers()
+            return
+        
+        body = payload.encoded(content_encoding) if content_encoding else payload.body
+        metrics.API_RESPONSE_BYTES.observe(len(body), route=getattr(self, 'route', ''),
+                                           encoding=content_encoding or 'identity')
         self.send_response(status)
-        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Type', payload.content_type)
+        self.send_header('Content-Length', str(len(body)))
+        if content_encoding:
+            self.send_header('Content-Encoding', content_encoding)
+        if status == 200:
+            self.send_header('ETag', payload.etag_for(content_encoding))
+            self.send_header('Cache-Control', cache_control)
+        if retry_after is not None:
+            self.send_header('Retry-After', str(max(1, math.ceil(retry_after))))
+        self.send_header('Vary', 'Accept-Encoding')
         self.send_header('Access-Control-Allow-Origin', '*')
         self.end_headers()
-        self.wfile.write(json.dumps(data, ensure_ascii=False).encode('utf-8'))
+        self.wfile.write(body)
     
     def log_message(self, format, *args):
         """自定义日志格式"""
-        if '/api/' in args[0]:
+        if args and isinstance(args[0], str) and '/api/' in args[0]:
             print(f"[API] {args[0]}")
 
-def run_server(port=8080):
-    server = HTTPServer(('0.0.0.0', port), StockAPIHandler)
-    print(f"=" * 50)
-    print(f"股票数据API服务器已启动")
+def parse_int(value, name, low, high):
+    """解析整数参数，超出 [low, high] 时抛出ValueError"""
+    try:
+        number = int(value)
+    except ValueError:
+        number = None
+    if number is None or not low <= number <= high:
+        raise ValueError(f'{name} 应为 {low}-{high} 的整数')
+    return number
+
+def parse_date(value, name):
+    """校验 YYYY-MM-DD 日期参数，不是有效日期（如 2025-13-45）时抛出ValueError"""
+    if re.fullmatch(r'\d{4}-\d{2}-\d{2}', value):
+        try:
+            datetime.strptime(value, '%Y-%m-%d')
+            return value
+        except ValueError:
+            pass
+    raise ValueError(f'{name} 应为 YYYY-MM-DD 格式的有效日期')
+
+def load_shared(shared_cache, key, max_age, loader):
+    """先读多进程共享缓存，未命中时调用loader()并写回"""
+    value = shared_cache.get(key, max_age)
+    if value is None:
+        value = loader()
+        shared_cache.set(key, value)
+    return value
+
+def load_stale(cache, shared_cache, key, shared_key):
+    """所有数据源都不可用时的兜底：不论新旧，先读内存缓存，再读共享缓存，都没有时返回None"""
+    entry = cache.get(key)
+    value = entry[0] if entry is not None else shared_cache.get(shared_key, math.inf)
+    if value is not None:
+        metrics.UPSTREAM_FALLBACK.inc(source='cache')
+    return value
+
+def stale_quote(server, symbol):
+    quote = load_stale(server.quote_cache, server.shared_cache, symbol, f'quote:{symbol}')
+    return dict(quote, source='cache') if quote is not None else None
+
+def load_quote(server, symbol, code):
+    """读取实时行情：内存缓存 -> 共享缓存 -> 上游（主数据源 -> 备用数据源） -> 过期的缓存"""
+    try:
+        return server.quote_cache.get_or_load(
+            symbol,
+            lambda: load_shared(server.shared_cache, f'quote:{symbol}', server.quote_cache.ttl,
+                                lambda: fetch_quote(symbol, code))
+        )
+    except tencent_client.UpstreamError:
+        quote = stale_quote(server, symbol)
+        if quote is None:
+            raise
+        return quote
+
+def history_loader(server, symbol, code):
+    """历史K线的加载函数：共享缓存 -> 上游，记录K线来自哪个数据源"""
+    def load():
+        kline_data, source = fetch_history(symbol, code)
+        server.history_sources[symbol] = source
+        print(f"[成功] 从 {source} 获取 {code} K线数据，共 {len(kline_data)} 条")
+        return kline_data
+    
+    return lambda: load_shared(server.shared_cache, f'history:{symbol}', server.history_cache.ttl, load)
+
+def stored_history(server, symbol):
+    """从日K线列式存储读取最近的K线，没有存储或其中没有该股票时返回None"""
+    if server.bar_store is None:
+        return None
+    server.bar_store.refresh()
+    kline_data = server.bar_store.kline(symbol, count=320)  # 与 fetch_history 的根数相同
+    if not kline_data:
+        return None
+    metrics.UPSTREAM_FALLBACK.inc(source='store')
+    return kline_data
+
+def load_history(server, symbol, code):
+    """读取历史K线：内存缓存（过期后先返回旧数据并在后台刷新） -> 共享缓存 -> 上游 -> 过期的缓存 -> K线库"""
+    try:
+        return server.history_cache.get_or_load(symbol, history_loader(server, symbol, code))
+    except tencent_client.UpstreamError:
+        source = 'cache'
+        kline_data = load_stale(server.history_cache, server.shared_cache, symbol, f'history:{symbol}')
+        if kline_data is None:
+            source = 'store'
+            kline_data = stored_history(server, symbol)
+        if kline_data is None:
+            raise
+        server.history_sources[symbol] = source
+        return kline_data
+
+def load_quotes(server, symbols):
+    """批量读取实时行情，缓存未命中的股票合并为一次上游请求"""
+    ttl = server.quote_cache.ttl
+    quotes = {}
+    missing = []
+    for symbol in symbols:
+        quote = server.quote_cache.get_fresh(symbol)
+        if quote is None:
+            quote = server.shared_cache.get(f'quote:{symbol}', ttl)
+            if quote is not None:
+                server.quote_cache.set(symbol, quote)
+        if quote is None:
+            missing.append(symbol)
+        else:
+            quotes[symbol] = quote
+    
+    if missing:
+        try:
+            fetched = fetch_quotes(missing)
+        except tencent_client.UpstreamError:
+            fetched = {}
+            for symbol in missing:
+                quote = stale_quote(server, symbol)
+                if quote is not None:
+                    fetched[symbol] = quote
+            if not fetched:
+                raise
+        else:
+            for symbol, quote in fetched.items():
+                server.quote_cache.set(symbol, quote)
+                server.shared_cache.set(f'quote:{symbol}', quote)
+        quotes.update(fetched)
+    return quotes
+
+def poll_quotes(server, symbols):
+    """推送线程使用：其他进程在一个轮询间隔内刚取到的行情直接复用，其余的请求上游，同时刷新行情缓存
+
+    多进程模式下各进程都有推送线程，同一只股票每个间隔通常只有最先轮询的进程请求上游
+    """
+    max_age = server.stream_hub.interval
+    quotes = {}
+    missing = []
+    for symbol in symbols:
+        quote = server.shared_cache.get(f'quote:{symbol}', max_age)
+        if quote is None:
+            missing.append(symbol)
+        else:
+            quotes[symbol] = quote
+    if missing:
+        fetched = fetch_quotes(missing)
+        for symbol, quote in fetched.items():
+            server.shared_cache.set(f'quote:{symbol}', quote)
+        quotes.update(fetched)
+    for symbol, quote in quotes.items():
+        server.quote_cache.set(symbol, quote)
+    return quotes
+
+def poll_sector_quotes(server, symbols):
+    """板块热度轮询：全部成分股行情整批存入共享缓存，其他进程一个轮询间隔内直接复用"""
+    quotes = server.shared_cache.get('sector_live:quotes', server.sector_live.interval)
+    if quotes is None:
+        quotes = fetch_quotes(symbols)
+        server.shared_cache.set('sector_live:quotes', quotes)
+    return quotes
+
+class APIHTTPServer(HTTPServer):
+    """支持把连接移交给其他线程（如行情推送）的HTTP服务器"""
+
+    # socketserver默认的listen队列只有5，突发连接会被内核丢弃并在1秒后重传SYN；
+    # 排队上限由 PooledHTTPServer.max_queue 控制
+    request_queue_size = 128
+
+    def __init__(self, server_address, handler_class):
+        super().__init__(server_address, handler_class)
+        self._detached = set()
+
+    def detach_request(self, request):
+        """请求处理结束后不关闭该连接，由接手方负责关闭"""
+        self._detached.add(request)
+
+    def shutdown_request(self, request):
+        if request in self._detached:
+            self._detached.discard(request)
+            return
+        super().shutdown_request(request)
+
+def busy_response(retry_after):
+    body = json.dumps({'error': '服务器繁忙，请稍后重试'}, ensure_ascii=False).encode('utf-8')
+    head = (
+        'HTTP/1.0 503 Service Unavailable\r\n'
+        'Content-Type: application/json; charset=utf-8\r\n'
+        f'Content-Length: {len(body)}\r\n'
+        f'Retry-After: {retry_after}\r\n'
+        'Access-Control-Allow-Origin: *\r\n'
+        'Connection: close\r\n\r\n'
+    )
+    return head.encode('ascii') + body
+
+class PooledHTTPServer(APIHTTPServer):
+    """使用固定大小线程池并发处理请求的HTTP服务器
+
+    单个股票的上游请求变慢时，只占用一个工作线程，不会阻塞其他请求和静态文件；
+    等待工作线程的连接超过max_queue个时，新连接直接返回503，不再排队
+    """
+
+    def __init__(self, server_address, handler_class, max_workers=16, max_queue=64):
+        super().__init__(server_address, handler_class)
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='api-worker')
+        self._queued = 0
+        self._queue_lock = threading.Lock()
+        self._busy_response = busy_response(QUEUE_FULL_RETRY_AFTER)
+
+    def process_request(self, request, client_address):
+        """把连接交给线程池处理，主线程继续accept"""
+        with self._queue_lock:
+            full = self.max_queue > 0 and self._queued >= self.max_queue
+            if not full:
+                self._queued += 1
+                metrics.API_QUEUE_DEPTH.set(self._queued)
+        if full:
+            self.reject_request(request)
+            return
+        self.executor.submit(self.process_request_thread, request, client_address)
+
+    def reject_request(self, request):
+        """在accept线程上直接返回503"""
+        metrics.API_REJECTED.inc(reason='queue_full')
+        try:
+            request.settimeout(1)
+            request.sendall(self._busy_response)
+        except OSError:
+            pass
+        self.shutdown_request(request)
+
+    def process_request_thread(self, request, client_address):
+        with self._queue_lock:
+            self._queued -= 1
+            metrics.API_QUEUE_DEPTH.set(self._queued)
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown(wait=False)
+
+def create_server(port=8080, workers=16, cache_dir=DEFAULT_CACHE_DIR,
+                  quote_ttl=5, history_ttl=300, history_stale=86400, cache_size=512, stream_interval=3,
+                  max_queue=64, client_rate=20, client_burst=40, snapshot=True, sector_live_interval=10,
+                  bar_store=DEFAULT_BAR_STORE):
+    """创建服务器并挂载缓存"""
+    if workers > 1:
+        server = PooledHTTPServer(('0.0.0.0', port), StockAPIHandler, max_workers=workers, max_queue=max_queue)
+    else:
+        server = APIHTTPServer(('0.0.0.0', port), StockAPIHandler)
+    server.client_limiter = ClientLimiter(client_rate, client_burst) if client_rate > 0 else None
+    server.shared_cache = SharedFileCache(cache_dir, max_age=history_ttl + history_stale)
+    server.quote_cache = TTLCache(quote_ttl, max_entries=cache_size, name='quote')
+    server.history_cache = TTLCache(history_ttl, stale_ttl=history_stale, max_entries=cache_size, name='history')
+    server.response_cache = TTLCache(history_ttl + history_stale, max_entries=cache_size, name='response')
+    server.history_sources = {}  # symbol -> 历史K线的数据源，从共享缓存或快照读入的不在其中
+    server.snapshot = CacheSnapshot(cache_dir) if snapshot else None
+    server.static_store = StaticFileStore(os.getcwd())
+    server.static_store.load_all()
+    server.sector_index = SectorIndex(server.static_store)
+    server.indicator_engine = IndicatorEngine(max_codes=cache_size)
+    server.fetch_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='api-fetch')
+    server.stream_hub = QuoteStreamHub(lambda symbols: poll_quotes(server, symbols), interval=stream_interval)
+    # 全市场成分股行情量大，整批读写共享缓存，不写入按股票缓存的行情缓存
+    server.sector_live = LiveSectors(lambda symbols: poll_sector_quotes(server, symbols),
+                                     interval=sector_live_interval)
+    server.bar_store = None
+    if bar_store:
+        try:
+            server.bar_store = BarStore.open_existing(bar_store)
+        except (OSError, ValueError) as e:
+            print(f"[K线库] 打开 {bar_store} 失败: {e}")
+    return server
+
+def resolve_warmup_codes(spec):
+    """解析预热列表，逗号分隔，每项可以是:
+    hot（HOT_STOCKS）、extended（get_extended_stock_list()）、
+    每行一个股票代码的文件，或股票代码本身
+    """
+    codes = []
+    for item in (part.strip() for part in spec.split(',')):
+        if not item:
+            continue
+        if item == 'hot':
+            codes.extend(code for code, _ in HOT_STOCKS)
+        elif item == 'extended':
+            codes.extend(code for code, _ in get_extended_stock_list())
+        elif os.path.isfile(item):
+            with open(item, encoding='utf-8') as f:
+                codes.extend(line.split()[0] for line in f if line.strip() and not line.startswith('#'))
+        else:
+            codes.append(item)
+    return list(dict.fromkeys(codes))
+
+def warm_up(server, codes, concurrency=4):
+    """启动前预先加载行情和K线，同时最多concurrency个K线请求；缓存中未过期的股票跳过"""
+    started = time.perf_counter()
+    symbols = {code: resolve_symbol(code)[0] for code in codes}
+    try:
+        load_quotes(server, list(symbols.values()))
+    except Exception as e:
+        print(f"[预热] 获取行情失败: {e}")
+    
+    pending = [code for code in codes if server.history_cache.get_fresh(symbols[code]) is None]
+    failed = []
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='api-warmup') as executor:
+        futures = {
+            code: executor.submit(server.history_cache.refresh, symbols[code],
+                                  history_loader(server, symbols[code], code))
+            for code in pending
+        }
+        for code, future in futures.items():
+            try:
+                future.result()
+            except Exception as e:
+                failed.append(code)
+                print(f"[预热] {code} 失败: {e}")
+    print(f"[预热] {len(codes)} 只股票，加载 {len(pending) - len(failed)} 只，"
+          f"失败 {len(failed)} 只，耗时 {time.perf_counter() - started:.1f} 秒")
+
+def snapshot_caches(server):
+    return {'quote': server.quote_cache, 'history': server.history_cache}
+
+def restore_snapshot(server):
+    """启动时读取上次停止时保存的缓存快照"""
+    if server.snapshot is None:
+        return
+    restored = server.snapshot.load(snapshot_caches(server))
+    print("[缓存] 从快照恢复: " + '，'.join(f'{name} {count} 条' for name, count in restored.items()))
+
+def save_snapshot(server, slot=0):
+    """停止服务时保存缓存快照"""
+    if server.snapshot is None:
+        return
+    count = server.snapshot.save(snapshot_caches(server), slot)
+    print(f"[缓存] 已保存快照 {count} 条")
+
+def raise_keyboard_interrupt(signum, frame):
+    """收到SIGTERM时按Ctrl+C处理，走正常的退出流程"""
+    raise KeyboardInterrupt
+
+def start_background(server):
+    """启动后台线程（多进程模式下在每个子进程中调用）"""
+    server.static_store.start()
+
+def serve_prefork(server, processes):
+    """预先fork多个工作进程，共享同一个监听socket
+
+    每个进程有独立的解释器和GIL，K线解析可以用满多个CPU核
+    """
+    children = []
+    for slot in range(processes):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, raise_keyboard_interrupt)
+            try:
+                start_background(server)
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+            finally:
+                try:
+                    save_snapshot(server, slot)
+                finally:
+                    os._exit(0)
+        children.append(pid)
+    
+    def stop_children(signum, frame):
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+    
+    signal.signal(signal.SIGTERM, stop_children)
+    try:
+        for pid in children:
+            os.waitpid(pid, 0)
+    except KeyboardInterrupt:
+        stop_children(signal.SIGINT, None)
+        for pid in children:
+            os.waitpid(pid, 0)
+
+def run_server(port=8080, workers=16, processes=1, cache_dir=DEFAULT_CACHE_DIR,
+               quote_ttl=5, history_ttl=300, history_stale=86400, cache_size=512,
+               upstream_pool_size=8, upstream_timeout=10, stream_interval=3,
+               quote_host=tencent_client.QUOTE_HOST, kline_host=tencent_client.KLINE_HOST,
+               max_queue=64, client_rate=20, client_burst=40, upstream_rate=50, upstream_burst=100,
+               upstream_wait=1, warmup='', warmup_concurrency=4, snapshot=True,
+               symbols_max_age=symbol_master.MAX_AGE_DAYS, hedge=False, breaker_failures=5, breaker_reset=30,
+               fallback=True, fallback_quote_host=eastmoney_client.QUOTE_HOST,
+               fallback_kline_host=eastmoney_client.KLINE_HOST, sector_live_interval=10,
+               bar_store=str(DEFAULT_BAR_STORE)):
+    if processes > 1 and not hasattr(os, 'fork'):
+        raise RuntimeError('当前系统不支持fork，无法使用多进程模式')
+    
+    master = symbol_master.set_master(symbol_master.load_or_download(max_age_days=symbols_max_age))
+    guard = dict(rate_limit=upstream_rate, burst=upstream_burst, max_wait=upstream_wait,
+                 hedge=hedge, breaker_failures=breaker_failures, breaker_reset=breaker_reset)
+    tencent_client.configure(pool_size=upstream_pool_size, timeout=upstream_timeout,
+                             quote_host=quote_host, kline_host=kline_host, **guard)
+    if fallback:
+        eastmoney_client.configure(pool_size=max(1, upstream_pool_size // 2), timeout=upstream_timeout,
+                                   quote_host=fallback_quote_host, kline_host=fallback_kline_host, **guard)
+    market_data.configure(market_data.DEFAULT_ORDER if fallback else ('tencent',))
+    server = create_server(port, workers, cache_dir, quote_ttl, history_ttl, history_stale, cache_size,
+                           stream_interval, max_queue, client_rate, client_burst, snapshot, sector_live_interval,
+                           bar_store)
+    print("=" * 50)
+    print("股票数据API服务器已启动")
     print(f"访问地址: http://localhost:{port}")
     print(f"K线API: http://localhost:{port}/api/kline?code=600519")
-    print(f"=" * 50)
-    server.serve_forever()
+    print(f"批量API: http://localhost:{port}/api/batch?codes=600519,000001")
+    print(f"行情推送: http://localhost:{port}/api/stream?codes=600519,000001")
+    print(f"股票搜索: http://localhost:{port}/api/search?q=gzmt")
+    print(f"走势对比: http://localhost:{port}/api/compare?codes=300308,300502")
+    print(f"板块热度: http://localhost:{port}/api/sectors/live?source=sw")
+    print(f"运行指标: http://localhost:{port}/metrics")
+    print(f"工作进程: {processes}，每进程工作线程: {workers}")
+    print(f"共享缓存: {cache_dir}")
+    print(f"代码表: {len(master)} 只股票")
+    print(f"备用数据源: {'东方财富' if fallback else '无'}，对冲请求: {'开启' if hedge else '关闭'}")
+    print(f"K线库: {f'{len(server.bar_store)} 只股票' if server.bar_store is not None else '无'}")
+    print(f"内存静态文件: {len(server.static_store)} 个")
+    print("=" * 50)
+    restore_snapshot(server)
+    if warmup:
+        warm_up(server, resolve_warmup_codes(warmup), warmup_concurrency)
+    try:
+        if processes > 1:
+            serve_prefork(server, processes)
+        else:
+            signal.signal(signal.SIGTERM, raise_keyboard_interrupt)
+            start_background(server)
+            server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if processes <= 1:
+            save_snapshot(server)
+        server.stream_hub.close()
+        server.sector_live.close()
+        server.static_store.stop()
+        server.server_close()
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='股票数据API服务器')
+    parser.add_argument('--port', type=int, default=8080, help='监听端口')
+    parser.add_argument('--workers', type=int, default=16, help='并发处理请求的工作线程数，1为串行处理')
+    parser.add_argument('--processes', type=int, default=1, help='工作进程数，大于1时启用多进程预fork模式')
+    parser.add_argument('--cache-dir', default=str(DEFAULT_CACHE_DIR), help='多进程共享缓存目录')
+    parser.add_argument('--quote-ttl', type=float, default=5, help='实时行情缓存有效期（秒）')
+    parser.add_argument('--history-ttl', type=float, default=300, help='历史K线缓存有效期（秒）')
+    parser.add_argument('--history-stale', type=float, default=86400,
+                        help='历史K线过期后仍可先返回旧数据、后台刷新的时长（秒）')
+    parser.add_argument('--cache-size', type=int, default=512, help='每类内存缓存最多保存的股票数')
+    parser.add_argument('--upstream-pool-size', type=int, default=8, help='每个上游主机的长连接池大小')
+    parser.add_argument('--upstream-timeout', type=float, default=10, help='上游请求超时（秒）')
+    parser.add_argument('--stream-interval', type=float, default=3, help='行情推送的轮询间隔（秒）')
+    parser.add_argument('--sector-live-interval', type=float, default=10,
+                        help='盘中板块热度的行情轮询间隔（秒），0为关闭')
+    parser.add_argument('--quote-host', default=tencent_client.QUOTE_HOST,
+                        help='行情接口地址（host[:port]），压测时可指向本地模拟服务')
+    parser.add_argument('--kline-host', default=tencent_client.KLINE_HOST, help='K线接口地址（host[:port]）')
+    parser.add_argument('--warmup', default='',
+                        help='启动前预热的股票: hot、extended、代码列表文件或逗号分隔的代码，可组合，如 hot,extended')
+    parser.add_argument('--warmup-concurrency', type=int, default=4, help='预热时同时进行的K线请求数')
+    parser.add_argument('--symbols-max-age', type=float, default=symbol_master.MAX_AGE_DAYS,
+                        help='代码表文件超过该天数时启动时重新下载，小于0为从不下载（只用本地文件或内置股票池）')
+    parser.add_argument('--no-snapshot', action='store_true', help='不在停止时保存、启动时恢复缓存快照')
+    parser.add_argument('--max-queue', type=int, default=64,
+                        help='等待工作线程的最大连接数，超出时直接返回503（0为不限）')
+    parser.add_argument('--client-rate', type=float, default=20, help='每个客户端IP每秒最多请求数（0为不限）')
+    parser.add_argument('--client-burst', type=float, default=40, help='每个客户端IP允许的突发请求数')
+    parser.add_argument('--upstream-rate', type=float, default=50,
+                        help='每个上游主机每秒最多发出的请求数（0为不限）')
+    parser.add_argument('--upstream-burst', type=float, default=100, help='每个上游主机允许的突发请求数')
+    parser.add_argument('--upstream-wait', type=float, default=1,
+                        help='上游限速时最多等待的秒数，超出时返回503')
+    parser.add_argument('--hedge', action='store_true',
+                        help='上游请求超过近期耗时p95仍未返回时再发一次，取先返回的结果（默认关闭）')
+    parser.add_argument('--breaker-failures', type=int, default=5,
+                        help='上游主机连续失败多少次后熔断（0为不熔断）')
+    parser.add_argument('--breaker-reset', type=float, default=30, help='熔断多少秒后放行探测请求')
+    parser.add_argument('--no-fallback', action='store_true', help='腾讯接口不可用时不改用东方财富接口')
+    parser.add_argument('--fallback-quote-host', default=eastmoney_client.QUOTE_HOST,
+                        help='备用行情接口地址（host[:port]）')
+    parser.add_argument('--fallback-kline-host', default=eastmoney_client.KLINE_HOST,
+                        help='备用K线接口地址（host[:port]）')
+    parser.add_argument('--bar-store', default=str(DEFAULT_BAR_STORE),
+                        help='日K线列式存储目录（由 bar_store.py update 生成），上游和缓存都不可用时从中读取K线，'
+                             '空字符串为不使用')
+    return parser.parse_args()
 
 if __name__ == '__main__':
-    run_server()
+    args = parse_args()
+    run_server(
+        port=args.port,
+        workers=args.workers,
+        processes=args.processes,
+        cache_dir=args.cache_dir,
+        quote_ttl=args.quote_ttl,
+        history_ttl=args.history_ttl,
+        history_stale=args.history_stale,
+        cache_size=args.cache_size,
+        upstream_pool_size=args.upstream_pool_size,
+        upstream_timeout=args.upstream_timeout,
+        stream_interval=args.stream_interval,
+        quote_host=args.quote_host,
+        kline_host=args.kline_host,
+        max_queue=args.max_queue,
+        client_rate=args.client_rate,
+        client_burst=args.client_burst,
+        upstream_rate=args.upstream_rate,
+        upstream_burst=args.upstream_burst,
+        upstream_wait=args.upstream_wait,
+        warmup=args.warmup,
+        warmup_concurrency=args.warmup_concurrency,
+        snapshot=not args.no_snapshot,
+        symbols_max_age=args.symbols_max_age,
+        hedge=args.hedge,
+        breaker_failures=args.breaker_failures,
+        breaker_reset=args.breaker_reset,
+        fallback=not args.no_fallback,
+        fallback_quote_host=args.fallback_quote_host,
+        fallback_kline_host=args.fallback_kline_host,
+        sector_live_interval=args.sector_live_interval,
+        bar_store=args.bar_store
+    )
 
@@ -0,0 +1,465 @@
+#!/usr/bin/env python3
+"""
+日K线列式存储
+全部股票的日K线按列存为内存映射文件（日期、开、高、低、收、成交量各一个连续数组），
+index.json 记录每只股票在数组中的 (起始行, 行数, 容量)。
+- 打开时只读索引并映射文件，不读入数据；按股票、日期区间取出的是文件上的只读视图，不复制
+- 每只股票的区域预留 SLACK 行，新的交易日直接写在原区域末尾；预留用完、整段替换（复权数据变化）
+  或改写已提交的最后一根（盘中更新当天K线）时在文件末尾重新分配，原区域留下的空洞由 compact 回收
+- 写入数据后再原子替换索引，读取的进程只会看到写完的数据；compact 写到新一代文件，已映射旧文件的进程不受影响
+- 同一时间只允许一个进程写入
+
+更新和查看:
+    python bar_store.py update [hot|extended|all|代码,...]   # 默认 all（代码表中的全部股票）
+    python bar_store.py stats
+    python bar_store.py compact
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+import market_data
+import symbol_master
+from server_cache import write_json_atomic
+from symbol_master import resolve_symbol
+
+DEFAULT_PATH = Path(os.environ.get('BAR_STORE_PATH') or Path(__file__).resolve().parent / 'data' / 'bars')
+
+COLUMNS = {
+    'date': np.dtype('<i4'),  # YYYYMMDD
+    'open': np.dtype('<f8'),
+    'high': np.dtype('<f8'),
+    'low': np.dtype('<f8'),
+    'close': np.dtype('<f8'),
+    'volume': np.dtype('<f8'),
+}
+SLACK = 64           # 每只股票预留的行数，约3个月交易日
+MIN_GROW = 1 << 16   # 数据文件每次至少扩容的行数
+FULL_HISTORY = 800   # 首次写入或复权数据变化时获取的K线根数
+OVERLAP = 5          # 增量更新时多取的已有K线根数，用于发现复权数据的变化
+COMMIT_EVERY = 200   # update 每写入多少只股票提交一次索引
+
+
+def date_to_int(text):
+    """'2024-01-02' / '20240102' -> 20240102"""
+    return int(str(text)[:10].replace('-', ''))
+
+
+def int_to_date(value):
+    value = int(value)
+    return f'{value // 10000:04d}-{value // 100 % 100:02d}-{value % 100:02d}'
+
+
+def parse_rows(rows):
+    """K线原始数据 [日期, 开盘, 收盘, 最高, 最低, 成交量, ...] -> {列名: 数组}
+
+    按日期升序排列，同一日期有多行时取最后一行，不完整的行跳过
+    """
+    rows = [row for row in rows if len(row) >= 5]
+    count = len(rows)
+    data = {
+        'date': np.fromiter((date_to_int(row[0]) for row in rows), COLUMNS['date'], count),
+        'open': np.fromiter((float(row[1]) for row in rows), COLUMNS['open'], count),
+        'high': np.fromiter((float(row[3]) for row in rows), COLUMNS['high'], count),
+        'low': np.fromiter((float(row[4]) for row in rows), COLUMNS['low'], count),
+        'close': np.fromiter((float(row[2]) for row in rows), COLUMNS['close'], count),
+        'volume': np.fromiter((float(row[5]) if len(row) > 5 else 0.0 for row in rows), COLUMNS['volume'], count),
+    }
+    dates = data['date']
+    if count > 1 and not (dates[1:] > dates[:-1]).all():
+        order = np.argsort(dates, kind='stable')
+        last = np.append(dates[order][1:] != dates[order][:-1], True)
+        data = {name: values[order][last] for name, values in data.items()}
+    return data
+
+
+def _select(data, mask):
+    return {name: values[mask] for name, values in data.items()}
+
+
+class BarStore:
+    """日K线列式存储，writable=True 时以独占方式打开用于写入"""
+
+    def __init__(self, path=DEFAULT_PATH, writable=False):
+        self.path = Path(path)
+        self.writable = writable
+        self._lock = threading.Lock()
+        self._lock_file = None
+        if writable:
+            self.path.mkdir(parents=True, exist_ok=True)
+            self._lock_file = open(self.path / 'lock', 'w')
+            if fcntl is not None:
+                try:
+                    fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    self._lock_file.close()
+                    raise RuntimeError(f'{self.path} 正在被其他进程写入')
+        self._load()
+
+    @classmethod
+    def open_existing(cls, path=DEFAULT_PATH):
+        """只读打开，存储不存在时返回None"""
+        if not (Path(path) / 'index.json').exists():
+            return None
+        return cls(path)
+
+    def _file(self, name, generation):
+        return self.path / f'{name}.{generation}.bin'
+
+    @staticmethod
+    def _version(stat):
+        # 索引每次提交都换成新文件，文件系统时间精度不够时靠inode区分
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _read_index(self):
+        index_path = self.path / 'index.json'
+        try:
+            mtime = self._version(index_path.stat())
+            with open(index_path, encoding='utf-8') as f:
+                index = json.load(f)
+        except FileNotFoundError:
+            return None, {'generation': 0, 'rows': 0, 'symbols': {}}
+        return mtime, index
+
+    def _map(self, generation):
+        columns = {}
+        for name, dtype in COLUMNS.items():
+            path = self._file(name, generation)
+            if path.stat().st_size < dtype.itemsize:
+                columns[name] = np.zeros(0, dtype)
+            else:
+                columns[name] = np.memmap(path, dtype, mode='r+' if self.writable else 'r')
+        return columns
+
+    def _load(self):
+        for attempt in range(3):
+            mtime, index = self._read_index()
+            if mtime is None:
+                columns = {name: np.zeros(0, dtype) for name, dtype in COLUMNS.items()}
+                break
+            try:
+                columns = self._map(index['generation'])
+                break
+            except FileNotFoundError:
+                # 读索引和映射文件之间被 compact 换成了新一代文件
+                if attempt == 2:
+                    raise
+        self._mtime = mtime
+        self.generation = index['generation']
+        self.rows = index['rows']
+        # 读取方只通过 _state 访问，整体替换，不会看到一半新一半旧的状态
+        self._state = ({symbol: tuple(entry) for symbol, entry in index['symbols'].items()}, columns)
+        # 上次提交时各股票的 (起始行, 行数, 容量)，这些行其他进程可能正在读取，不能原地改写
+        self._committed = dict(self._state[0])
+
+    def refresh(self):
+        """其他进程提交更新后重新读取索引和映射，返回是否有变化"""
+        try:
+            mtime = self._version((self.path / 'index.json').stat())
+        except FileNotFoundError:
+            mtime = None
+        if mtime == self._mtime:
+            return False
+        with self._lock:
+            self._load()
+        return True
+
+    def __len__(self):
+        return len(self._state[0])
+
+    def __contains__(self, symbol):
+        return symbol in self._state[0]
+
+    def symbols(self):
+        return list(self._state[0])
+
+    def get(self, symbol, start=None, end=None):
+        """返回 {列名: 数组}，为映射文件上的视图，不复制数据；start/end 为包含在内的日期，股票不在库中时返回None"""
+        offsets, columns = self._state
+        entry = offsets.get(symbol)
+        if entry is None:
+            return None
+        begin, length = entry[0], entry[1]
+        dates = columns['date'][begin:begin + length]
+        low = int(np.searchsorted(dates, date_to_int(start))) if start else 0
+        high = int(np.searchsorted(dates, date_to_int(end), 'right')) if end else length
+        return {name: column[begin + low:begin + high] for name, column in columns.items()}
+
+    def last_date(self, symbol):
+        bars = self.get(symbol)
+        return int_to_date(bars['date'][-1]) if bars is not None and len(bars['date']) else None
+
+    def kline(self, symbol, count=None, start=None, end=None):
+        """返回与 api_server.fetch_history 相同格式的K线列表，count 为最多返回最近的根数"""
+        bars = self.get(symbol, start, end)
+        if bars is None:
+            return []
+        if count:
+            bars = {name: values[-count:] for name, values in bars.items()}
+        columns = {name: values.tolist() for name, values in bars.items()}
+        return [
+            {'date': int_to_date(day), 'open': open_, 'close': close, 'high': high, 'low': low,
+             'volume': volume, 'amount': 0}
+            for day, open_, close, high, low, volume in zip(
+                columns['date'], columns['open'], columns['close'], columns['high'], columns['low'],
+                columns['volume'])
+        ]
+
+    # ---- 写入 ----
+
+    def _check_writable(self):
+        if not self.writable:
+            raise RuntimeError('BarStore 以只读方式打开')
+
+    def _reserve(self, count):
+        """在已分配区域之后分配count行，文件不够大时扩容，返回起始行"""
+        offsets, columns = self._state
+        start = self.rows
+        needed = start + count
+        capacity = len(columns['date'])
+        if needed > capacity:
+            capacity = max(needed, capacity * 3 // 2, MIN_GROW)
+            for column in columns.values():
+                if isinstance(column, np.memmap):
+                    column.flush()
+            for name, dtype in COLUMNS.items():
+                with open(self._file(name, self.generation), 'ab') as f:
+                    f.truncate(capacity * dtype.itemsize)
+            self._state = (offsets, self._map(self.generation))
+        self.rows = needed
+        return start
+
+    def _write(self, symbol, data, keep=0):
+        """data写在股票已有前keep行之后，超出容量或会改写已提交的行时连同前keep行搬到文件末尾"""
+        offsets, columns = self._state
+        entry = offsets.get(symbol)
+        length = keep + len(data['date'])
+        committed = self._committed.get(symbol)
+        overwrites = entry is not None and committed is not None and committed[0] == entry[0] \
+            and keep < committed[1]
+        if entry is None or length > entry[2] or overwrites:
+            capacity = length + SLACK
+            start = self._reserve(capacity)
+            columns = self._state[1]
+            if keep:
+                old = entry[0]
+                for column in columns.values():
+                    column[start:start + keep] = column[old:old + keep]
+        else:
+            start, capacity = entry[0], entry[2]
+        for name, values in data.items():
+            columns[name][start + keep:start + length] = values
+        offsets[symbol] = (start, length, capacity)
+
+    def append(self, symbol, rows):
+        """追加K线：早于库中最后一根的跳过，同一天且有变化的替换最后一根（盘中K线会变化），返回写入的根数
+
+        最后一根已提交且有变化时整只股票搬到新区域再写，读取方不会看到改了一半的K线
+        """
+        self._check_writable()
+        data = parse_rows(rows)
+        with self._lock:
+            entry = self._state[0].get(symbol)
+            keep = entry[1] if entry is not None else 0
+            if keep:
+                last = self._state[1]['date'][entry[0] + keep - 1]
+                data = _select(data, data['date'] >= last)
+                if len(data['date']) and data['date'][0] == last:
+                    # 增量更新总会重新取到最后一根，没有变化时跳过，不必搬走整只股票
+                    row = entry[0] + keep - 1
+                    if all(self._state[1][name][row] == values[0] for name, values in data.items()):
+                        data = {name: values[1:] for name, values in data.items()}
+                    else:
+                        keep -= 1
+            if len(data['date']):
+                self._write(symbol, data, keep)
+        return len(data['date'])
+
+    def replace(self, symbol, rows):
+        """整段替换一只股票的K线（如除权后前复权价格整体变化），写到新区域，读取方不会看到写了一半的数据"""
+        self._check_writable()
+        data = parse_rows(rows)
+        with self._lock:
+            offsets = self._state[0]
+            offsets.pop(symbol, None)
+            self._write(symbol, data)
+        return len(data['date'])
+
+    def commit(self):
+        """数据写回磁盘后原子替换索引，其他进程 refresh 后可见"""
+        self._check_writable()
+        with self._lock:
+            offsets, columns = self._state
+            for column in columns.values():
+                if isinstance(column, np.memmap):
+                    column.flush()
+            index = {
+                'version': 1,
+                'generation': self.generation,
+                'rows': self.rows,
+                'columns': {name: dtype.str for name, dtype in COLUMNS.items()},
+                'updated': time.strftime('%Y-%m-%d %H:%M:%S'),
+                'symbols': {symbol: list(entry) for symbol, entry in offsets.items()},
+            }
+            if not write_json_atomic(str(self.path / 'index.json'), index):
+                raise OSError(f'写入 {self.path / "index.json"} 失败')
+            self._mtime = self._version((self.path / 'index.json').stat())
+            self._committed = dict(offsets)
+
+    def compact(self, slack=SLACK):
+        """按股票代码顺序重写到新一代数据文件，回收重新分配留下的空洞，返回回收的行数"""
+        self._check_writable()
+        with self._lock:
+            offsets, columns = self._state
+            old_generation, old_rows = self.generation, self.rows
+            generation = old_generation + 1
+            layout = {}
+            rows = 0
+            for symbol in sorted(offsets):
+                length = offsets[symbol][1]
+                layout[symbol] = (rows, length, length + slack)
+                rows += length + slack
+            for name, dtype in COLUMNS.items():
+                target = self._file(name, generation)
+                with open(target, 'wb') as f:
+                    f.truncate(max(rows, 1) * dtype.itemsize)
+                new = np.memmap(target, dtype, mode='r+')
+                for symbol, (start, length, _) in layout.items():
+                    old = offsets[symbol][0]
+                    new[start:start + length] = columns[name][old:old + length]
+                new.flush()
+                del new
+            self.generation, self.rows = generation, rows
+            self._state = (dict(layout), self._map(generation))
+        self.commit()
+        for name in COLUMNS:
+            try:
+                # 已映射旧文件的进程仍可读取，直到下次 refresh
+                self._file(name, old_generation).unlink()
+            except OSError:
+                pass
+        return old_rows - rows
+
+    def stats(self):
+        offsets, columns = self._state
+        bars = sum(entry[1] for entry in offsets.values())
+        reserved = sum(entry[2] for entry in offsets.values())
+        size = sum(column.nbytes for column in columns.values())
+        return {'symbols': len(offsets), 'bars': bars, 'reserved': reserved, 'allocated': self.rows,
+                'file_rows': len(columns['date']), 'size_mb': round(size / 1024 / 1024, 1)}
+
+    def close(self):
+        self._state = ({}, {})
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+
+def resolve_codes(spec):
+    """hot / extended / all（代码表中的全部股票）或逗号分隔的代码"""
+    from stock_lists import HOT_STOCKS, get_extended_stock_list
+    codes = []
+    for item in (part.strip() for part in spec.split(',')):
+        if item == 'hot':
+            codes.extend(code for code, _ in HOT_STOCKS)
+        elif item == 'extended':
+            codes.extend(code for code, _ in get_extended_stock_list())
+        elif item == 'all':
+            codes.extend(record[0] for record in symbol_master.get_master().records)
+        elif item:
+            codes.append(item)
+    return list(dict.fromkeys(codes))
+
+
+def fetch_rows(symbol, count):
+    rows, _ = market_data.fetch('fetch_kline', symbol, count)
+    return rows
+
+
+def adjusted(store, symbol, data):
+    """新取到的K线与库中同一天（最后一根除外）的收盘价不同时，说明前复权价格已变化"""
+    bars = store.get(symbol)
+    stored_dates = bars['date'][:-1]
+    common, stored_at, fetched_at = np.intersect1d(stored_dates, data['date'], return_indices=True)
+    return bool(len(common)) and not np.allclose(bars['close'][stored_at], data['close'][fetched_at],
+                                                 rtol=0, atol=1e-6)
+
+
+def update(store, codes, workers=4):
+    """增量更新：库中已有的股票只取最后一根之后的K线（多取几根用于比对），前复权价格变化时整段替换"""
+    started = time.perf_counter()
+    today = date.today()
+    plan = {}
+    for code in codes:
+        symbol = resolve_symbol(code)[0]
+        last = store.last_date(symbol)
+        if last is None:
+            plan[symbol] = FULL_HISTORY
+        else:
+            gap = (today - date.fromisoformat(last)).days
+            plan[symbol] = min(FULL_HISTORY, max(gap, 1) + OVERLAP)
+
+    written = replaced = failed = 0
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bar-store') as executor:
+        futures = {executor.submit(fetch_rows, symbol, count): symbol for symbol, count in plan.items()}
+        for done, future in enumerate(as_completed(futures), 1):
+            symbol = futures[future]
+            try:
+                rows = future.result()
+                if not rows:
+                    continue
+                if symbol not in store:
+                    store.replace(symbol, rows)
+                elif adjusted(store, symbol, parse_rows(rows)):
+                    store.replace(symbol, fetch_rows(symbol, FULL_HISTORY))
+                    replaced += 1
+                else:
+                    store.append(symbol, rows)
+                written += 1
+            except Exception as e:
+                failed += 1
+                print(f"[K线库] {symbol} 更新失败: {e}")
+            if done % COMMIT_EVERY == 0:
+                store.commit()
+                print(f"[K线库] 进度 {done}/{len(plan)}")
+    store.commit()
+    print(f"[K线库] {len(plan)} 只股票，更新 {written} 只（复权变化整段替换 {replaced} 只），"
+          f"失败 {failed} 只，耗时 {time.perf_counter() - started:.1f} 秒")
+
+
+def main(argv):
+    command = argv[0] if argv else 'stats'
+    if command == 'update':
+        store = BarStore(writable=True)
+        try:
+            update(store, resolve_codes(argv[1] if len(argv) > 1 else 'all'))
+        finally:
+            store.close()
+    elif command == 'compact':
+        store = BarStore(writable=True)
+        try:
+            print(f"[K线库] 回收 {store.compact()} 行")
+        finally:
+            store.close()
+    elif command == 'stats':
+        store = BarStore()
+        print(f"[K线库] {store.path}: {store.stats()}")
+    else:
+        print(__doc__)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
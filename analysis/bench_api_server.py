@@ -0,0 +1,476 @@
+#!/usr/bin/env python3
+"""
+api_server 压测脚本
+在本地启动模拟的腾讯行情/K线接口（回放录制的响应，可配置延迟和错误率），
+把 api_server 指向它后发起并发请求，输出冷缓存、热缓存、混合三种场景的吞吐和延迟分位数。
+全程不访问真实接口，可离线比较性能改动前后的差异。
+
+用法:
+    python bench_api_server.py                                   # 使用合成数据
+    python bench_api_server.py --record recording.json           # 从真实接口录制响应（需联网）
+    python bench_api_server.py --replay recording.json --latency 50 --error-rate 0.01
+"""
+
+import argparse
+import datetime
+import http.client
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import tencent_client
+from symbol_master import resolve_symbol
+
+SERVER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'api_server.py')
+KLINE_PATH = '/appstock/app/fqkline/get'
+KLINE_COUNT = 320
+END_DATE = datetime.date(2025, 6, 30)  # 合成K线的最后一个交易日，固定下来保证每次数据一致
+# 压测客户端都来自同一IP，默认关闭api_server的按客户端限速和上游限速；
+# 模拟上游只实现了腾讯接口，关闭备用数据源，避免注入的错误把请求转到真实的东方财富接口；
+# 代码表不下载，缺少 data/symbols.json 时用内置股票池，压测全程不访问真实接口
+DEFAULT_SERVER_ARGS = ('--client-rate', '0', '--upstream-rate', '0', '--no-fallback', '--symbols-max-age', '-1')
+
+RECORD_CODES = ['600519', '000858', '300750', '601318', '600036', '000001', '002594', '688981',
+                '601012', '000333', '300308', '600030', '002415', '601899', '600900', '000063']
+
+
+def make_universe(size):
+    """生成压测用的股票代码：沪市主板、深市主板、创业板轮流取"""
+    prefixes = ['600', '000', '300', '601', '002', '603']
+    codes = []
+    for i in range(size):
+        prefix = prefixes[i % len(prefixes)]
+        codes.append(f'{prefix}{i // len(prefixes) + 1:03d}')
+    return codes
+
+
+def synthetic_kline(symbol, count=KLINE_COUNT):
+    """按股票代码生成固定的随机游走日K线（腾讯接口的行格式）"""
+    rng = random.Random(symbol)
+    price = rng.uniform(5, 200)
+    rows = []
+    day = END_DATE
+    while len(rows) < count:
+        if day.weekday() < 5:
+            open_price = price
+            close = max(0.5, open_price * (1 + rng.gauss(0, 0.02)))
+            high = max(open_price, close) * (1 + abs(rng.gauss(0, 0.01)))
+            low = min(open_price, close) * (1 - abs(rng.gauss(0, 0.01)))
+            volume = rng.randint(10000, 2000000)
+            rows.append([day.isoformat(), f'{open_price:.2f}', f'{close:.2f}', f'{high:.2f}',
+                         f'{low:.2f}', str(volume)])
+            price = close
+        day -= datetime.timedelta(days=1)
+    rows.reverse()
+    return rows
+
+
+class Recording:
+    """录制的上游响应，未录制的股票用合成数据补齐"""
+
+    def __init__(self, quotes=None, klines=None):
+        self.quotes = quotes or {}   # symbol -> 行情原始行（不含结尾分号）
+        self.klines = klines or {}   # symbol -> K线接口原始响应文本
+        self._rows = {}              # symbol -> 解析后的K线，合成行情时只解析或生成一次
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # 传给模拟上游子进程时不带锁和解析缓存
+        return {'quotes': self.quotes, 'klines': self.klines}
+
+    def __setstate__(self, state):
+        self.__init__(state['quotes'], state['klines'])
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(data.get('quotes'), data.get('klines'))
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'quotes': self.quotes, 'klines': self.klines}, f, ensure_ascii=False)
+
+    def symbols(self):
+        return sorted(set(self.quotes) & set(self.klines))
+
+    def quote_line(self, symbol):
+        line = self.quotes.get(symbol)
+        if line is None:
+            rows = self._kline_rows(symbol)
+            close, prev_close = rows[-1][2], rows[-2][2]
+            line = f'v_{symbol}="1~测试{symbol[2:]}~{symbol[2:]}~{close}~{prev_close}~0~0~0"'
+            with self._lock:
+                self.quotes[symbol] = line
+        return line
+
+    def kline_body(self, symbol):
+        body = self.klines.get(symbol)
+        if body is None:
+            body = json.dumps({'code': 0, 'data': {symbol: {'qfqday': self._kline_rows(symbol)}}})
+            with self._lock:
+                self.klines[symbol] = body
+        return body
+
+    def _kline_rows(self, symbol):
+        rows = self._rows.get(symbol)
+        if rows is None:
+            body = self.klines.get(symbol)
+            rows = json.loads(body)['data'][symbol]['qfqday'] if body is not None else synthetic_kline(symbol)
+            with self._lock:
+                self._rows[symbol] = rows
+        return rows
+
+
+def record(codes, path):
+    """从真实接口录制行情和K线响应"""
+    client = tencent_client.get_client()
+    recording = Recording()
+    for code in codes:
+        symbol, _ = resolve_symbol(code)
+        try:
+            quote = client.get_text(tencent_client.QUOTE_HOST, f'/q={symbol}')
+            kline = client.get_text(tencent_client.KLINE_HOST,
+                                    f'{KLINE_PATH}?param={symbol},day,,,{KLINE_COUNT},qfq')
+        except tencent_client.UpstreamError as e:
+            print(f"[录制] {code} 失败: {e}")
+            continue
+        line = quote.strip().rstrip(';').strip()
+        if line.startswith('v_'):
+            recording.quotes[symbol] = line
+            recording.klines[symbol] = kline
+            print(f"[录制] {code} 完成")
+    recording.save(path)
+    print(f"[录制] 共 {len(recording.symbols())} 只股票，已保存到 {path}")
+
+
+class FakeUpstreamHandler(BaseHTTPRequestHandler):
+    """模拟 qt.gtimg.cn 和 web.ifzq.gtimg.cn，支持keep-alive"""
+
+    protocol_version = 'HTTP/1.1'
+    # 响应头和正文分两次写出，长连接上 Nagle 加延迟确认会让每个复用连接的请求多等约40ms
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        server = self.server
+        server.count_request()
+        delay = server.latency + random.uniform(0, server.jitter)
+        if delay > 0:
+            time.sleep(delay)
+        if random.random() < server.error_rate:
+            self.send_body(502, b'bad gateway', 'text/plain')
+            return
+
+        parsed = urllib.parse.urlparse(self.path)
+        if parsed.path.startswith('/q='):
+            symbols = [s for s in parsed.path[3:].split(',') if s]
+            content = ''.join(f'{server.recording.quote_line(s)};\n' for s in symbols)
+            self.send_body(200, content.encode('gbk', errors='replace'), 'text/html; charset=GBK')
+        elif parsed.path == KLINE_PATH:
+            param = urllib.parse.parse_qs(parsed.query).get('param', [''])[0]
+            symbol = param.split(',')[0]
+            body = server.recording.kline_body(symbol).encode('utf-8')
+            self.send_body(200, body, 'application/json; charset=utf-8')
+        else:
+            self.send_body(404, b'not found', 'text/plain')
+
+    def send_body(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeUpstreamServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, recording, latency=0.0, jitter=0.0, error_rate=0.0, counter=None):
+        super().__init__(('127.0.0.1', 0), FakeUpstreamHandler)
+        self.recording = recording
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.counter = counter if counter is not None else multiprocessing.Value('q', 0)
+
+    @property
+    def address(self):
+        return f'127.0.0.1:{self.server_address[1]}'
+
+    @property
+    def requests(self):
+        return self.counter.value
+
+    def count_request(self):
+        with self.counter.get_lock():
+            self.counter.value += 1
+
+
+def _serve_upstream(recording, latency, jitter, error_rate, counter, ready):
+    server = FakeUpstreamServer(recording, latency, jitter, error_rate, counter)
+    ready.send(server.server_address[1])
+    ready.close()
+    server.serve_forever()
+
+
+class FakeUpstreamProcess:
+    """在独立进程中运行模拟上游，不和压测客户端争抢同一个GIL"""
+
+    def __init__(self, recording, latency=0.0, jitter=0.0, error_rate=0.0):
+        self.counter = multiprocessing.Value('q', 0)
+        receiver, sender = multiprocessing.Pipe(duplex=False)
+        self.process = multiprocessing.Process(
+            target=_serve_upstream, args=(recording, latency, jitter, error_rate, self.counter, sender),
+            daemon=True)
+        self.process.start()
+        sender.close()
+        if not receiver.poll(15):
+            self.close()
+            raise RuntimeError('模拟上游启动超时')
+        self.port = receiver.recv()
+        receiver.close()
+
+    @property
+    def address(self):
+        return f'127.0.0.1:{self.port}'
+
+    @property
+    def requests(self):
+        return self.counter.value
+
+    def close(self):
+        self.process.terminate()
+        self.process.join(5)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class ApiServerProcess:
+    """以子进程方式启动 api_server，每个场景使用独立的进程和缓存目录"""
+
+    def __init__(self, upstream, workers=16, processes=1, extra_args=()):
+        self.port = free_port()
+        self.cache_dir = tempfile.mkdtemp(prefix='stock_bench_')
+        self.args = [
+            sys.executable, SERVER_SCRIPT,
+            '--port', str(self.port),
+            '--workers', str(workers),
+            '--processes', str(processes),
+            '--cache-dir', self.cache_dir,
+            '--quote-host', upstream.address,
+            '--kline-host', upstream.address,
+            *extra_args,
+        ]
+        self.process = None
+
+    def __enter__(self):
+        self.process = subprocess.Popen(self.args, cwd=os.path.dirname(SERVER_SCRIPT),
+                                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        deadline = time.monotonic() + 15
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f'api_server 启动失败，退出码 {self.process.returncode}')
+            try:
+                conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=1)
+                conn.request('GET', '/metrics')
+                conn.getresponse().read()
+                conn.close()
+                return self
+            except OSError:
+                time.sleep(0.1)
+        self.__exit__(None, None, None)
+        raise RuntimeError('api_server 启动超时')
+
+    def __exit__(self, exc_type, exc, tb):
+        self.process.terminate()
+        try:
+            self.process.wait(5)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(p / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run_load(port, paths, concurrency):
+    """用concurrency个长连接并发请求paths，返回吞吐和延迟统计"""
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    position = iter(range(len(paths)))
+
+    def worker():
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        local = []
+        local_errors = 0
+        while True:
+            with lock:
+                index = next(position, None)
+            if index is None:
+                break
+            started = time.perf_counter()
+            try:
+                conn.request('GET', paths[index], headers={'Accept-Encoding': 'gzip'})
+                response = conn.getresponse()
+                response.read()
+                if response.status >= 400:
+                    local_errors += 1
+                if response.will_close:
+                    conn.close()
+            except (http.client.HTTPException, OSError):
+                local_errors += 1
+                conn.close()
+            local.append(time.perf_counter() - started)
+        conn.close()
+        with lock:
+            latencies.extend(local)
+            errors[0] += local_errors
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': errors[0],
+        'seconds': round(elapsed, 3),
+        'rps': round(len(latencies) / elapsed, 1) if elapsed > 0 else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+def kline_path(code, fmt='rows'):
+    path = f'/api/kline?code={code}'
+    return path if fmt == 'rows' else f'{path}&format={fmt}'
+
+
+def build_workload(name, hot, universe, count, rng):
+    """返回 (预热请求, 压测请求)"""
+    if name == 'cold':
+        # 每个请求都是不同的股票，全部未命中缓存
+        return [], [kline_path(code) for code in universe[:count]]
+
+    warmup = [kline_path(code) for code in hot]
+    if name == 'warm':
+        return warmup, [kline_path(rng.choice(hot)) for _ in range(count)]
+
+    # 混合：以热门股票为主，夹杂不同格式、指标、批量查询和少量冷门股票
+    cold = universe[len(hot):]
+    paths = []
+    for _ in range(count):
+        roll = rng.random()
+        if roll < 0.6:
+            paths.append(kline_path(rng.choice(hot), rng.choice(('rows', 'columnar', 'binary'))))
+        elif roll < 0.7:
+            paths.append(f'/api/indicators?code={rng.choice(hot)}&set=ma5,ma20,macd&count=120')
+        elif roll < 0.8:
+            paths.append(f'/api/kline?code={rng.choice(hot)}&period=week')
+        elif roll < 0.9:
+            codes = ','.join(rng.sample(hot, min(20, len(hot))))
+            paths.append(f'/api/batch?codes={codes}&kline=0')
+        else:
+            paths.append(kline_path(rng.choice(cold)))
+    return warmup, paths
+
+
+def run_benchmark(args):
+    recording = Recording.load(args.replay) if args.replay else Recording()
+    upstream = FakeUpstreamProcess(recording, args.latency / 1000, args.jitter / 1000, args.error_rate)
+
+    recorded = [symbol[2:] for symbol in recording.symbols()]
+    universe = list(dict.fromkeys(recorded + make_universe(args.requests + args.hot)))
+    hot = universe[:args.hot]
+    rng = random.Random(args.seed)
+
+    print(f"模拟上游: {upstream.address}，延迟 {args.latency}ms(+{args.jitter}ms)，错误率 {args.error_rate}")
+    print(f"api_server: 工作进程 {args.processes}，工作线程 {args.workers}；并发 {args.concurrency}")
+    results = {}
+    try:
+        for name in args.workloads.split(','):
+            warmup, paths = build_workload(name, hot, universe, args.requests, rng)
+            server_args = [*DEFAULT_SERVER_ARGS, *(args.server_args or '').split()]
+            with ApiServerProcess(upstream, args.workers, args.processes, server_args) as server:
+                if warmup:
+                    run_load(server.port, warmup, args.concurrency)
+                upstream_before = upstream.requests
+                result = run_load(server.port, paths, args.concurrency)
+                result['upstream_requests'] = upstream.requests - upstream_before
+            results[name] = result
+            print(f"[{name}] 完成 {result['requests']} 个请求")
+    finally:
+        upstream.close()
+    print_report(results)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'config': vars(args), 'results': results}, f, ensure_ascii=False, indent=2)
+        print(f"结果已保存到 {args.output}")
+    return results
+
+
+def print_report(results):
+    header = f"{'场景':<8}{'请求数':>8}{'错误':>6}{'req/s':>10}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}{'上游请求':>10}"
+    print('=' * 72)
+    print(header)
+    print('-' * 72)
+    for name, r in results.items():
+        print(f"{name:<10}{r['requests']:>8}{r['errors']:>6}{r['rps']:>10}{r['p50_ms']:>10}"
+              f"{r['p95_ms']:>10}{r['p99_ms']:>10}{r['upstream_requests']:>10}")
+    print('=' * 72)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='api_server 压测（使用本地模拟的腾讯接口）')
+    parser.add_argument('--record', metavar='FILE', help='从真实接口录制响应到文件后退出')
+    parser.add_argument('--codes', default=','.join(RECORD_CODES), help='录制的股票代码，逗号分隔')
+    parser.add_argument('--replay', metavar='FILE', help='回放录制的响应，未录制的股票使用合成数据')
+    parser.add_argument('--workloads', default='cold,warm,mixed', help='要运行的场景: cold,warm,mixed')
+    parser.add_argument('--requests', type=int, default=2000, help='每个场景的请求数')
+    parser.add_argument('--concurrency', type=int, default=32, help='并发连接数')
+    parser.add_argument('--hot', type=int, default=50, help='热门股票数（热缓存和混合场景使用）')
+    parser.add_argument('--latency', type=float, default=20, help='模拟上游的固定延迟（毫秒）')
+    parser.add_argument('--jitter', type=float, default=10, help='模拟上游的随机附加延迟上限（毫秒）')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='模拟上游返回502的概率')
+    parser.add_argument('--workers', type=int, default=16, help='api_server 工作线程数')
+    parser.add_argument('--processes', type=int, default=1, help='api_server 工作进程数')
+    parser.add_argument('--server-args', help='传给api_server的其他参数，如 "--upstream-rate 20 --max-queue 32"')
+    parser.add_argument('--seed', type=int, default=1, help='随机种子')
+    parser.add_argument('--output', metavar='FILE', help='把结果保存为JSON')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    if args.record:
+        record([c.strip() for c in args.codes.split(',') if c.strip()], args.record)
+    else:
+        run_benchmark(args)
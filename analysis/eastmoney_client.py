@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+东方财富行情接口客户端
+腾讯接口失败或熔断时的备用数据源，fetch_quotes / fetch_kline 的返回格式与 TencentClient 相同
+"""
+
+import json
+import os
+import threading
+
+import metrics
+from tencent_client import UpstreamClient, UpstreamError
+
+QUOTE_HOST = 'push2.eastmoney.com'
+KLINE_HOST = 'push2his.eastmoney.com'
+QUOTE_BATCH_SIZE = 100
+
+KLINE_TYPES = {'day': 101, 'week': 102, 'month': 103}
+ADJUST_TYPES = {'': 0, 'qfq': 1, 'hfq': 2}
+
+
+def secid(symbol):
+    """'sh600519' -> '1.600519'，深圳和北京的股票市场编号为0"""
+    return f"{1 if symbol.startswith('sh') else 0}.{symbol[2:]}"
+
+
+class EastmoneyClient(UpstreamClient):
+    """东方财富行情接口客户端，其他参数见 UpstreamClient"""
+
+    def __init__(self, pool_size=4, timeout=10, quote_host=QUOTE_HOST, kline_host=KLINE_HOST, **kwargs):
+        super().__init__(pool_size, timeout, **kwargs)
+        self.quote_host = quote_host
+        self.kline_host = kline_host
+
+    def _get_data(self, host, path):
+        content = self.get_text(host, path, 'utf-8')
+        try:
+            data = json.loads(content)
+        except ValueError as e:
+            metrics.UPSTREAM_ERRORS.inc(host=host, cause='parse')
+            raise UpstreamError(f"{host} 数据解析失败") from e
+        return (data.get('data') if isinstance(data, dict) else None) or {}
+
+    def fetch_quotes(self, symbols):
+        """批量获取实时行情，返回 {symbol: quote}，不存在或停牌无价格的代码不在结果中"""
+        quotes = {}
+        for i in range(0, len(symbols), QUOTE_BATCH_SIZE):
+            chunk = {secid(symbol): symbol for symbol in symbols[i:i + QUOTE_BATCH_SIZE]}
+            data = self._get_data(self.quote_host,
+                                  f"/api/qt/ulist.np/get?fltt=2&invt=2&fields=f2,f3,f12,f13,f14"
+                                  f"&secids={','.join(chunk)}")
+            items = data.get('diff') or []
+            if isinstance(items, dict):
+                items = list(items.values())
+            for item in items:
+                symbol = chunk.get(f"{item.get('f13')}.{item.get('f12')}")
+                price, change = item.get('f2'), item.get('f3')
+                if symbol is None or not isinstance(price, (int, float)):
+                    continue
+                quotes[symbol] = {
+                    'name': item.get('f14', ''),
+                    'price': float(price),
+                    'change': round(float(change), 2) if isinstance(change, (int, float)) else 0,
+                }
+        return quotes
+
+    def fetch_kline(self, symbol, count=320, period='day', fq='qfq'):
+        """获取K线原始数据，每行格式: [日期, 开盘, 收盘, 最高, 最低, 成交量]"""
+        path = (f"/api/qt/stock/kline/get?secid={secid(symbol)}&fields1=f1,f3"
+                f"&fields2=f51,f52,f53,f54,f55,f56&klt={KLINE_TYPES[period]}&fqt={ADJUST_TYPES[fq]}"
+                f"&end=20500101&lmt={count}")
+        data = self._get_data(self.kline_host, path)
+        return [line.split(',') for line in data.get('klines') or []]
+
+
+_default_client = None
+_default_lock = threading.Lock()
+
+
+def configure(pool_size=4, timeout=10, **kwargs):
+    """替换默认客户端"""
+    global _default_client
+    with _default_lock:
+        if _default_client is not None:
+            _default_client.close()
+        _default_client = EastmoneyClient(pool_size=pool_size, timeout=timeout, **kwargs)
+        return _default_client
+
+
+def get_client():
+    """获取进程内共享的默认客户端"""
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            _default_client = EastmoneyClient()
+        return _default_client
+
+
+def _after_fork():
+    if _default_client is not None:
+        _default_client._reset_after_fork()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork)
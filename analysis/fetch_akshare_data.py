@@ -11,6 +11,8 @@ from pathlib import Path
 import warnings
 import time
 import requests
+
+import fetch_cache
 warnings.filterwarnings('ignore')
 
 # 设置请求超时和重试
@@ -31,6 +33,7 @@ def retry_request(func, max_retries=3, delay=2):
     return None
 
 
+@fetch_cache.cached('akshare', 'stock_board_industry_name_em', ttl=fetch_cache.STATIC_TTL)
 def get_sector_list():
     """获取所有行业板块列表"""
     print('正在获取行业板块列表...')
@@ -44,6 +47,7 @@ def get_sector_list():
     return None
 
 
+@fetch_cache.cached('akshare', 'stock_board_industry_hist_em', end='end_date')
 def get_sector_history(sector_name, start_date, end_date):
     """获取单个板块的历史数据"""
     try:
@@ -87,7 +91,9 @@ def get_top3_stocks_simple():
     print('\n正在获取股票数据...')
     
     try:
-        df = retry_request(lambda: ak.stock_zh_a_spot_em())
+        # 实时行情快照，只缓存一分钟
+        df = fetch_cache.fetch('akshare', 'stock_zh_a_spot_em', {}, lambda: retry_request(ak.stock_zh_a_spot_em),
+                               ttl=fetch_cache.SPOT_TTL)
         if df is None:
             return {}
         df = df.sort_values('成交额', ascending=False).head(80)
@@ -102,13 +108,10 @@ def get_top3_stocks_simple():
     
     for i, (code, name) in enumerate(stocks):
         try:
-            hist = ak.stock_zh_a_hist(
-                symbol=code,
-                period="monthly",
-                start_date="20230101",
-                end_date=datetime.now().strftime('%Y%m%d'),
-                adjust="qfq"
-            )
+            params = dict(symbol=code, period="monthly", start_date="20230101",
+                          end_date=datetime.now().strftime('%Y%m%d'), adjust="qfq")
+            hist = fetch_cache.fetch('akshare', 'stock_zh_a_hist', params, lambda: ak.stock_zh_a_hist(**params),
+                                     end_date=params['end_date'])
             
             if hist is not None and not hist.empty:
                 hist = hist.copy()
@@ -10,19 +10,16 @@ from datetime import datetime
 from pathlib import Path
 from collections import defaultdict
 import warnings
+from fetch_cache import BAOSTOCK_MONTHLY_FIELDS, STATIC_TTL, baostock_query
 warnings.filterwarnings('ignore')
 
 
 def get_industry_stocks():
     """获取所有股票的行业分类"""
     print('正在获取行业分类数据...')
-    rs = bs.query_stock_industry()
+    fields, data = baostock_query('query_stock_industry', ttl=STATIC_TTL) or ([], [])
     
-    data = []
-    while rs.next():
-        data.append(rs.get_row_data())
-    
-    df = pd.DataFrame(data, columns=rs.fields)
+    df = pd.DataFrame(data, columns=fields or ['code', 'industry'])
     df = df[df['industry'] != '']  # 过滤空行业
     
     # 按行业分组
@@ -41,25 +38,27 @@ def get_industry_stocks():
     return industry_stocks
 
 
-def get_stock_monthly_data(code, start_date, end_date):
-    """获取单只股票的月度数据"""
-    rs = bs.query_history_k_data_plus(
-        code,
-        "date,open,close",
+def query_monthly(code, start_date, end_date):
+    """月K线原始数据 (字段列表, 行列表)，与 fetch_sector_data.py 共用缓存"""
+    return baostock_query(
+        'query_history_k_data_plus',
+        end='end_date',
+        code=code,
+        fields=BAOSTOCK_MONTHLY_FIELDS,
         start_date=start_date,
         end_date=end_date,
         frequency="m",  # 月度
         adjustflag="2"  # 前复权
     )
-    
-    data = []
-    while rs.next():
-        data.append(rs.get_row_data())
-    
-    if not data:
+
+
+def get_stock_monthly_data(code, start_date, end_date):
+    """获取单只股票的月度数据"""
+    result = query_monthly(code, start_date, end_date)
+    if result is None:
         return None
     
-    df = pd.DataFrame(data, columns=['date', 'open', 'close'])
+    df = pd.DataFrame(result[1], columns=result[0])
     df['open'] = pd.to_numeric(df['open'], errors='coerce')
     df['close'] = pd.to_numeric(df['close'], errors='coerce')
     df['year_month'] = pd.to_datetime(df['date']).dt.strftime('%Y-%m')
@@ -111,20 +110,33 @@ def calculate_industry_returns(industry_stocks, start_date, end_date):
     return industry_returns
 
 
+def get_hs300_stocks():
+    """获取沪深300成分股"""
+    result = baostock_query('query_hs300_stocks', ttl=STATIC_TTL)
+    if result is None:
+        return None
+    return pd.DataFrame(result[1], columns=result[0])
+
+
+def get_stock_monthly_close(code, start_date, end_date):
+    """获取单只股票的月末收盘价，与月度涨幅是同一次查询"""
+    result = query_monthly(code, start_date, end_date)
+    if result is None:
+        return []
+    fields, rows = result
+    date_index, close_index = fields.index('date'), fields.index('close')
+    return [[row[date_index], row[close_index]] for row in rows]
+
+
 def get_top_stocks(start_date, end_date):
     """获取每月涨幅前3的股票"""
     print('正在获取Top股票数据...')
     
     # 获取沪深300成分股作为样本
-    rs = bs.query_hs300_stocks()
-    stocks = []
-    while rs.next():
-        stocks.append(rs.get_row_data())
-    
-    if not stocks:
+    stock_df = get_hs300_stocks()
+    if stock_df is None:
         return {}
     
-    stock_df = pd.DataFrame(stocks, columns=rs.fields)
     stock_list = stock_df[['code', 'code_name']].values.tolist()[:100]  # 取前100只
     
     print(f'获取到 {len(stock_list)} 只股票')
@@ -141,14 +153,7 @@ def get_top_stocks(start_date, end_date):
                 df['name'] = name
                 
                 # 获取收盘价
-                rs = bs.query_history_k_data_plus(
-                    code, "date,close",
-                    start_date=start_date, end_date=end_date,
-                    frequency="m", adjustflag="2"
-                )
-                prices = []
-                while rs.next():
-                    prices.append(rs.get_row_data())
+                prices = get_stock_monthly_close(code, start_date, end_date)
                 if prices:
                     price_df = pd.DataFrame(prices, columns=['date', 'close'])
                     price_df['year_month'] = pd.to_datetime(price_df['date']).dt.strftime('%Y-%m')
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+数据脚本共用的本地请求缓存
+fetch_*.py 调用 Baostock、AkShare、腾讯接口时先查本地SQLite缓存，
+重复运行或多个脚本请求相同数据时直接读磁盘，不再访问网络。
+
+- 缓存key为 (数据源, 接口, 规范化后的参数) 的哈希，日期参数统一为 YYYY-MM-DD
+- 结果按内容哈希存储，不同请求得到相同数据时只存一份
+- 有效期取决于日期区间：结束日期早于今天的已收盘区间保存较久，包含今天或不限结束日期的较短
+- 环境变量 FETCH_CACHE=0 关闭缓存，FETCH_CACHE_REFRESH=1 忽略已有缓存重新下载并写回
+
+查看和清理缓存:
+    python fetch_cache.py stats
+    python fetch_cache.py prune    # 删除过期条目
+    python fetch_cache.py clear
+"""
+
+import functools
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import re
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+from datetime import date, datetime
+from pathlib import Path
+
+DEFAULT_PATH = Path(os.environ.get('FETCH_CACHE_PATH')
+                    or Path(__file__).resolve().parent / 'data' / 'fetch_cache.sqlite')
+
+CLOSED_TTL = 30 * 86400  # 已收盘区间：前复权数据在分红除权后会改写，不永久保存
+OPEN_TTL = 6 * 3600      # 包含今天的区间
+STATIC_TTL = 86400       # 行业分类、板块列表、成分股等
+SPOT_TTL = 60            # 实时行情快照：只在短时间内重跑时复用，不会拿到盘中的旧价格
+
+DATE_PATTERN = re.compile(r'(\d{4})-?(\d{2})-?(\d{2})')
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    provider TEXT NOT NULL,
+    endpoint TEXT NOT NULL,
+    params TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    stored_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS blobs (
+    digest TEXT PRIMARY KEY,
+    data BLOB NOT NULL
+);
+'''
+
+
+def normalize(value):
+    """参数规范化：日期字符串统一为 YYYY-MM-DD，日期对象转字符串，容器递归处理"""
+    if isinstance(value, (date, datetime)):
+        return value.strftime('%Y-%m-%d')
+    if isinstance(value, str):
+        value = value.strip()
+        match = DATE_PATTERN.fullmatch(value)
+        return '-'.join(match.groups()) if match else value
+    if isinstance(value, (list, tuple)):
+        return [normalize(item) for item in value]
+    if isinstance(value, dict):
+        return {str(key): normalize(item) for key, item in value.items()}
+    return value
+
+
+def range_ttl(end_date):
+    """按区间结束日期决定有效期，没有结束日期时视为到今天为止"""
+    end = normalize(end_date) if end_date else ''
+    if isinstance(end, str) and DATE_PATTERN.fullmatch(end) and end < date.today().strftime('%Y-%m-%d'):
+        return CLOSED_TTL
+    return OPEN_TTL
+
+
+def _is_empty(value):
+    if value is None:
+        return True
+    try:
+        return len(value) == 0
+    except TypeError:
+        return False
+
+
+class FetchCache:
+    """SQLite存储的请求缓存，每个线程一个连接，可被多个脚本进程同时使用"""
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = Path(path)
+        self._local = threading.local()
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def make_key(provider, endpoint, params):
+        text = json.dumps([provider, endpoint, normalize(params)], ensure_ascii=False, sort_keys=True,
+                          default=str)
+        return hashlib.sha256(text.encode('utf-8')).hexdigest(), text
+
+    def get(self, provider, endpoint, params):
+        """读取未过期的缓存，没有时返回None"""
+        key, _ = self.make_key(provider, endpoint, params)
+        row = self._conn().execute(
+            'SELECT b.data FROM entries e JOIN blobs b ON b.digest = e.digest '
+            'WHERE e.key = ? AND e.expires_at > ?', (key, time.time())).fetchone()
+        return pickle.loads(zlib.decompress(row[0])) if row else None
+
+    def set(self, provider, endpoint, params, value, ttl):
+        key, text = self.make_key(provider, endpoint, params)
+        data = zlib.compress(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+        digest = hashlib.sha256(data).hexdigest()
+        now = time.time()
+        with self._conn() as conn:
+            conn.execute('INSERT OR IGNORE INTO blobs (digest, data) VALUES (?, ?)', (digest, data))
+            conn.execute('INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)',
+                         (key, provider, endpoint, text, digest, now, now + ttl))
+
+    def prune(self, everything=False):
+        """删除过期（everything=True时为全部）条目和不再被引用的数据，返回删除的条目数"""
+        with self._conn() as conn:
+            if everything:
+                deleted = conn.execute('DELETE FROM entries').rowcount
+            else:
+                deleted = conn.execute('DELETE FROM entries WHERE expires_at <= ?', (time.time(),)).rowcount
+            conn.execute('DELETE FROM blobs WHERE digest NOT IN (SELECT digest FROM entries)')
+        self._conn().execute('VACUUM')
+        return deleted
+
+    def stats(self):
+        conn = self._conn()
+        by_provider = conn.execute(
+            'SELECT provider, endpoint, COUNT(*), SUM(expires_at > ?) FROM entries '
+            'GROUP BY provider, endpoint ORDER BY provider, endpoint', (time.time(),)).fetchall()
+        blobs, size = conn.execute('SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0) FROM blobs').fetchone()
+        return by_provider, blobs, size
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def get_cache():
+    """进程内共享的默认缓存，FETCH_CACHE=0 时返回None"""
+    global _default_cache
+    if os.environ.get('FETCH_CACHE', '1') == '0':
+        return None
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = FetchCache()
+        return _default_cache
+
+
+def fetch(provider, endpoint, params, loader, ttl=None, end_date=None):
+    """先查缓存，未命中时调用loader()并写入缓存
+
+    ttl 未指定时按 end_date 决定；loader 返回None或空结果时不缓存
+    """
+    cache = get_cache()
+    if cache is None:
+        return loader()
+    if os.environ.get('FETCH_CACHE_REFRESH') != '1':
+        try:
+            value = cache.get(provider, endpoint, params)
+        except (sqlite3.Error, pickle.UnpicklingError, zlib.error) as e:
+            print(f"[请求缓存] 读取失败: {e}")
+            value = None
+        if value is not None:
+            return value
+    value = loader()
+    if not _is_empty(value):
+        try:
+            cache.set(provider, endpoint, params, value, ttl if ttl is not None else range_ttl(end_date))
+        except (sqlite3.Error, pickle.PicklingError) as e:
+            print(f"[请求缓存] 写入失败: {e}")
+    return value
+
+
+def baostock_query(method, ttl=None, end=None, **params):
+    """调用 bs.<method>(**params)，缓存原始结果 (字段列表, 行列表)，没有数据时返回None
+
+    缓存key只由接口名和参数决定，不同脚本的相同查询共用一份缓存，各脚本读取后再自行整理；
+    end 为表示区间结束日期的参数名
+    """
+    import baostock as bs
+
+    def load():
+        rs = getattr(bs, method)(**params)
+        rows = []
+        while (rs.error_code == '0') & rs.next():
+            rows.append(rs.get_row_data())
+        return (rs.fields, rows) if rows else None
+
+    return fetch('baostock', method, params, load, ttl, params.get(end) if end else None)
+
+
+# 各脚本共用的月K线查询字段，字段不同时缓存key也不同
+BAOSTOCK_MONTHLY_FIELDS = 'date,code,open,close'
+
+
+def cached(provider, endpoint=None, ttl=None, end=None, ignore=()):
+    """装饰数据获取函数，以函数参数为缓存参数
+
+    end 为表示区间结束日期的参数名，用于决定有效期；ignore 中的参数（如只用于打印的名称）不参与缓存key
+    """
+    def decorate(func):
+        signature = inspect.signature(func)
+        name = endpoint or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            params = {key: value for key, value in bound.arguments.items() if key not in ignore}
+            return fetch(provider, name, params, lambda: func(*args, **kwargs), ttl,
+                         bound.arguments.get(end) if end else None)
+        return wrapper
+    return decorate
+
+
+def main(argv):
+    cache = FetchCache()
+    command = argv[0] if argv else 'stats'
+    if command == 'prune':
+        print(f"[请求缓存] 删除 {cache.prune()} 条过期缓存")
+    elif command == 'clear':
+        print(f"[请求缓存] 删除 {cache.prune(everything=True)} 条缓存")
+    elif command == 'stats':
+        rows, blobs, size = cache.stats()
+        for provider, endpoint, total, fresh in rows:
+            print(f"{provider:10s} {endpoint:36s} {total:6d} 条，未过期 {fresh}")
+        print(f"[请求缓存] {cache.path}: {blobs} 份数据，{size / 1024 / 1024:.1f} MB")
+    else:
+        print(__doc__)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -4,74 +4,27 @@
 使用腾讯API获取历史K线数据
 """
 
-import urllib.request
 import json
 from datetime import datetime, timedelta
 import ssl
 import time
 from tqdm import tqdm
 
-ssl._create_default_https_context = ssl._create_unverified_context
+import tencent_client
+from fetch_cache import cached
+from stock_lists import HOT_STOCKS
+from symbol_master import resolve_symbol
 
-# 热门股票池（各行业代表 - 扩大范围）
-HOT_STOCKS = [
-    # AI/科技
-    ('002230', '科大讯飞'), ('300418', '昆仑万维'), ('688256', '寒武纪'),
-    ('688041', '海光信息'), ('300474', '景嘉微'), ('002415', '海康威视'),
-    ('300229', '拓尔思'), ('300624', '万兴科技'), ('002049', '紫光国微'),
-    # 通信/光模块
-    ('300308', '中际旭创'), ('300502', '新易盛'), ('002475', '立讯精密'),
-    ('000063', '中兴通讯'), ('600703', '三安光电'), ('300296', '利亚德'),
-    # 新能源
-    ('300750', '宁德时代'), ('002594', '比亚迪'), ('601012', '隆基绿能'),
-    ('002460', '赣锋锂业'), ('600438', '通威股份'), ('002459', '晶澳科技'),
-    # 军工
-    ('600343', '航天动力'), ('600893', '航发动力'), ('002025', '航天电器'),
-    ('600760', '中航沈飞'), ('000768', '中航西飞'), ('600862', '中航高科'),
-    # 金融
-    ('600030', '中信证券'), ('601318', '中国平安'), ('600036', '招商银行'),
-    ('601688', '华泰证券'), ('601211', '国泰君安'), ('600837', '海通证券'),
-    # 消费
-    ('600519', '贵州茅台'), ('000858', '五粮液'), ('000333', '美的集团'),
-    ('000651', '格力电器'), ('601888', '中国中免'), ('000568', '泸州老窖'),
-    # 周期
-    ('601088', '中国神华'), ('600028', '中国石化'), ('000725', '京东方A'),
-    ('601857', '中国石油'), ('601899', '紫金矿业'), ('600019', '宝钢股份'),
-    # 电力
-    ('600900', '长江电力'), ('600886', '国投电力'), ('601985', '中国核电'),
-    ('600025', '华能水电'), ('600011', '华能国际'),
-    # 半导体
-    ('002371', '北方华创'), ('688012', '中微公司'), ('688981', '中芯国际'),
-    ('603501', '韦尔股份'), ('002916', '深南电路'),
-    # 医药
-    ('300760', '迈瑞医疗'), ('000661', '长春高新'), ('603259', '药明康德'),
-    # 地产基建
-    ('600048', '保利发展'), ('601668', '中国建筑'), ('601390', '中国中铁'),
-    # 传媒游戏
-    ('002602', '世纪华通'), ('002027', '分众传媒'), ('300413', '芒果超媒'),
-]
+ssl._create_default_https_context = ssl._create_unverified_context
 
+@cached('tencent', 'fetch_kline')
 def get_stock_kline(code, days=500):
     """获取股票K线数据"""
     # 确定市场前缀
-    if code.startswith('6'):
-        symbol = f'sh{code}'
-    else:
-        symbol = f'sz{code}'
-    
-    url = f'http://web.ifzq.gtimg.cn/appstock/app/fqkline/get?param={symbol},day,,,{days},qfq'
+    symbol, _ = resolve_symbol(code)
     
     try:
-        headers = {'User-Agent': 'Mozilla/5.0'}
-        req = urllib.request.Request(url, headers=headers)
-        with urllib.request.urlopen(req, timeout=10) as response:
-            content = response.read().decode('utf-8')
-            data = json.loads(content)
-            
-            if 'data' in data and symbol in data['data']:
-                stock_data = data['data'][symbol]
-                day_data = stock_data.get('qfqday', stock_data.get('day', []))
-                return day_data
+        return tencent_client.get_client().fetch_kline(symbol, days)
     except Exception as e:
         pass
     
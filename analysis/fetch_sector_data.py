@@ -9,6 +9,9 @@ import json
 from datetime import datetime
 from pathlib import Path
 import warnings
+from collections import defaultdict
+from fetch_cache import BAOSTOCK_MONTHLY_FIELDS, STATIC_TTL, baostock_query
+from sector_live import save_members
 warnings.filterwarnings('ignore')
 
 
@@ -25,36 +28,38 @@ def login():
 def get_industry_stocks():
     """获取所有股票的行业分类"""
     print('正在获取行业分类数据...')
-    rs = bs.query_stock_industry()
+    fields, data_list = baostock_query('query_stock_industry', ttl=STATIC_TTL) or ([], [])
     
-    data_list = []
-    while (rs.error_code == '0') & rs.next():
-        data_list.append(rs.get_row_data())
-    
-    df = pd.DataFrame(data_list, columns=rs.fields)
+    df = pd.DataFrame(data_list, columns=fields or ['code', 'industry'])
     print(f'获取到 {len(df)} 只股票的行业分类')
     return df
 
 
+def get_industry_members(industry_df):
+    """行业 -> 成分股代码，供 api_server 的盘中板块热度使用"""
+    members = defaultdict(list)
+    for code, industry in zip(industry_df['code'], industry_df['industry']):
+        if industry:
+            members[industry].append(code.split('.')[-1])
+    return dict(members)
+
+
 def get_stock_monthly_data(code, start_date, end_date):
-    """获取单只股票的月度数据"""
-    rs = bs.query_history_k_data_plus(
-        code,
-        "date,code,open,close",
+    """获取单只股票的月度数据，与 fetch_baostock_data.py 共用缓存"""
+    result = baostock_query(
+        'query_history_k_data_plus',
+        end='end_date',
+        code=code,
+        fields=BAOSTOCK_MONTHLY_FIELDS,
         start_date=start_date,
         end_date=end_date,
         frequency="m",  # 月度数据
         adjustflag="2"  # 前复权
     )
-    
-    data_list = []
-    while (rs.error_code == '0') & rs.next():
-        data_list.append(rs.get_row_data())
-    
-    if not data_list:
+    if result is None:
         return None
     
-    df = pd.DataFrame(data_list, columns=rs.fields)
+    df = pd.DataFrame(result[1], columns=result[0])
     df['open'] = pd.to_numeric(df['open'], errors='coerce')
     df['close'] = pd.to_numeric(df['close'], errors='coerce')
     
@@ -160,6 +165,7 @@ def main():
     try:
         # 获取行业分类
         industry_df = get_industry_stocks()
+        save_members('baostock', get_industry_members(industry_df))
         
         # 计算行业月度涨幅 (2023-2025)
         print('\n开始计算行业月度涨幅（这可能需要一些时间）...\n')
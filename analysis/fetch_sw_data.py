@@ -11,6 +11,9 @@ from collections import defaultdict
 import json
 import time
 
+from fetch_cache import OPEN_TTL, STATIC_TTL, cached
+from sector_live import save_members
+
 # 申万一级行业代码和名称映射
 SW_INDUSTRIES = {
     '801010': '农林牧渔',
@@ -48,6 +51,7 @@ SW_INDUSTRIES = {
     '801990': '社会服务',
 }
 
+@cached('akshare', 'index_hist_sw', ttl=OPEN_TTL, ignore=('name',))
 def get_industry_history(code, name):
     """获取单个行业指数的历史数据"""
     try:
@@ -58,6 +62,17 @@ def get_industry_history(code, name):
         print(f"  获取 {name} 失败: {e}")
     return None
 
+@cached('akshare', 'index_component_sw', ttl=STATIC_TTL, ignore=('name',))
+def get_industry_members(code, name):
+    """获取单个行业指数的成分股代码"""
+    try:
+        df = ak.index_component_sw(symbol=code)
+        if df is not None and not df.empty:
+            return df['证券代码'].astype(str).tolist()
+    except Exception as e:
+        print(f"  获取 {name} 成分股失败: {e}")
+    return []
+
 def calculate_monthly_returns(df):
     """计算月度涨跌幅"""
     if df is None or df.empty:
@@ -91,6 +106,7 @@ def main():
     
     # 获取每个行业的历史数据
     all_returns = {}
+    all_members = {}
     success_count = 0
     
     for code, name in SW_INDUSTRIES.items():
@@ -103,11 +119,16 @@ def main():
                     all_returns[name] = returns
                     success_count += 1
                     print(f"  ✓ 获取到 {len(returns)} 个月数据")
+            members = get_industry_members(code, name)
+            if members:
+                all_members[name] = members
             time.sleep(0.3)  # 避免请求过快
         except Exception as e:
             print(f"  ✗ 失败: {e}")
     
     print(f"\n成功获取 {success_count} 个行业数据")
+    if all_members:
+        save_members('sw', all_members)
     
     # 统计每月涨幅Top3
     all_months = set()
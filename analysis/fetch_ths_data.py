@@ -11,12 +11,17 @@ from collections import defaultdict
 import json
 import time
 
+from fetch_cache import STATIC_TTL, cached
+from sector_live import save_members
+
+@cached('akshare', 'stock_board_concept_name_ths', ttl=STATIC_TTL)
 def get_concept_boards():
     """获取同花顺概念板块列表"""
     print("正在获取同花顺概念板块列表...")
     df = ak.stock_board_concept_name_ths()
     return df
 
+@cached('akshare', 'stock_board_concept_hist_ths', end='end_date', ignore=('board_code',))
 def get_board_history(board_code, board_name, start_date, end_date):
     """获取单个板块的历史行情"""
     try:
@@ -32,6 +37,17 @@ def get_board_history(board_code, board_name, start_date, end_date):
         pass
     return None
 
+@cached('akshare', 'stock_board_cons_ths', ttl=STATIC_TTL, ignore=('board_name',))
+def get_board_members(board_code, board_name):
+    """获取单个板块的成分股代码"""
+    try:
+        df = ak.stock_board_cons_ths(symbol=board_code)
+        if df is not None and not df.empty:
+            return df['代码'].astype(str).tolist()
+    except Exception as e:
+        print(f"    获取 {board_name} 成分股失败: {e}")
+    return []
+
 def calculate_monthly_returns(df):
     """计算月度涨跌幅"""
     if df is None or df.empty:
@@ -101,6 +117,7 @@ def main():
     
     # 获取每个板块的历史数据
     all_returns = {}
+    all_members = {}
     success_count = 0
     
     for i, (name, code) in enumerate(board_dict.items()):
@@ -113,11 +130,16 @@ def main():
                     all_returns[name] = returns
                     success_count += 1
                     print(f"    ✓ 获取到 {len(returns)} 个月数据")
+            members = get_board_members(code, name)
+            if members:
+                all_members[name] = members
             time.sleep(0.5)  # 避免请求过快
         except Exception as e:
             print(f"    ✗ 失败: {e}")
     
     print(f"\n成功获取 {success_count} 个板块数据")
+    if all_members:
+        save_members('ths', all_members)
     
     # 统计每月涨幅Top3
     all_months = set()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+预编码的HTTP响应体
+响应内容只序列化一次，同时缓存压缩后的字节和各编码各自的强ETag，供重复请求直接复用
+"""
+
+import gzip
+import hashlib
+import json
+import threading
+
+import metrics
+
+try:
+    import brotli
+except ImportError:  # brotli为可选依赖，未安装时只提供gzip
+    brotli = None
+
+MIN_COMPRESS_SIZE = 1024  # 小于该字节数的响应不压缩
+
+
+def parse_accept_encoding(header):
+    """解析Accept-Encoding，返回客户端可接受的编码集合"""
+    accepted = set()
+    for item in (header or '').split(','):
+        parts = item.strip().split(';')
+        coding = parts[0].strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in parts[1:]:
+            name, _, value = param.strip().partition('=')
+            if name == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0
+        if q > 0:
+            accepted.add(coding)
+    return accepted
+
+
+class EncodedPayload:
+    """一份响应内容及其压缩版本"""
+
+    def __init__(self, body, content_type):
+        self.body = body
+        self.content_type = content_type
+        self.etag = '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+        self._encoded = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_json(cls, data):
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        return cls(body, 'application/json; charset=utf-8')
+
+    def encoded(self, coding):
+        """返回指定编码的响应体，首次调用时压缩并缓存"""
+        with self._lock:
+            body = self._encoded.get(coding)
+            if body is None:
+                with metrics.STAGE_LATENCY.time(stage=f'compress_{coding}'):
+                    body = self._compress(coding)
+                self._encoded[coding] = body
+            return body
+
+    def _compress(self, coding):
+        if coding == 'br':
+            return brotli.compress(self.body)
+        return gzip.compress(self.body, compresslevel=6)
+
+    def precompress(self):
+        """提前生成所有支持的压缩版本"""
+        if len(self.body) >= MIN_COMPRESS_SIZE:
+            self.encoded('gzip')
+            if brotli is not None:
+                self.encoded('br')
+        return self
+
+    def choose_encoding(self, accept_encoding):
+        """根据Accept-Encoding选择编码，不压缩时返回None"""
+        if len(self.body) < MIN_COMPRESS_SIZE:
+            return None
+        accepted = parse_accept_encoding(accept_encoding)
+        if brotli is not None and 'br' in accepted:
+            return 'br'
+        if 'gzip' in accepted:
+            return 'gzip'
+        return None
+
+    def etag_for(self, coding):
+        """各编码的字节不同，强ETag按编码加后缀区分，如 "abc"、"abc-gzip"、"abc-br" """
+        return self.etag if not coding else f'{self.etag[:-1]}-{coding}"'
+
+    def matches(self, if_none_match, coding=None):
+        """If-None-Match 是否命中指定编码的ETag"""
+        if not if_none_match:
+            return False
+        etag = self.etag_for(coding)
+        for tag in if_none_match.split(','):
+            tag = tag.strip()
+            if tag == '*' or tag.removeprefix('W/') == etag:
+                return True
+        return False
+
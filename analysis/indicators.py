@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+技术指标计算
+MA/EMA/MACD/BOLL/KDJ/成交量均线，基于NumPy向量化计算。
+每只股票保留上次请求的K线和已算出的指标，同一段K线末尾有新增或变化时只计算这部分，
+结果只取决于传入的K线，与从头计算一致。
+"""
+
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+DEFAULT_SET = ('ma5', 'ma10', 'ma20')
+NAMED_INDICATORS = ('macd', 'boll', 'kdj')
+PERIOD_PATTERN = re.compile(r'(ma|ema|vma)(\d+)')
+MAX_PERIOD = 250
+
+
+def parse_indicator_set(text):
+    """解析 'ma5,ma10,macd' 形式的指标列表，不支持的指标抛出ValueError"""
+    names = [name.strip().lower() for name in (text or '').split(',') if name.strip()]
+    if not names:
+        return list(DEFAULT_SET)
+    for name in names:
+        if name in NAMED_INDICATORS:
+            continue
+        match = PERIOD_PATTERN.fullmatch(name)
+        if not match or not 2 <= int(match.group(2)) <= MAX_PERIOD:
+            raise ValueError(f'不支持的指标: {name}')
+    return list(dict.fromkeys(names))
+
+
+def _rolling(arr, n, start, func):
+    """[start, N) 区间的n日滚动统计值，不足n日的位置为NaN"""
+    out = np.full(len(arr) - start, np.nan)
+    first = max(start, n - 1)
+    if first < len(arr):
+        out[first - start:] = func(sliding_window_view(arr[first - n + 1:], n), axis=1)
+    return out
+
+
+def _rolling_extreme(arr, n, start, func):
+    """[start, N) 区间的n日最高/最低值，不足n日时用已有数据"""
+    padded = np.concatenate([np.full(n - 1, arr[0]), arr])
+    return func(sliding_window_view(padded[start:], n), axis=1)
+
+
+def _ema(arr, n, start, prev):
+    """[start, N) 区间的EMA，从prev[start-1]逐根递推"""
+    alpha = 2 / (n + 1)
+    out = np.empty(len(arr) - start)
+    last = prev[start - 1] if start > 0 else arr[0]
+    for i in range(start, len(arr)):
+        last = alpha * arr[i] + (1 - alpha) * last
+        out[i - start] = last
+    return out
+
+
+def _calc_ma(series, n, start, prev):
+    return {f'ma{n}': _rolling(series['close'], n, start, np.mean)}
+
+
+def _calc_vma(series, n, start, prev):
+    return {f'vma{n}': _rolling(series['volume'], n, start, np.mean)}
+
+
+def _calc_ema(series, n, start, prev):
+    name = f'ema{n}'
+    return {name: _ema(series['close'], n, start, prev.get(name))}
+
+
+def _calc_macd(series, n, start, prev):
+    """MACD(12, 26, 9)，柱状值为 2 * (DIF - DEA)"""
+    close = series['close']
+    fast = _ema(close, 12, start, prev.get('_ema12'))
+    slow = _ema(close, 26, start, prev.get('_ema26'))
+    dif = fast - slow
+    full_dif = np.concatenate([prev['dif'][:start], dif]) if start > 0 else dif
+    dea = _ema(full_dif, 9, start, prev.get('dea'))
+    return {'_ema12': fast, '_ema26': slow, 'dif': dif, 'dea': dea, 'macd': 2 * (dif - dea)}
+
+
+def _calc_boll(series, n, start, prev):
+    """BOLL(20, 2)"""
+    close = series['close']
+    mid = _rolling(close, 20, start, np.mean)
+    std = _rolling(close, 20, start, np.std)
+    return {'mid': mid, 'upper': mid + 2 * std, 'lower': mid - 2 * std}
+
+
+def _calc_kdj(series, n, start, prev):
+    """KDJ(9, 3, 3)，K、D初始值为50"""
+    close = series['close']
+    llv = _rolling_extreme(series['low'], 9, start, np.min)
+    hhv = _rolling_extreme(series['high'], 9, start, np.max)
+    spread = hhv - llv
+    rsv = np.full(len(spread), 50.0)
+    np.divide((close[start:] - llv) * 100, spread, out=rsv, where=spread > 0)
+
+    k = np.empty(len(rsv))
+    d = np.empty(len(rsv))
+    last_k = prev['k'][start - 1] if start > 0 else 50.0
+    last_d = prev['d'][start - 1] if start > 0 else 50.0
+    for i, value in enumerate(rsv):
+        last_k = (2 * last_k + value) / 3
+        last_d = (2 * last_d + last_k) / 3
+        k[i] = last_k
+        d[i] = last_d
+    return {'k': k, 'd': d, 'j': 3 * k - 2 * d}
+
+
+def _calculator(name):
+    if name in NAMED_INDICATORS:
+        return {'macd': _calc_macd, 'boll': _calc_boll, 'kdj': _calc_kdj}[name], 0
+    kind, n = PERIOD_PATTERN.fullmatch(name).groups()
+    return {'ma': _calc_ma, 'ema': _calc_ema, 'vma': _calc_vma}[kind], int(n)
+
+
+class SeriesState:
+    """一只股票按日期对齐的序列和已计算的指标"""
+
+    FIELDS = ('close', 'high', 'low', 'volume')
+
+    def __init__(self):
+        self.dates = []
+        self.series = {field: np.empty(0) for field in self.FIELDS}
+        self.results = {}  # 指标名 -> {分量名: 数组}
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.dates)
+
+    def update(self, kline_data):
+        """换成kline_data这段K线，返回需要重新计算的起始位置（无变化时返回None）
+
+        指标只按传入的这段K线计算，与从头计算的结果一致；与已有K线从第一根起相同的部分不重算，
+        第一根日期变了（窗口前移）或中间K线变了（复权）时全部重算
+        """
+        dates = [item['date'] for item in kline_data]
+        new = {field: np.fromiter((item[field] for item in kline_data), float, len(kline_data))
+               for field in self.FIELDS}
+        size = len(self.dates)
+        start = 0
+        limit = min(size, len(dates))
+        while start < limit and self.dates[start] == dates[start]:
+            start += 1
+        for field in self.FIELDS:
+            changed = np.flatnonzero(self.series[field][:start] != new[field][:start])
+            if len(changed):
+                start = int(changed[0])
+        if start == size == len(dates):
+            return None
+
+        self.dates = dates
+        self.series = new
+        if start == 0:
+            self.results = {}
+        for name, components in self.results.items():
+            self.results[name] = self._extend(name, components, start)
+        return start
+
+    def _extend(self, name, components, start):
+        if start >= len(self.dates):
+            return {key: values[:start] for key, values in components.items()}
+        calc, n = _calculator(name)
+        tail = calc(self.series, n, start, components)
+        return {key: np.concatenate([components[key][:start], values]) if start > 0 else values
+                for key, values in tail.items()}
+
+    def ensure(self, name):
+        if name not in self.results:
+            self.results[name] = self._extend(name, {}, 0)
+        return self.results[name]
+
+
+def _to_list(values):
+    return [None if np.isnan(v) else round(float(v), 3) for v in values]
+
+
+class IndicatorEngine:
+    """按股票缓存序列状态的指标计算器"""
+
+    def __init__(self, max_codes=256):
+        self.max_codes = max_codes
+        self._states = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _state(self, code):
+        with self._lock:
+            state = self._states.get(code)
+            if state is None:
+                state = SeriesState()
+                self._states[code] = state
+            self._states.move_to_end(code)
+            while len(self._states) > self.max_codes:
+                self._states.popitem(last=False)
+            return state
+
+    def compute(self, code, kline_data, names, count=None):
+        """计算指标，返回与kline_data末尾count根K线对齐的结果"""
+        if not kline_data:
+            return {'date': [], 'indicators': {}}
+        state = self._state(code)
+        with state.lock:
+            state.update(kline_data)
+            size = len(state)
+            if count:
+                size = min(size, count)
+            indicators = {}
+            for name in names:
+                components = {key: _to_list(values[-size:])
+                              for key, values in state.ensure(name).items()
+                              if not key.startswith('_')}
+                indicators[name] = components[name] if len(components) == 1 else components
+            return {'date': state.dates[-size:], 'indicators': indicators}
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+多只股票走势对比
+把各股票的日K线按交易日并集对齐（停牌日沿用前一日收盘价），基于NumPy向量化计算:
+- 以起始日为基准的累计涨幅
+- 相对基准股票的相对强弱（大于1为跑赢基准）
+- 与基准股票日收益率的滚动相关系数，以及全区间的相关系数矩阵
+"""
+
+import numpy as np
+
+DEFAULT_WINDOW = 20
+MIN_WINDOW = 5
+MAX_WINDOW = 120
+
+
+def align_closes(series):
+    """series: {code: kline_data}，返回 (日期列表, 收盘价矩阵)
+
+    矩阵每行一只股票，停牌日沿用前一日收盘价，上市前为NaN
+    """
+    dates = np.array(sorted({item['date'] for bars in series.values() for item in bars}))
+    closes = np.full((len(series), len(dates)), np.nan)
+    for row, bars in enumerate(series.values()):
+        positions = np.searchsorted(dates, [item['date'] for item in bars])
+        closes[row, positions] = np.fromiter((item['close'] for item in bars), float, len(bars))
+
+    # 每个位置取该行最近一个有效值的下标
+    last_valid = np.where(np.isnan(closes), 0, np.arange(len(dates)))
+    np.maximum.accumulate(last_valid, axis=1, out=last_valid)
+    return dates.tolist(), closes[np.arange(len(series))[:, None], last_valid]
+
+
+def _rolling_sum(values, window):
+    sums = np.cumsum(values, axis=-1)
+    sums[..., window:] -= sums[..., :-window].copy()
+    return sums
+
+
+def rolling_correlation(x, y, window):
+    """x 每行与 y 的window日滚动相关系数，窗口内有缺失值或方差为0时为NaN"""
+    valid = ~(np.isnan(x) | np.isnan(y))
+    x = np.where(valid, x, 0.0)
+    y = np.where(valid, y, 0.0)
+    count = _rolling_sum(valid.astype(float), window)
+    sx, sy = _rolling_sum(x, window), _rolling_sum(y, window)
+    cov = _rolling_sum(x * y, window) - sx * sy / window
+    var_x = _rolling_sum(x * x, window) - sx * sx / window
+    var_y = _rolling_sum(y * y, window) - sy * sy / window
+    with np.errstate(invalid='ignore', divide='ignore'):
+        corr = cov / np.sqrt(var_x * var_y)
+    corr[(count < window) | (var_x <= 1e-12) | (var_y <= 1e-12)] = np.nan
+    return np.clip(corr, -1.0, 1.0)
+
+
+def _to_list(values, digits):
+    return [None if np.isnan(v) else round(v, digits) for v in values.tolist()]
+
+
+def compare(series, start='', window=DEFAULT_WINDOW, benchmark=None):
+    """对比多只股票，series 为 {code: kline_data}，benchmark 不在其中时取第一只
+
+    start 之前的K线只用于补齐停牌日和滚动相关系数的窗口，累计涨幅从 start 之后第一个交易日起算
+    """
+    codes = list(series)
+    benchmark = benchmark if benchmark in series else codes[0]
+    bench = codes.index(benchmark)
+    dates, closes = align_closes(series)
+    first = int(np.searchsorted(dates, start)) if start else 0
+    if first >= len(dates):
+        raise ValueError(f'{start} 之后没有K线数据')
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        daily = np.full_like(closes, np.nan)
+        daily[:, 1:] = closes[:, 1:] / closes[:, :-1] - 1
+        corr = rolling_correlation(daily, daily[bench], window)[:, first:]
+
+        closes, daily = closes[:, first:], daily[:, first:]
+        # 每只股票以区间内第一个有效收盘价为基准
+        base = closes[np.arange(len(codes)), (~np.isnan(closes)).argmax(axis=1)]
+        rebased = closes / base[:, None]
+        strength = rebased / rebased[bench]
+
+    # 全区间相关系数只用所有股票都有收益率的交易日
+    complete = ~np.isnan(daily).any(axis=0)
+    matrix = None
+    if complete.sum() >= 2:
+        with np.errstate(invalid='ignore', divide='ignore'):
+            matrix = [_to_list(row, 3) for row in np.atleast_2d(np.corrcoef(daily[:, complete]))]
+
+    return {
+        'codes': codes,
+        'benchmark': benchmark,
+        'window': window,
+        'dates': dates[first:],
+        'series': {
+            code: {
+                'return': _to_list((rebased[row] - 1) * 100, 2),
+                'relative_strength': _to_list(strength[row], 4),
+                'correlation': _to_list(corr[row], 3),
+            }
+            for row, code in enumerate(codes)
+        },
+        'correlation_matrix': matrix,
+    }
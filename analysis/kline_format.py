@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+K线数据的传输格式
+- rows: 默认格式，每根K线一个对象
+- columnar: 各字段一个数组，日期为 YYYYMMDD 整数
+- binary: 小端序二进制，可直接映射为 Uint32Array / Float32Array
+以及增量拉取用的游标
+"""
+
+import base64
+import json
+import struct
+import sys
+from array import array
+
+FORMATS = ('rows', 'columnar', 'binary')
+BAR_FIELDS = ('open', 'high', 'low', 'close', 'volume')
+
+BINARY_MAGIC = b'KLN1'
+BINARY_CONTENT_TYPE = 'application/octet-stream'
+
+
+def date_to_int(date):
+    """'2025-01-02' -> 20250102"""
+    return int(date[:4]) * 10000 + int(date[5:7]) * 100 + int(date[8:10])
+
+
+def int_to_date(value):
+    """20250102 -> '2025-01-02'"""
+    return f'{value // 10000:04d}-{value // 100 % 100:02d}-{value % 100:02d}'
+
+
+def to_columnar(kline_data):
+    """每根K线一个对象 -> 每个字段一个数组"""
+    columns = {'date': [date_to_int(item['date']) for item in kline_data]}
+    for field in BAR_FIELDS:
+        columns[field] = [item[field] for item in kline_data]
+    return columns
+
+
+def _little_endian(values, typecode):
+    arr = array(typecode, values)
+    if sys.byteorder != 'little':
+        arr.byteswap()
+    return arr.tobytes()
+
+
+def to_binary(meta, kline_data):
+    """编码为二进制格式
+
+    布局（全部小端序，各数组起始位置按4字节对齐）:
+        magic     4字节 b'KLN1'
+        meta_len  uint32，meta为UTF-8 JSON（code/name/price等），补齐到4字节
+        count     uint32，K线数量
+        date      uint32[count]，YYYYMMDD
+        open/high/low/close/volume  各 float32[count]
+    """
+    meta_bytes = json.dumps(meta, ensure_ascii=False).encode('utf-8')
+    meta_bytes += b' ' * (-len(meta_bytes) % 4)
+
+    parts = [
+        BINARY_MAGIC,
+        struct.pack('<I', len(meta_bytes)),
+        meta_bytes,
+        struct.pack('<I', len(kline_data)),
+        _little_endian([date_to_int(item['date']) for item in kline_data], 'I'),
+    ]
+    for field in BAR_FIELDS:
+        parts.append(_little_endian([item[field] for item in kline_data], 'f'))
+    return b''.join(parts)
+
+
+def from_binary(data):
+    """解码二进制格式，返回 (meta, columns)"""
+    if data[:4] != BINARY_MAGIC:
+        raise ValueError('不是K线二进制格式')
+    meta_len, = struct.unpack_from('<I', data, 4)
+    offset = 8 + meta_len
+    meta = json.loads(data[8:offset].decode('utf-8'))
+    count, = struct.unpack_from('<I', data, offset)
+    offset += 4
+
+    def read(typecode):
+        nonlocal offset
+        arr = array(typecode)
+        arr.frombytes(data[offset:offset + 4 * count])
+        if sys.byteorder != 'little':
+            arr.byteswap()
+        offset += 4 * count
+        return arr.tolist()
+
+    columns = {'date': read('I')}
+    for field in BAR_FIELDS:
+        columns[field] = read('f')
+    return meta, columns
+
+
+def make_cursor(kline_data):
+    """生成增量拉取游标
+
+    以倒数第二根K线（已收盘，不会在盘中变化）为锚点，记录其日期和前复权收盘价。
+    下次请求时锚点收盘价变了，说明除权后前复权历史被整体改写，需要全量重新加载。
+    """
+    if len(kline_data) < 2:
+        return None
+    anchor = kline_data[-2]
+    raw = f"{anchor['date']}|{anchor['close']!r}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def parse_cursor(cursor):
+    """解析游标，返回 (date, close)，格式错误时抛出ValueError"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode('utf-8')
+        date, close = raw.split('|')
+        return date, float(close)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError('无效的cursor') from e
+
+
+def bars_after_cursor(kline_data, cursor):
+    """返回锚点之后的K线和是否需要全量重载 (bars, reset)"""
+    date, close = parse_cursor(cursor)
+    for i, item in enumerate(kline_data):
+        if item['date'] == date:
+            if abs(item['close'] - close) > 1e-6:
+                return kline_data, True
+            return kline_data[i + 1:], False
+    return kline_data, True
+
+
+def bars_since(kline_data, since):
+    """返回日期不早于since的K线（since当天的K线盘中可能还在变化）和是否需要全量重载"""
+    if not kline_data or since < kline_data[0]['date']:
+        return kline_data, True
+    return [item for item in kline_data if item['date'] >= since], False
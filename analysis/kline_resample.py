@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+K线周期转换和降采样
+由缓存的日K线合成周K、月K和N日K线，不额外请求上游。
+开盘取第一根、收盘取最后一根、最高/最低取极值、成交量求和，日期为该周期最后一个交易日。
+长历史按 max_points 降采样：默认把相邻K线合并为更粗的K线，也可以用LTTB按收盘价挑选代表性的K线。
+"""
+
+import re
+
+import numpy as np
+
+PERIOD_PATTERN = re.compile(r'(\d+)d')
+MAX_DAYS = 250
+SAMPLING_METHODS = ('merge', 'lttb')
+
+
+def parse_period(text):
+    """解析 period 参数: day / week / month / Nd，返回 (周期类型, N)，不支持时抛出ValueError"""
+    text = (text or 'day').strip().lower()
+    if text in ('day', 'week', 'month'):
+        return text, 1
+    match = PERIOD_PATTERN.fullmatch(text)
+    if match and 1 <= int(match.group(1)) <= MAX_DAYS:
+        n = int(match.group(1))
+        return ('day', 1) if n == 1 else ('days', n)
+    raise ValueError(f'period 仅支持 day、week、month 或 Nd（N 为 1-{MAX_DAYS}）')
+
+
+def period_name(period):
+    kind, n = period
+    return f'{n}d' if kind == 'days' else kind
+
+
+def _group_starts(dates, period):
+    """每个周期第一根日K线的下标"""
+    kind, n = period
+    size = len(dates)
+    if kind == 'days':
+        # 以最新一根为终点向前每N根一组，最早的一组可能不足N根
+        return np.arange(size % n or n, size, n) if size > n else np.zeros(1, dtype=np.intp)
+    days = np.array(dates, dtype='datetime64[D]')
+    if kind == 'week':
+        # 1970-01-05 是周一，按周一开始的自然周分组
+        keys = (days.astype(np.int64) - 4) // 7
+    else:
+        keys = days.astype('datetime64[M]').astype(np.int64)
+    return np.concatenate([[0], np.flatnonzero(np.diff(keys)) + 1])
+
+
+def resample(kline_data, period):
+    """把日K线合成为指定周期，period 为 parse_period 的返回值"""
+    if period[0] == 'day' or not kline_data:
+        return kline_data
+
+    starts = _group_starts([item['date'] for item in kline_data], period)
+    if starts[0] != 0:
+        starts = np.concatenate([[0], starts])
+    return _merge(kline_data, starts)
+
+
+def _merge(kline_data, starts):
+    """按各组起始下标合并K线"""
+    ends = np.append(starts[1:], len(kline_data)) - 1
+
+    columns = {field: np.fromiter((item[field] for item in kline_data), float, len(kline_data))
+               for field in ('open', 'close', 'high', 'low', 'volume', 'amount')}
+    merged = {
+        'open': columns['open'][starts],
+        'close': columns['close'][ends],
+        'high': np.maximum.reduceat(columns['high'], starts),
+        'low': np.minimum.reduceat(columns['low'], starts),
+        'volume': np.add.reduceat(columns['volume'], starts),
+        'amount': np.add.reduceat(columns['amount'], starts),
+    }
+    lists = {field: values.tolist() for field, values in merged.items()}
+    return [
+        {
+            'date': kline_data[end]['date'],
+            'open': lists['open'][i],
+            'close': lists['close'][i],
+            'high': lists['high'][i],
+            'low': lists['low'][i],
+            'volume': lists['volume'][i],
+            'amount': lists['amount'][i],
+        }
+        for i, end in enumerate(ends.tolist())
+    ]
+
+
+def lttb_indices(values, threshold):
+    """Largest-Triangle-Three-Buckets：从values中挑出threshold个点的下标，保留折线的整体形状"""
+    size = len(values)
+    if threshold >= size:
+        return np.arange(size)
+    if threshold < 3:
+        return np.array([0, size - 1][:threshold], dtype=np.intp)
+
+    x = np.arange(size, dtype=float)
+    every = (size - 2) / (threshold - 2)
+    indices = np.empty(threshold, dtype=np.intp)
+    indices[0], indices[-1] = 0, size - 1
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, size)
+        avg_x = x[end:next_end].mean()
+        avg_y = values[end:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (values[start:end] - values[a])
+                      - (x[a] - x[start:end]) * (avg_y - values[a]))
+        a = start + int(np.argmax(area))
+        indices[i + 1] = a
+    return indices
+
+
+def downsample(kline_data, max_points, method='merge'):
+    """把K线压缩到不超过max_points根
+
+    merge: 按时间均匀分组合并为更粗的K线，开高低收和成交量仍然准确
+    lttb: 按收盘价用LTTB挑选原始K线
+    """
+    if len(kline_data) <= max_points:
+        return kline_data
+    if method == 'lttb':
+        close = np.fromiter((item['close'] for item in kline_data), float, len(kline_data))
+        return [kline_data[i] for i in lttb_indices(close, max_points).tolist()]
+    starts = np.arange(max_points) * len(kline_data) // max_points
+    return _merge(kline_data, starts)
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+行情数据源切换
+腾讯接口为主数据源，东方财富为备用：前一个数据源请求失败或处于熔断状态时依次改用下一个，
+并返回实际提供数据的数据源名称；被本地限速拒绝时不切换，直接返回限速错误
+"""
+
+import eastmoney_client
+import metrics
+import tencent_client
+
+SOURCES = {
+    'tencent': tencent_client.get_client,
+    'eastmoney': eastmoney_client.get_client,
+}
+DEFAULT_ORDER = ('tencent', 'eastmoney')
+
+_order = list(DEFAULT_ORDER)
+
+
+def configure(order=DEFAULT_ORDER):
+    """设置数据源的尝试顺序，第一个为主数据源"""
+    global _order
+    unknown = [name for name in order if name not in SOURCES]
+    if unknown or not order:
+        raise ValueError(f'数据源仅支持 {", ".join(SOURCES)}')
+    _order = list(order)
+
+
+def fetch(method, *args):
+    """按顺序调用各数据源客户端的method，返回 (结果, 数据源名称)；全部失败时抛出主数据源的错误，
+    被本地限速拒绝时直接抛出UpstreamThrottled"""
+    errors = []
+    for name in _order:
+        try:
+            result = getattr(SOURCES[name](), method)(*args)
+        except tencent_client.CircuitOpen as e:
+            errors.append(e)
+            continue
+        except tencent_client.UpstreamThrottled:
+            # 本地限速拒绝的请求没有发出，改用其他数据源会绕过限速
+            raise
+        except tencent_client.UpstreamError as e:
+            errors.append(e)
+            continue
+        if errors:
+            metrics.UPSTREAM_FALLBACK.inc(source=name)
+            if not isinstance(errors[0], tencent_client.CircuitOpen):
+                print(f"[数据源] {_order[0]} 请求失败（{errors[0]}），改用 {name}")
+        return result, name
+    raise errors[0]
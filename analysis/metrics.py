@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+运行指标
+计数器、仪表盘和直方图，按Prometheus文本格式输出，供 /metrics 接口使用。
+多进程模式下每个进程各自统计。
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_number(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(labels.get(name, '') for name in self.labels)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} {self.kind}']
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_value(key, value))
+        return lines
+
+    def _render_value(self, key, value):
+        return [f'{self.name}{_format_labels(self.labels, key)} {_format_number(value)}']
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track(self, **labels):
+        """进入时加一，退出时减一"""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """统计代码块耗时（秒）"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _render_value(self, key, value):
+        counts, total, count = value
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            labels = _format_labels(self.labels, key, f'le="{_format_number(float(bound))}"')
+            lines.append(f'{self.name}_bucket{labels} {cumulative}')
+        labels = _format_labels(self.labels, key, 'le="+Inf"')
+        lines.append(f'{self.name}_bucket{labels} {count}')
+        plain = _format_labels(self.labels, key)
+        lines.append(f'{self.name}_sum{plain} {_format_number(total)}')
+        lines.append(f'{self.name}_count{plain} {count}')
+        return lines
+
+
+class Registry:
+    """指标注册表"""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help_text, labels=()):
+        return self.register(Counter(name, help_text, labels))
+
+    def gauge(self, name, help_text, labels=()):
+        return self.register(Gauge(name, help_text, labels))
+
+    def histogram(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, help_text, labels, buckets))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+# API请求
+API_REQUESTS = REGISTRY.counter('stock_api_requests_total', 'API请求数', ('route', 'status'))
+API_LATENCY = REGISTRY.histogram('stock_api_request_duration_seconds', 'API请求耗时', ('route',))
+API_IN_FLIGHT = REGISTRY.gauge('stock_api_requests_in_flight', '正在处理的API请求数', ('route',))
+API_RESPONSE_BYTES = REGISTRY.histogram('stock_api_response_bytes', 'API响应体大小（压缩后）',
+                                        ('route', 'encoding'), SIZE_BUCKETS)
+STAGE_LATENCY = REGISTRY.histogram('stock_api_stage_duration_seconds', '请求内各阶段耗时（解析、序列化等）',
+                                   ('stage',))
+API_REJECTED = REGISTRY.counter('stock_api_rejected_total', '被拒绝的API请求数', ('reason',))
+API_QUEUE_DEPTH = REGISTRY.gauge('stock_api_queue_depth', '等待工作线程处理的连接数')
+
+# 上游请求
+UPSTREAM_LATENCY = REGISTRY.histogram('stock_upstream_request_duration_seconds', '上游接口请求耗时', ('host',))
+UPSTREAM_ERRORS = REGISTRY.counter('stock_upstream_errors_total', '上游接口错误数', ('host', 'cause'))
+UPSTREAM_IN_FLIGHT = REGISTRY.gauge('stock_upstream_requests_in_flight', '正在进行的上游请求数', ('host',))
+UPSTREAM_THROTTLED = REGISTRY.counter('stock_upstream_throttled_total', '因本地限速未发出的上游请求数', ('host',))
+UPSTREAM_HEDGED = REGISTRY.counter('stock_upstream_hedged_total', '对冲请求数（sent为发出，won为先于原请求返回）',
+                                   ('host', 'result'))
+UPSTREAM_BREAKER_OPEN = REGISTRY.gauge('stock_upstream_breaker_open', '上游主机是否处于熔断状态（1为熔断）', ('host',))
+UPSTREAM_FALLBACK = REGISTRY.counter('stock_upstream_fallback_total', '主数据源失败后改用的数据源（备用接口或本地缓存）',
+                                     ('source',))
+
+# 缓存
+CACHE_REQUESTS = REGISTRY.counter('stock_cache_requests_total', '缓存访问次数', ('cache', 'result'))
+CACHE_EVICTIONS = REGISTRY.counter('stock_cache_evictions_total', '缓存淘汰条目数', ('cache',))
+CACHE_ENTRIES = REGISTRY.gauge('stock_cache_entries', '缓存当前条目数', ('cache',))
+
+# 行情推送
+STREAM_SUBSCRIBERS = REGISTRY.gauge('stock_stream_subscribers', '行情推送连接数')
+STREAM_SYMBOLS = REGISTRY.gauge('stock_stream_symbols', '行情推送轮询的股票数')
+STREAM_DROPPED = REGISTRY.counter('stock_stream_dropped_total', '推送队列积压而被断开的推送连接数')
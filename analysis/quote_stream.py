@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+实时行情推送（Server-Sent Events）
+一个后台轮询线程按固定间隔批量获取所有订阅股票的行情，只把变化的行情推送给各订阅者。
+上游请求量只和订阅的股票数有关，和在线人数无关。
+"""
+
+import json
+import queue
+import socket
+import threading
+import time
+
+import metrics
+
+
+class Subscriber:
+    """一个推送连接
+
+    推送线程只把事件放进有界队列，由该连接自己的发送线程写socket，
+    慢客户端不会拖慢其他订阅者；队列满时offer()返回False，由推送中心断开该连接。
+    """
+
+    def __init__(self, sock, symbols, max_pending=16, on_error=None):
+        self.sock = sock
+        self.symbols = symbols  # symbol -> code
+        self.last_queued = time.monotonic()
+        self.on_error = on_error
+        self.closed = False
+        self._queue = queue.Queue(max_pending)
+        self._thread = threading.Thread(target=self._send_loop, name='quote-stream-send', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def offer(self, data):
+        """放入发送队列，队列已满时返回False"""
+        try:
+            self._queue.put_nowait(data)
+        except queue.Full:
+            return False
+        self.last_queued = time.monotonic()
+        return True
+
+    def _send_loop(self):
+        while True:
+            data = self._queue.get()
+            if data is None or self.closed:
+                return
+            try:
+                self.sock.sendall(data)
+            except OSError:
+                if self.on_error is not None:
+                    self.on_error(self)
+                return
+
+    def close(self):
+        self.closed = True
+        try:
+            self._queue.put_nowait(None)
+        except queue.Full:
+            pass  # 发送线程正在写socket，关闭后会出错退出
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+
+def format_event(event, data):
+    payload = json.dumps(data, ensure_ascii=False)
+    return f'event: {event}\ndata: {payload}\n\n'.encode('utf-8')
+
+
+class QuoteStreamHub:
+    """行情推送中心
+
+    订阅者的socket由各自的发送线程写入，不占用HTTP工作线程；
+    发送队列积压超过max_pending个事件、写入超时或连接断开的订阅者会被移除。
+    """
+
+    def __init__(self, fetch_quotes, interval=3.0, heartbeat=15.0, max_subscribers=1000, send_timeout=2.0,
+                 max_pending=16):
+        self.fetch_quotes = fetch_quotes
+        self.interval = interval
+        self.heartbeat = heartbeat
+        self.max_subscribers = max_subscribers
+        self.send_timeout = send_timeout
+        self.max_pending = max_pending
+        self._subscribers = {}
+        self._last_quotes = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    def is_full(self):
+        with self._lock:
+            return len(self._subscribers) >= self.max_subscribers
+
+    def subscribe(self, sock, symbols):
+        """添加订阅者，已有的最新行情立即推送一次"""
+        sock.settimeout(self.send_timeout)
+        subscriber = Subscriber(sock, symbols, self.max_pending, on_error=lambda s: self._remove([s]))
+        # 快照在登记前入队，推送线程之后放入的事件都排在快照后面
+        with self._lock:
+            subscriber.offer(b'retry: 5000\n\n')
+            snapshot = [dict(self._last_quotes[symbol], code=code)
+                        for symbol, code in symbols.items() if symbol in self._last_quotes]
+            if snapshot:
+                subscriber.offer(format_event('quotes', snapshot))
+            self._subscribers[id(subscriber)] = subscriber
+            if self._thread is None:
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name='quote-stream', daemon=True)
+                self._thread.start()
+        metrics.STREAM_SUBSCRIBERS.inc()
+        subscriber.start()
+
+    def _remove(self, subscribers):
+        with self._lock:
+            removed = [s for s in subscribers if self._subscribers.pop(id(s), None) is not None]
+        for subscriber in removed:
+            subscriber.close()
+            metrics.STREAM_SUBSCRIBERS.dec()
+
+    def _run(self):
+        while not self._stop.is_set():
+            with self._lock:
+                subscribers = list(self._subscribers.values())
+                if not subscribers:
+                    self._thread = None
+                    return
+            symbols = set()
+            for subscriber in subscribers:
+                symbols.update(subscriber.symbols)
+            metrics.STREAM_SYMBOLS.set(len(symbols))
+
+            try:
+                quotes = self.fetch_quotes(sorted(symbols))
+            except Exception as e:
+                print(f"[推送] 获取行情失败: {e}")
+                quotes = {}
+
+            with self._lock:
+                changed = {symbol: quote for symbol, quote in quotes.items()
+                           if self._last_quotes.get(symbol) != quote}
+                self._last_quotes = {symbol: quote
+                                     for symbol, quote in {**self._last_quotes, **quotes}.items()
+                                     if symbol in symbols}
+                # 和更新最新行情在同一把锁内取订阅者：之后订阅的连接已在快照中拿到这些变化
+                subscribers = list(self._subscribers.values())
+
+            now = time.monotonic()
+            slow = []
+            for subscriber in subscribers:
+                items = [dict(quote, code=subscriber.symbols[symbol])
+                         for symbol, quote in changed.items() if symbol in subscriber.symbols]
+                if items:
+                    queued = subscriber.offer(format_event('quotes', items))
+                elif now - subscriber.last_queued >= self.heartbeat:
+                    queued = subscriber.offer(b': ping\n\n')
+                else:
+                    queued = True
+                if not queued:
+                    slow.append(subscriber)
+            if slow:
+                metrics.STREAM_DROPPED.inc(len(slow))
+                self._remove(slow)
+
+            self._stop.wait(self.interval)
+
+    def close(self):
+        self._stop.set()
+        with self._lock:
+            subscribers = list(self._subscribers.values())
+        self._remove(subscribers)
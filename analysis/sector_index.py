@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+板块分析数据的内存索引
+把 data/*sector_analysis.json 的 industry_returns、top3_per_month、monthly_summary
+按月份、年份、行业建立索引，并预先算好各年的上榜次数等汇总，供 /api/sectors/* 接口按需返回。
+数据文件由 StaticFileStore 读入内存并监视变化，文件更新后索引自动重建。
+"""
+
+import json
+import threading
+from collections import defaultdict
+
+from http_payload import EncodedPayload
+
+# 数据源 -> (文件URL路径, 板块收益字段名, top3_per_month 中板块名称的字段名)
+SOURCES = {
+    'baostock': ('/data/sector_analysis.json', 'industry_returns', 'industry'),
+    'sw': ('/data/sw_sector_analysis.json', 'industry_returns', 'industry'),
+    'ths': ('/data/ths_sector_analysis.json', 'board_returns', 'board'),
+}
+DEFAULT_SOURCE = 'baostock'
+MAX_K = 100
+MAX_PAYLOADS = 1024  # 每份数据最多缓存的查询结果数
+
+
+class SectorDataset:
+    """一个数据文件的索引，创建后只读"""
+
+    def __init__(self, data, returns_field='industry_returns', name_field='industry'):
+        self.update_time = data.get('update_time', '')
+        self.data_source = data.get('data_source', '')
+        self.returns = {industry: dict(sorted(series.items()))
+                        for industry, series in (data.get(returns_field) or {}).items()}
+        self.top3 = {month: [(item[name_field], item['return']) for item in items]
+                     for month, items in (data.get('top3_per_month') or {}).items()}
+        self.monthly_summary = data.get('monthly_summary') or {}
+
+        # 月份 -> 按涨幅从高到低排列的 [(板块, 涨幅)]
+        by_month = defaultdict(list)
+        for industry, series in self.returns.items():
+            for month, value in series.items():
+                if value is not None:
+                    by_month[month].append((industry, value))
+        for month, items in self.top3.items():
+            if month not in by_month:
+                by_month[month] = list(items)
+        self.by_month = {month: sorted(items, key=lambda item: -item[1])
+                         for month, items in sorted(by_month.items())}
+        self.months = list(self.by_month)
+        self.years = sorted({month[:4] for month in self.months})
+
+        # (板块, 月份) -> 当月排名
+        self.ranks = {(industry, month): rank
+                      for month, items in self.by_month.items()
+                      for rank, (industry, _) in enumerate(items, 1)}
+        self.leaderboards = {year: self._leaderboard(year) for year in self.years + ['all']}
+        self._payloads = {}
+        self._lock = threading.Lock()
+
+    def _top3_items(self, month):
+        items = self.top3.get(month)
+        if items is not None:
+            return items
+        return self.by_month.get(month, [])[:3]
+
+    def _leaderboard(self, year):
+        """某年（或全部年份）的上榜统计，按上榜次数、平均上榜涨幅排序"""
+        months = [month for month in self.months if year == 'all' or month.startswith(year)]
+        stats = {}
+        monthly_top = []
+        for month in months:
+            top = self._top3_items(month)
+            if top:
+                monthly_top.append({'month': month, 'industry': top[0][0], 'return': top[0][1]})
+            for rank, (industry, value) in enumerate(top, 1):
+                item = stats.setdefault(industry, {'industry': industry, 'count': 0, 'first': 0,
+                                                   'total_return': 0.0, 'best_month': month,
+                                                   'best_return': value})
+                item['count'] += 1
+                item['first'] += rank == 1
+                item['total_return'] += value
+                if value > item['best_return']:
+                    item['best_month'], item['best_return'] = month, value
+
+        ranking = []
+        for item in stats.values():
+            total = item.pop('total_return')
+            item['avg_return'] = round(total / item['count'], 2)
+            ranking.append(item)
+        ranking.sort(key=lambda item: (-item['count'], -item['avg_return']))
+        return {'months': months, 'ranking': ranking, 'monthly_top': monthly_top}
+
+    def payload(self, key, build):
+        """同一份数据的同一查询只构建和编码一次"""
+        with self._lock:
+            payload = self._payloads.get(key)
+        if payload is None:
+            payload = EncodedPayload.from_json(build())
+            with self._lock:
+                if len(self._payloads) >= MAX_PAYLOADS:
+                    self._payloads.clear()
+                self._payloads[key] = payload
+        return payload
+
+    def meta(self):
+        return {'update_time': self.update_time, 'data_source': self.data_source}
+
+    def top(self, month, k=3):
+        if month not in self.by_month:
+            raise KeyError(f'没有 {month} 的数据')
+        items = self.by_month[month][:k]
+        return dict(self.meta(), month=month, k=k,
+                    sectors=[{'rank': rank, 'industry': industry, 'return': value}
+                             for rank, (industry, value) in enumerate(items, 1)])
+
+    def history(self, industry, start='', end=''):
+        series = self.returns.get(industry)
+        if series is None:
+            raise KeyError(f'没有板块 {industry} 的数据')
+        months = [month for month in series if (not start or month >= start) and (not end or month <= end)]
+        top3_months = [month for month in months
+                       if industry in (name for name, _ in self._top3_items(month))]
+        return dict(self.meta(), industry=industry, months=months,
+                    returns=[series[month] for month in months],
+                    ranks=[self.ranks.get((industry, month)) for month in months],
+                    sector_count=[len(self.by_month.get(month, ())) for month in months],
+                    top3_months=top3_months)
+
+    def leaderboard(self, year='all', k=None):
+        board = self.leaderboards.get(year)
+        if board is None:
+            raise KeyError(f'没有 {year} 年的数据')
+        ranking = board['ranking'][:k] if k else board['ranking']
+        return dict(self.meta(), year=year, years=self.years, months=board['months'],
+                    ranking=ranking, monthly_top=board['monthly_top'])
+
+    def summary(self, month):
+        items = self.monthly_summary.get(str(int(month)))
+        if items is None:
+            raise KeyError(f'没有 {month} 月的季节性统计')
+        return dict(self.meta(), month=int(month), sectors=items)
+
+
+class SectorIndex:
+    """按数据源取索引，数据文件更新后自动重建"""
+
+    def __init__(self, static_store):
+        self.static_store = static_store
+        self._datasets = {}  # 数据源 -> (文件payload, SectorDataset)
+        self._lock = threading.Lock()
+
+    def dataset(self, source=DEFAULT_SOURCE):
+        if source not in SOURCES:
+            raise ValueError(f'source 仅支持 {", ".join(SOURCES)}')
+        url_path, returns_field, name_field = SOURCES[source]
+        payload = self.static_store.get(url_path)
+        if payload is None:
+            raise KeyError(f'数据文件 {url_path.lstrip("/")} 不存在，请先运行数据脚本')
+        with self._lock:
+            entry = self._datasets.get(source)
+            if entry is not None and entry[0] is payload:
+                return entry[1]
+        dataset = SectorDataset(json.loads(payload.body.decode('utf-8')), returns_field, name_field)
+        with self._lock:
+            self._datasets[source] = (payload, dataset)
+        return dataset
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+盘中板块热度
+按 data/sector_members.json 中的板块成分股（Baostock行业、申万行业、同花顺概念），
+后台线程定时批量获取全部成分股行情，只按涨跌幅有变化的股票增量更新各板块的
+平均涨幅、中位数涨幅、上涨/下跌家数和领涨股，供 /api/sectors/live 返回排行。
+成分股文件由 fetch_sector_data.py、fetch_sw_data.py、fetch_ths_data.py 生成。
+"""
+
+import bisect
+import json
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+
+import metrics
+from http_payload import EncodedPayload
+from server_cache import write_json_atomic
+from symbol_master import resolve_symbol
+
+DEFAULT_PATH = Path(__file__).resolve().parent / 'data' / 'sector_members.json'
+SORT_KEYS = ('avg', 'median', 'breadth')
+MAX_LEADERS = 10
+
+
+def normalize_code(code):
+    """'sh.600000' / 'SZ000001' / '000001.SZ' -> 6位代码"""
+    digits = ''.join(char for char in str(code) if char.isdigit())
+    return digits[-6:] if len(digits) >= 6 else ''
+
+
+def load_members(path=DEFAULT_PATH):
+    """读取成分股文件，返回 {数据源: {板块: [代码]}}，文件不存在时返回空字典"""
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f).get('sources', {})
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        print(f"[板块热度] 读取成分股文件失败: {e}")
+        return {}
+
+
+def save_members(source, members, path=DEFAULT_PATH):
+    """写入一个数据源的 {板块: [代码]}，保留其他数据源"""
+    path = Path(path)
+    try:
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        data = {}
+    sources = data.get('sources', {})
+    sources[source] = {
+        sector: sorted({normalize_code(code) for code in codes} - {''})
+        for sector, codes in members.items()
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    write_json_atomic(str(path), {'update_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'), 'sources': sources})
+    print(f"[板块热度] 已保存 {source} 的 {len(members)} 个板块成分股到 {path}")
+
+
+class SectorStats:
+    """单个板块的实时统计
+
+    涨跌幅以0.01%为单位存为整数，增删时合计值不会累积浮点误差；
+    ranked 为按涨跌幅升序排列的 (涨跌幅, 代码)，用于中位数和领涨股
+    """
+
+    __slots__ = ('name', 'members', 'ranked', 'total', 'up', 'down')
+
+    def __init__(self, name, members):
+        self.name = name
+        self.members = members
+        self.ranked = []
+        self.total = 0
+        self.up = 0
+        self.down = 0
+
+    def add(self, code, change):
+        bisect.insort(self.ranked, (change, code))
+        self.total += change
+        self.up += change > 0
+        self.down += change < 0
+
+    def remove(self, code, change):
+        del self.ranked[bisect.bisect_left(self.ranked, (change, code))]
+        self.total -= change
+        self.up -= change > 0
+        self.down -= change < 0
+
+    def median(self):
+        n = len(self.ranked)
+        middle = self.ranked[n // 2][0]
+        return middle if n % 2 else (self.ranked[n // 2 - 1][0] + middle) / 2
+
+    def row(self, leaders, names):
+        count = len(self.ranked)
+        return {
+            'sector': self.name,
+            'avg_change': round(self.total / count / 100, 2),
+            'median_change': round(self.median() / 100, 2),
+            'breadth': round(self.up / count * 100, 1),
+            'up': self.up,
+            'down': self.down,
+            'flat': count - self.up - self.down,
+            'count': count,
+            'members': self.members,
+            'leaders': [{'code': code, 'name': names.get(code, ''), 'change': change / 100}
+                        for change, code in reversed(self.ranked[-leaders:])] if leaders else [],
+        }
+
+    def sort_key(self, sort):
+        count = len(self.ranked)
+        if sort == 'median':
+            return self.median()
+        if sort == 'breadth':
+            return self.up / count, self.total / count
+        return self.total / count
+
+
+class SectorBoard:
+    """一个数据源的全部板块，股票 -> 所属板块的统计"""
+
+    def __init__(self, members):
+        self.stats = []
+        self.by_code = defaultdict(list)
+        for sector, codes in members.items():
+            codes = set(codes)
+            stats = SectorStats(sector, len(codes))
+            self.stats.append(stats)
+            for code in codes:
+                self.by_code[code].append(stats)
+
+    def apply(self, code, old, new):
+        for stats in self.by_code.get(code, ()):
+            if old is not None:
+                stats.remove(code, old)
+            stats.add(code, new)
+
+    def ranking(self, sort, k, leaders, names):
+        active = [stats for stats in self.stats if stats.ranked]
+        active.sort(key=lambda stats: stats.sort_key(sort), reverse=True)
+        return [stats.row(leaders, names) for stats in active[:k]]
+
+
+class LiveSectors:
+    """盘中板块热度
+
+    有请求时才启动轮询线程，超过idle_timeout秒没有请求后线程退出，不占用上游请求额度；
+    同一次轮询结果下相同参数的排行只编码一次；成分股文件重新生成后自动重新读取
+    """
+
+    def __init__(self, fetch_quotes, path=DEFAULT_PATH, interval=10.0, idle_timeout=300.0):
+        self.fetch_quotes = fetch_quotes
+        self.path = Path(path)
+        self.interval = interval
+        self.idle_timeout = idle_timeout
+        self.boards = {}
+        self.symbols = {}
+        self.updated_at = None
+        self._signature = None  # 成分股文件的 (mtime_ns, size)，变化后重新读取
+        self._changes = {}  # code -> 涨跌幅（0.01%）
+        self._names = {}
+        self._payloads = {}
+        self._last_access = 0.0
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self.reload()
+
+    def reload(self):
+        """成分股文件有变化（包括新生成或被删除）时重新读取，已取到的行情直接计入新的板块，返回是否重新读取"""
+        try:
+            stat = self.path.stat()
+            signature = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            signature = None
+        if signature == self._signature:
+            return False
+        members = load_members(self.path) if signature is not None else {}
+        boards = {source: SectorBoard(sectors) for source, sectors in members.items() if sectors}
+        codes = {code for board in boards.values() for code in board.by_code}
+        symbols = {resolve_symbol(code)[0]: code for code in sorted(codes)}
+        with self._lock:
+            self._changes = {code: change for code, change in self._changes.items() if code in codes}
+            for code, change in self._changes.items():
+                for board in boards.values():
+                    board.apply(code, None, change)
+            self.boards = boards
+            self.symbols = symbols
+            self._signature = signature
+            self._payloads.clear()
+        return True
+
+    def touch(self):
+        """记录一次访问，轮询线程未运行时启动"""
+        with self._lock:
+            self._last_access = time.monotonic()
+            if self._thread is None and self.symbols and self.interval > 0:
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name='sector-live', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            with self._lock:
+                if time.monotonic() - self._last_access > self.idle_timeout:
+                    self._thread = None
+                    return
+            try:
+                self.tick()
+            except Exception as e:
+                print(f"[板块热度] 获取行情失败: {e}")
+            self._stop.wait(self.interval)
+
+    def tick(self):
+        """获取一次全部成分股行情并更新统计，返回涨跌幅有变化的股票数"""
+        self.reload()
+        with metrics.STAGE_LATENCY.time(stage='sector_live_fetch'):
+            quotes = self.fetch_quotes(list(self.symbols))
+        changed = 0
+        with self._lock, metrics.STAGE_LATENCY.time(stage='sector_live_update'):
+            for symbol, quote in quotes.items():
+                code = self.symbols.get(symbol)
+                if code is None:
+                    continue
+                self._names[code] = quote['name']
+                new = round(quote['change'] * 100)
+                old = self._changes.get(code)
+                if new == old:
+                    continue
+                self._changes[code] = new
+                changed += 1
+                for board in self.boards.values():
+                    board.apply(code, old, new)
+            self.updated_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            self._payloads.clear()
+        return changed
+
+    def ranking(self, source, sort='avg', k=20, leaders=3):
+        """板块排行，数据源没有成分股数据时抛出KeyError"""
+        if sort not in SORT_KEYS:
+            raise ValueError(f'sort 仅支持 {", ".join(SORT_KEYS)}')
+        self.reload()
+        board = self.boards.get(source)
+        if board is None:
+            raise KeyError(f'没有 {source} 的板块成分股，请先运行数据脚本生成 {DEFAULT_PATH.name}')
+        self.touch()
+        key = (source, sort, k, leaders)
+        with self._lock:
+            payload = self._payloads.get(key)
+            if payload is None:
+                payload = EncodedPayload.from_json({
+                    'source': source,
+                    'sort': sort,
+                    'updated_at': self.updated_at,
+                    'interval': self.interval,
+                    'stocks': len(self._changes),
+                    'sectors': board.ranking(sort, k, leaders, self._names),
+                })
+                self._payloads[key] = payload
+        return payload
+
+    def close(self):
+        self._stop.set()
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+API服务器缓存
+- SharedFileCache: 多个工作进程通过本地缓存文件共享K线/行情数据
+- TTLCache: 进程内的TTL + LRU缓存，支持过期后先返回旧值再后台刷新
+- SingleFlight: 合并相同key的并发上游请求
+- CacheSnapshot: 停止服务时把内存缓存写入磁盘，启动时重新加载
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from pathlib import Path
+
+import metrics
+
+DEFAULT_CACHE_DIR = Path(tempfile.gettempdir()) / 'stock_api_cache'
+
+
+class SharedFileCache:
+    """基于本地文件的跨进程缓存
+
+    每个key对应一个JSON文件，写入时先写临时文件再原子替换，
+    其他进程不会读到写了一半的文件。文件的修改时间即写入时间。
+    写入时每隔prune_interval秒清理一次超过max_age秒的条目，目录不会随请求过的代码无限增长；
+    max_age 应不小于各调用方读取时用到的最长窗口（包括过期兜底）。
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_age=2 * 86400, prune_interval=600):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_age = max_age
+        self.prune_interval = prune_interval
+        self._next_prune = 0.0
+        self._prune_lock = threading.Lock()
+
+    def _path(self, key):
+        name = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return self.cache_dir / f'{name}.json'
+
+    def get(self, key, max_age):
+        """读取缓存，超过max_age秒或不存在时返回None"""
+        path = self._path(key)
+        try:
+            if time.time() - path.stat().st_mtime > max_age:
+                metrics.CACHE_REQUESTS.inc(cache='shared', result='miss')
+                return None
+            with open(path, encoding='utf-8') as f:
+                value = json.load(f)
+        except (OSError, ValueError):
+            metrics.CACHE_REQUESTS.inc(cache='shared', result='miss')
+            return None
+        metrics.CACHE_REQUESTS.inc(cache='shared', result='hit')
+        return value
+
+    def set(self, key, value):
+        """写入缓存，到了清理时间顺带清理过期条目"""
+        write_json_atomic(self._path(key), value)
+        now = time.time()
+        if now >= self._next_prune and self._prune_lock.acquire(blocking=False):
+            try:
+                self._next_prune = now + self.prune_interval
+                self.prune(now)
+            finally:
+                self._prune_lock.release()
+
+    def prune(self, now=None):
+        """删除超过max_age秒的条目和残留的临时文件，不动快照文件，返回删除的文件数"""
+        cutoff = (time.time() if now is None else now) - self.max_age
+        removed = 0
+        for path in self.cache_dir.iterdir():
+            if path.name.startswith('snapshot-') or path.suffix not in ('.json', '.tmp'):
+                continue
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+                    removed += 1
+            except OSError:
+                pass  # 其他进程已经删除或替换
+        return removed
+
+
+def write_json_atomic(path, value):
+    """先写临时文件再原子替换，失败时返回False"""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(value, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        return True
+    except OSError:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        return False
+
+
+class SingleFlight:
+    """合并相同key的并发调用
+
+    同一时刻同一个key只有第一个调用者真正执行fn，其余调用者等待并共享其结果（或异常）
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+
+        if not leader:
+            return future.result()
+
+        try:
+            future.set_result(fn())
+        except Exception as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                del self._calls[key]
+        return future.result()
+
+
+class TTLCache:
+    """线程安全的内存缓存
+
+    - 条目超过ttl秒视为过期
+    - 过期但未超过ttl+stale_ttl时直接返回旧值，同时在后台线程刷新
+    - 条目数超过max_entries时淘汰最久未使用的条目
+    - 同一个key的并发加载只执行一次loader
+    """
+
+    def __init__(self, ttl, stale_ttl=0, max_entries=512, name='memory'):
+        self.name = name
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (value, stored_at)
+        self._refreshing = set()
+        self._flight = SingleFlight()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """返回 (value, age)，不存在时返回None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+        value, stored_at = entry
+        return value, time.monotonic() - stored_at
+
+    def snapshot(self):
+        """导出未完全过期的条目: [(key, value, age), ...]"""
+        now = time.monotonic()
+        with self._lock:
+            entries = list(self._entries.items())
+        return [(key, value, now - stored_at) for key, (value, stored_at) in entries
+                if now - stored_at <= self.ttl + self.stale_ttl]
+
+    def restore(self, items, elapsed=0):
+        """导入snapshot()导出的条目，elapsed为导出后经过的秒数，返回导入的条目数"""
+        now = time.monotonic()
+        restored = 0
+        with self._lock:
+            for key, value, age in items:
+                age += elapsed
+                current = self._entries.get(key)
+                if age > self.ttl + self.stale_ttl or (current is not None and now - current[1] <= age):
+                    continue
+                self._entries[key] = (value, now - age)
+                restored += 1
+            # 按写入时间排序，淘汰时先淘汰最旧的
+            ordered = sorted(self._entries.items(), key=lambda item: item[1][1])
+            self._entries = OrderedDict(ordered[-self.max_entries:])
+        return restored
+
+    def get_fresh(self, key):
+        """返回未过期的值，不存在或已过期时返回None"""
+        entry = self.get(key)
+        if entry is None or entry[1] > self.ttl:
+            metrics.CACHE_REQUESTS.inc(cache=self.name, result='miss')
+            return None
+        metrics.CACHE_REQUESTS.inc(cache=self.name, result='hit')
+        return entry[0]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                metrics.CACHE_EVICTIONS.inc(cache=self.name)
+
+    def get_or_load(self, key, loader):
+        """读取缓存，未命中或完全过期时调用loader()加载"""
+        entry = self.get(key)
+        if entry is not None:
+            value, age = entry
+            if age <= self.ttl:
+                metrics.CACHE_REQUESTS.inc(cache=self.name, result='hit')
+                return value
+            if age <= self.ttl + self.stale_ttl:
+                metrics.CACHE_REQUESTS.inc(cache=self.name, result='stale')
+                self._refresh_in_background(key, loader)
+                return value
+
+        metrics.CACHE_REQUESTS.inc(cache=self.name, result='miss')
+        return self._flight.do(key, lambda: self._load(key, loader))
+
+    def _load(self, key, loader):
+        value = loader()
+        self.set(key, value)
+        return value
+
+    def refresh(self, key, loader):
+        """立即调用loader()重新加载（与同key的其他加载合并）"""
+        return self._flight.do(key, lambda: self._load(key, loader))
+
+    def _refresh_in_background(self, key, loader):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                self.refresh(key, loader)
+            except Exception as e:
+                print(f"[缓存] 后台刷新 {key} 失败: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+
+class CacheSnapshot:
+    """内存缓存的磁盘快照
+
+    每个进程写自己的 snapshot-<slot>.json，启动时合并读取全部快照，
+    条目的年龄按快照写入后经过的时间累加，超出各缓存过期窗口的条目丢弃
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def save(self, caches, slot=0):
+        """caches: {名称: TTLCache}，返回写入的条目数"""
+        data = {
+            'saved_at': time.time(),
+            'caches': {name: cache.snapshot() for name, cache in caches.items()},
+        }
+        if not write_json_atomic(self.cache_dir / f'snapshot-{slot}.json', data):
+            return 0
+        return sum(len(items) for items in data['caches'].values())
+
+    def load(self, caches):
+        """读取全部快照，返回 {名称: 导入条目数}"""
+        restored = {name: 0 for name in caches}
+        for path in sorted(self.cache_dir.glob('snapshot-*.json')):
+            try:
+                with open(path, encoding='utf-8') as f:
+                    data = json.load(f)
+                elapsed = max(0.0, time.time() - data['saved_at'])
+                for name, items in data['caches'].items():
+                    if name in caches:
+                        restored[name] += caches[name].restore(items, elapsed)
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                print(f"[缓存] 读取快照 {path.name} 失败: {e}")
+        return restored
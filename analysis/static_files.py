@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+内存中的静态文件
+启动时把 index.html 和前端用到的 data/*.json 读入内存并预先压缩，后台线程监视文件变化后整体替换。
+请求处理时不访问磁盘。
+"""
+
+import glob
+import json
+import os
+import posixpath
+import threading
+import urllib.parse
+
+from http_payload import EncodedPayload
+
+# 前端页面和板块接口用到的文件；data/ 下的代码表、板块成分股、K线库和抓取缓存是服务器和脚本自己的状态，
+# 不预加载也不对外提供
+PRELOAD_PATTERNS = (
+    'index.html',
+    'data/monster_stocks.json',
+    'data/sector_analysis.json',
+    'data/sw_sector_analysis.json',
+    'data/ths_sector_analysis.json',
+)
+CONTENT_TYPES = {
+    '.html': 'text/html; charset=utf-8',
+    '.json': 'application/json; charset=utf-8',
+}
+
+
+class StaticFileStore:
+    """预加载的静态文件集合
+
+    - 文件内容和压缩版本只在加载时生成一次
+    - 变化的文件要连续两次检查大小和修改时间都不变，且JSON能正常解析才会替换，
+      避免读到数据脚本写了一半的文件
+    - 替换时生成新的字典整体赋值，读请求始终看到完整的一版
+    """
+
+    def __init__(self, root, patterns=PRELOAD_PATTERNS, interval=2.0):
+        self.root = os.path.abspath(root)
+        self.patterns = patterns
+        self.interval = interval
+        self._entries = {}   # 相对路径 -> (stat签名, payload)
+        self._pending = {}   # 相对路径 -> 上次看到的stat签名（等待稳定）
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _scan(self):
+        """返回 {相对路径: (mtime_ns, size)}"""
+        found = {}
+        for pattern in self.patterns:
+            for path in glob.glob(os.path.join(self.root, pattern)):
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                rel = os.path.relpath(path, self.root).replace(os.sep, '/')
+                found[rel] = (stat.st_mtime_ns, stat.st_size)
+        return found
+
+    def _load(self, rel):
+        with open(os.path.join(self.root, rel), 'rb') as f:
+            body = f.read()
+        ext = os.path.splitext(rel)[1]
+        if ext == '.json':
+            json.loads(body.decode('utf-8'))
+        return EncodedPayload(body, CONTENT_TYPES.get(ext, 'application/octet-stream')).precompress()
+
+    def load_all(self):
+        """启动时加载全部文件"""
+        entries = {}
+        for rel, signature in self._scan().items():
+            try:
+                entries[rel] = (signature, self._load(rel))
+            except (OSError, ValueError) as e:
+                print(f"[静态文件] 加载 {rel} 失败: {e}")
+        self._entries = entries
+        return len(entries)
+
+    def refresh(self):
+        """检查一次文件变化，返回被更新或删除的文件列表"""
+        current = self._scan()
+        entries = self._entries
+        updated = {}
+        removed = [rel for rel in entries if rel not in current]
+
+        for rel, signature in current.items():
+            entry = entries.get(rel)
+            if entry is not None and entry[0] == signature:
+                self._pending.pop(rel, None)
+                continue
+            if self._pending.get(rel) != signature:
+                self._pending[rel] = signature  # 刚发生变化，下一轮确认稳定后再加载
+                continue
+            try:
+                updated[rel] = (signature, self._load(rel))
+                del self._pending[rel]
+            except (OSError, ValueError) as e:
+                print(f"[静态文件] {rel} 暂不可用，继续使用旧版本: {e}")
+
+        if updated or removed:
+            new_entries = {rel: entry for rel, entry in entries.items() if rel not in removed}
+            new_entries.update(updated)
+            self._entries = new_entries
+            for rel in updated:
+                print(f"[静态文件] 已重新加载 {rel}")
+        return list(updated) + removed
+
+    def get(self, url_path):
+        """按URL路径取文件，不在内存中时返回None"""
+        path = posixpath.normpath(urllib.parse.unquote(url_path))
+        rel = path.lstrip('/')
+        if url_path.endswith('/'):
+            rel = posixpath.join(rel, 'index.html') if rel not in ('', '.') else 'index.html'
+        entry = self._entries.get(rel)
+        return entry[1] if entry is not None else None
+
+    def __len__(self):
+        return len(self._entries)
+
+    def start(self):
+        """启动后台监视线程"""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name='static-watch', daemon=True)
+        self._thread.start()
+
+    def _watch(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"[静态文件] 检查更新失败: {e}")
+
+    def stop(self):
+        self._stop.set()
+        self._thread = None
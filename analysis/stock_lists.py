@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+股票池
+fetch_*_monsters.py 和 api_server.py 的预热共用
+"""
+
+# 热门股票池（各行业代表 - 扩大范围）
+HOT_STOCKS = [
+    # AI/科技
+    ('002230', '科大讯飞'), ('300418', '昆仑万维'), ('688256', '寒武纪'),
+    ('688041', '海光信息'), ('300474', '景嘉微'), ('002415', '海康威视'),
+    ('300229', '拓尔思'), ('300624', '万兴科技'), ('002049', '紫光国微'),
+    # 通信/光模块
+    ('300308', '中际旭创'), ('300502', '新易盛'), ('002475', '立讯精密'),
+    ('000063', '中兴通讯'), ('600703', '三安光电'), ('300296', '利亚德'),
+    # 新能源
+    ('300750', '宁德时代'), ('002594', '比亚迪'), ('601012', '隆基绿能'),
+    ('002460', '赣锋锂业'), ('600438', '通威股份'), ('002459', '晶澳科技'),
+    # 军工
+    ('600343', '航天动力'), ('600893', '航发动力'), ('002025', '航天电器'),
+    ('600760', '中航沈飞'), ('000768', '中航西飞'), ('600862', '中航高科'),
+    # 金融
+    ('600030', '中信证券'), ('601318', '中国平安'), ('600036', '招商银行'),
+    ('601688', '华泰证券'), ('601211', '国泰君安'), ('600837', '海通证券'),
+    # 消费
+    ('600519', '贵州茅台'), ('000858', '五粮液'), ('000333', '美的集团'),
+    ('000651', '格力电器'), ('601888', '中国中免'), ('000568', '泸州老窖'),
+    # 周期
+    ('601088', '中国神华'), ('600028', '中国石化'), ('000725', '京东方A'),
+    ('601857', '中国石油'), ('601899', '紫金矿业'), ('600019', '宝钢股份'),
+    # 电力
+    ('600900', '长江电力'), ('600886', '国投电力'), ('601985', '中国核电'),
+    ('600025', '华能水电'), ('600011', '华能国际'),
+    # 半导体
+    ('002371', '北方华创'), ('688012', '中微公司'), ('688981', '中芯国际'),
+    ('603501', '韦尔股份'), ('002916', '深南电路'),
+    # 医药
+    ('300760', '迈瑞医疗'), ('000661', '长春高新'), ('603259', '药明康德'),
+    # 地产基建
+    ('600048', '保利发展'), ('601668', '中国建筑'), ('601390', '中国中铁'),
+    # 传媒游戏
+    ('002602', '世纪华通'), ('002027', '分众传媒'), ('300413', '芒果超媒'),
+]
+
+
+# 更大的股票池（覆盖各行业 + 中小盘）
+def get_extended_stock_list():
+    """获取扩展的股票列表"""
+    stocks = [
+        # === 军工航天 ===
+        ('000547', '航天发展'), ('600343', '航天动力'), ('600893', '航发动力'),
+        ('002025', '航天电器'), ('600760', '中航沈飞'), ('000768', '中航西飞'),
+        ('600862', '中航高科'), ('600118', '中国卫星'), ('000738', '航发控制'),
+        ('600316', '洪都航空'), ('002013', '中航机电'), ('600765', '中航重机'),
+        ('600038', '中直股份'), ('000901', '航天科技'), ('600391', '航发科技'),
+        ('002190', '成飞集成'), ('600677', '航天通信'), ('600435', '北方导航'),
+        
+        # === AI/科技 ===
+        ('002230', '科大讯飞'), ('300418', '昆仑万维'), ('688256', '寒武纪'),
+        ('688041', '海光信息'), ('300474', '景嘉微'), ('002415', '海康威视'),
+        ('300229', '拓尔思'), ('300624', '万兴科技'), ('002049', '紫光国微'),
+        ('300496', '中科创达'), ('300454', '深信服'), ('688111', '金山办公'),
+        ('300033', '同花顺'), ('002555', '三七互娱'), ('300253', '卫宁健康'),
+        
+        # === 光模块/通信 ===
+        ('300308', '中际旭创'), ('300502', '新易盛'), ('002475', '立讯精密'),
+        ('000063', '中兴通讯'), ('600703', '三安光电'), ('300296', '利亚德'),
+        ('300394', '天孚通信'), ('688498', '源杰科技'), ('300602', '飞荣达'),
+        
+        # === 半导体/芯片 ===
+        ('002371', '北方华创'), ('688012', '中微公司'), ('688981', '中芯国际'),
+        ('603501', '韦尔股份'), ('002916', '深南电路'), ('603986', '兆易创新'),
+        ('300782', '卓胜微'), ('688536', '思瑞浦'), ('688008', '澜起科技'),
+        ('002049', '紫光国微'), ('300661', '圣邦股份'), ('300223', '北京君正'),
+        
+        # === 新能源 ===
+        ('300750', '宁德时代'), ('002594', '比亚迪'), ('601012', '隆基绿能'),
+        ('002460', '赣锋锂业'), ('600438', '通威股份'), ('002459', '晶澳科技'),
+        ('688599', '天合光能'), ('002129', 'TCL中环'), ('300274', '阳光电源'),
+        ('002074', '国轩高科'), ('300014', '亿纬锂能'), ('002812', '恩捷股份'),
+        
+        # === 金融 ===
+        ('600030', '中信证券'), ('601318', '中国平安'), ('600036', '招商银行'),
+        ('601688', '华泰证券'), ('601211', '国泰君安'), ('600837', '海通证券'),
+        ('601066', '中信建投'), ('600999', '招商证券'), ('601377', '兴业证券'),
+        
+        # === 消费/白酒 ===
+        ('600519', '贵州茅台'), ('000858', '五粮液'), ('000333', '美的集团'),
+        ('000651', '格力电器'), ('601888', '中国中免'), ('000568', '泸州老窖'),
+        ('600690', '海尔智家'), ('002304', '洋河股份'), ('600600', '青岛啤酒'),
+        
+        # === 周期/资源 ===
+        ('601088', '中国神华'), ('600028', '中国石化'), ('601857', '中国石油'),
+        ('601899', '紫金矿业'), ('600019', '宝钢股份'), ('000725', '京东方A'),
+        ('600489', '中金黄金'), ('601600', '中国铝业'), ('600362', '江西铜业'),
+        
+        # === 电力 ===
+        ('600900', '长江电力'), ('600886', '国投电力'), ('601985', '中国核电'),
+        ('600025', '华能水电'), ('600011', '华能国际'), ('600027', '华电国际'),
+        
+        # === 医药 ===
+        ('300760', '迈瑞医疗'), ('000661', '长春高新'), ('603259', '药明康德'),
+        ('300122', '智飞生物'), ('002007', '华兰生物'), ('600276', '恒瑞医药'),
+        
+        # === 地产基建 ===
+        ('600048', '保利发展'), ('601668', '中国建筑'), ('601390', '中国中铁'),
+        ('000002', '万科A'), ('001979', '招商蛇口'), ('600606', '绿地控股'),
+        
+        # === 传媒游戏 ===
+        ('002602', '世纪华通'), ('002027', '分众传媒'), ('300413', '芒果超媒'),
+        ('002607', '中公教育'), ('300058', '蓝色光标'), ('002624', '完美世界'),
+        
+        # === 中小盘/题材股 ===
+        ('603778', '国晟科技'), ('002927', '泰永长征'), ('300805', '电声股份'),
+        ('603225', '新凤鸣'), ('002985', '北摩高科'), ('603179', '新泉股份'),
+        ('300865', '大宏立'), ('002984', '森麒麟'), ('300919', '中伟股份'),
+        ('002791', '坚朗五金'), ('603893', '瑞芯微'), ('300285', '国瓷材料'),
+        ('300896', '爱美客'), ('688169', '石头科技'), ('300759', '康龙化成'),
+        
+        # === 更多中小盘题材股 ===
+        ('002600', '领益智造'), ('002241', '歌尔股份'), ('603501', '韦尔股份'),
+        ('300408', '三环集团'), ('002463', '沪电股份'), ('688036', '传音控股'),
+        ('300595', '欧普康视'), ('300347', '泰格医药'), ('300760', '迈瑞医疗'),
+        ('601100', '恒立液压'), ('603288', '海天味业'), ('603899', '晨光文具'),
+    ]
+    
+    # 去重
+    seen = set()
+    unique_stocks = []
+    for code, name in stocks:
+        if code not in seen:
+            seen.add(code)
+            unique_stocks.append((code, name))
+    
+    return unique_stocks
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+股票代码表
+代码、交易所、名称、拼音首字母、板块，保存在 data/symbols.json，启动时载入内存前缀索引。
+- 按代码/拼音首字母/名称前缀搜索（/api/search）
+- 代码 -> 交易所前缀（sh/sz/bj），供 api_server 和 fetch_*.py 使用
+
+直接运行本脚本从东方财富下载最新代码表:
+    python symbol_master.py
+"""
+
+import bisect
+import json
+import os
+import threading
+import time
+import urllib.request
+from array import array
+from datetime import datetime
+from pathlib import Path
+
+from server_cache import write_json_atomic
+from stock_lists import HOT_STOCKS, get_extended_stock_list
+
+try:
+    from pypinyin import Style, lazy_pinyin
+except ImportError:  # pypinyin为可选依赖，未安装时按GB2312编码区间计算首字母
+    lazy_pinyin = None
+
+DEFAULT_PATH = Path(__file__).resolve().parent / 'data' / 'symbols.json'
+MAX_AGE_DAYS = 7
+FIELDS = ('code', 'exchange', 'name', 'initials', 'board')
+
+EXCHANGE_NAMES = {'sh': '上海', 'sz': '深圳', 'bj': '北京'}
+
+# 代码前缀 -> (交易所, 板块)，按前缀长度从长到短匹配
+CODE_RULES = {
+    '688': ('sh', '科创板'), '689': ('sh', '科创板'),
+    '600': ('sh', '主板'), '601': ('sh', '主板'), '603': ('sh', '主板'), '605': ('sh', '主板'),
+    '900': ('sh', 'B股'),
+    '000': ('sz', '主板'), '001': ('sz', '主板'), '002': ('sz', '主板'), '003': ('sz', '主板'),
+    '300': ('sz', '创业板'), '301': ('sz', '创业板'), '302': ('sz', '创业板'),
+    '200': ('sz', 'B股'),
+    '92': ('bj', '北交所'), '43': ('bj', '北交所'), '83': ('bj', '北交所'), '87': ('bj', '北交所'),
+    '88': ('bj', '北交所'),
+}
+
+EASTMONEY_URL = ('https://82.push2.eastmoney.com/api/qt/clist/get?pn={page}&pz=100&po=1&np=1&fltt=2&invt=2'
+                 '&fid=f12&fs=m:0+t:6,m:0+t:80,m:1+t:2,m:1+t:23,m:0+t:81+s:2048&fields=f12,f13,f14')
+
+# GB2312一级汉字按拼音排序，各声母第一个字的编码
+_GB2312_INITIALS = (
+    (0xB0A1, 'A'), (0xB0C5, 'B'), (0xB2C1, 'C'), (0xB4EE, 'D'), (0xB6EA, 'E'), (0xB7A2, 'F'),
+    (0xB8C1, 'G'), (0xB9FE, 'H'), (0xBBF7, 'J'), (0xBFA6, 'K'), (0xC0AC, 'L'), (0xC2E8, 'M'),
+    (0xC4C3, 'N'), (0xC5B6, 'O'), (0xC5BE, 'P'), (0xC6DA, 'Q'), (0xC8BB, 'R'), (0xC8F6, 'S'),
+    (0xCBFA, 'T'), (0xCDDA, 'W'), (0xCEF4, 'X'), (0xD1B9, 'Y'), (0xD4D1, 'Z'),
+)
+_GB2312_BOUNDS = [bound for bound, _ in _GB2312_INITIALS]
+_GB2312_LEVEL1_END = 0xD7F9
+
+
+def classify(code):
+    """按代码前缀判断 (交易所, 板块)，无法判断时返回None"""
+    return CODE_RULES.get(code[:3]) or CODE_RULES.get(code[:2])
+
+
+def _char_initial(char):
+    if char.isascii():
+        return char.upper() if char.isalnum() else ''
+    if lazy_pinyin is not None:
+        letters = lazy_pinyin(char, style=Style.FIRST_LETTER, errors='ignore')
+        return letters[0][:1].upper() if letters else ''
+    try:
+        encoded = char.encode('gb2312')
+    except UnicodeEncodeError:
+        return ''
+    value = encoded[0] << 8 | encoded[1] if len(encoded) == 2 else 0
+    if not _GB2312_BOUNDS[0] <= value <= _GB2312_LEVEL1_END:
+        return ''
+    return _GB2312_INITIALS[bisect.bisect_right(_GB2312_BOUNDS, value) - 1][1]
+
+
+def pinyin_initials(name):
+    """'贵州茅台' -> 'GZMT'，'*ST康美' -> 'STKM'"""
+    return ''.join(_char_initial(char) for char in name)
+
+
+def make_record(code, name, exchange=None):
+    rule = classify(code)
+    board = rule[1] if rule else ''
+    exchange = (rule[0] if rule else None) or exchange or 'sh'
+    return (code, exchange, name, pinyin_initials(name), board)
+
+
+def download_symbols(timeout=10):
+    """从东方财富下载沪深京A股代码表"""
+    records = {}
+    page = 1
+    while True:
+        request = urllib.request.Request(EASTMONEY_URL.format(page=page), headers={'User-Agent': 'Mozilla/5.0'})
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            data = json.loads(response.read().decode('utf-8')).get('data') or {}
+        items = data.get('diff') or []
+        if isinstance(items, dict):
+            items = list(items.values())
+        for item in items:
+            code, name = str(item.get('f12', '')), str(item.get('f14', ''))
+            if code and name and code != '-':
+                records[code] = make_record(code, name, 'sh' if item.get('f13') == 1 else 'sz')
+        if not items or len(records) >= data.get('total', 0):
+            break
+        page += 1
+    if not records:
+        raise ValueError('代码表为空')
+    return sorted(records.values())
+
+
+def seed_records():
+    """没有代码表文件时，用内置股票池生成一份最小代码表"""
+    names = dict(get_extended_stock_list())
+    names.update(HOT_STOCKS)
+    return sorted(make_record(code, name) for code, name in names.items())
+
+
+class SymbolMaster:
+    """内存中的代码表和前缀索引
+
+    代码、拼音首字母、名称各一个有序键列表，搜索时二分查找前缀区间，
+    每个键对应的记录下标存在紧凑的整数数组中
+    """
+
+    def __init__(self, records):
+        self.records = list(records)
+        self.by_code = {record[0]: record for record in self.records}
+        self._indexes = [self._build_index(field) for field in (0, 3, 2)]  # 代码、首字母、名称
+
+    def _build_index(self, field):
+        pairs = sorted((record[field].upper(), i) for i, record in enumerate(self.records) if record[field])
+        return [key for key, _ in pairs], array('I', (i for _, i in pairs))
+
+    def __len__(self):
+        return len(self.records)
+
+    def get(self, code):
+        return self.by_code.get(code)
+
+    def search(self, query, limit=10):
+        """按前缀搜索，代码匹配优先，其次拼音首字母、名称"""
+        query = query.strip().upper()
+        if query[:2] in ('SH', 'SZ', 'BJ') and query[2:].isdigit():
+            query = query[2:]
+        if not query:
+            return []
+        found = []
+        seen = set()
+        for keys, ids in self._indexes:
+            start = bisect.bisect_left(keys, query)
+            end = bisect.bisect_left(keys, query + '\uffff', start)
+            for pos in range(start, end):
+                index = ids[pos]
+                if index not in seen:
+                    seen.add(index)
+                    found.append(self.records[index])
+                    if len(found) >= limit:
+                        return found
+        return found
+
+    def resolve(self, code):
+        """返回 (交易所前缀, 板块)，不在代码表中时按代码规则判断"""
+        record = self.by_code.get(code)
+        if record is not None:
+            return record[1], record[4]
+        return classify(code) or (None, '')
+
+
+def load(path=DEFAULT_PATH):
+    """读取代码表文件，返回SymbolMaster"""
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    fields = data.get('fields', FIELDS)
+    positions = [fields.index(field) for field in FIELDS]
+    return SymbolMaster(tuple(row[i] for i in positions) for row in data['rows'])
+
+
+def save(records, path=DEFAULT_PATH):
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    data = {
+        'updated': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'fields': list(FIELDS),
+        'rows': [list(record) for record in records],
+    }
+    return write_json_atomic(str(path), data)
+
+
+def load_or_download(path=DEFAULT_PATH, max_age_days=MAX_AGE_DAYS, timeout=10):
+    """读取本地代码表，不存在或超过max_age_days天时先下载；下载失败时使用旧文件或内置股票池
+
+    max_age_days 小于0时从不下载，只用本地文件或内置股票池
+    """
+    try:
+        age = time.time() - os.path.getmtime(path)
+    except OSError:
+        age = None
+    if max_age_days >= 0 and (age is None or age > max_age_days * 86400):
+        try:
+            records = download_symbols(timeout)
+            save(records, path)
+            print(f"[代码表] 已下载 {len(records)} 只股票")
+            return SymbolMaster(records)
+        except Exception as e:
+            print(f"[代码表] 下载失败: {e}")
+    if age is not None:
+        try:
+            return load(path)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"[代码表] 读取 {path} 失败: {e}")
+    return SymbolMaster(seed_records())
+
+
+_default_master = None
+_default_lock = threading.Lock()
+
+
+def set_master(master):
+    """替换进程内共享的代码表"""
+    global _default_master
+    with _default_lock:
+        _default_master = master
+    return master
+
+
+def get_master():
+    """获取进程内共享的代码表（首次调用时读取本地文件，不会访问网络）"""
+    global _default_master
+    with _default_lock:
+        if _default_master is None:
+            try:
+                _default_master = load(DEFAULT_PATH)
+            except (OSError, ValueError, KeyError):
+                _default_master = SymbolMaster(seed_records())
+        return _default_master
+
+
+def resolve_symbol(code):
+    """股票代码 -> (腾讯接口symbol, 交易所名称)，如 '600519' -> ('sh600519', '上海')"""
+    exchange, _ = get_master().resolve(code)
+    if exchange is None:
+        return f"sh{code}", "未知"
+    return f"{exchange}{code}", EXCHANGE_NAMES[exchange]
+
+
+if __name__ == '__main__':
+    master = load_or_download(max_age_days=0)
+    print(f"[代码表] 共 {len(master)} 只股票，保存在 {DEFAULT_PATH}")
@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+腾讯财经接口客户端
+按主机维护HTTP长连接池，api_server.py 和 fetch_*_monsters.py 共用同一套请求和解码逻辑。
+开启对冲时请求超过该主机近期耗时的p95仍未返回就再发一次，连续失败时熔断该主机。
+"""
+
+import http.client
+import json
+import os
+import queue
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FutureTimeout
+
+import metrics
+from admission import TokenBucket
+from upstream_guard import CLOSED, CircuitBreaker, LatencyTracker
+
+QUOTE_HOST = 'qt.gtimg.cn'
+KLINE_HOST = 'web.ifzq.gtimg.cn'
+
+HEADERS = {'User-Agent': 'Mozilla/5.0', 'Connection': 'keep-alive'}
+QUOTE_BATCH_SIZE = 60   # 单次行情请求最多包含的股票数
+
+# 复用的keep-alive连接已被服务端关闭时，在收到响应之前抛出的错误；超时等其他错误不重试
+STALE_CONNECTION_ERRORS = (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)
+
+# 行情接口返回GBK，K线接口返回UTF-8
+HOST_ENCODINGS = {
+    QUOTE_HOST: 'gbk',
+    KLINE_HOST: 'utf-8',
+}
+
+
+class UpstreamError(Exception):
+    """上游接口请求失败"""
+
+
+class UpstreamThrottled(UpstreamError):
+    """超过本地设置的上游请求速率，请求未发出"""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitOpen(UpstreamThrottled):
+    """上游主机连续失败，处于熔断状态，请求未发出"""
+
+
+def error_cause(error):
+    """上游错误归类，用于错误计数"""
+    if isinstance(error, (socket.timeout, TimeoutError)):
+        return 'timeout'
+    if isinstance(error, http.client.HTTPException):
+        return 'protocol'
+    return 'connection'
+
+
+class HostPool:
+    """单个主机的keep-alive连接池
+
+    最多同时打开size个连接，空闲连接放回池中复用；
+    设置了limiter时，发请求前先取令牌，最多等待max_wait秒
+    """
+
+    def __init__(self, host, size=8, timeout=10, limiter=None, max_wait=1.0):
+        self.host = host
+        self.timeout = timeout
+        self.limiter = limiter
+        self.max_wait = max_wait
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def _new_connection(self):
+        return http.client.HTTPConnection(self.host, timeout=self.timeout)
+
+    def _send(self, conn, path):
+        conn.request('GET', path, headers=HEADERS)
+        response = conn.getresponse()
+        return response, response.read()
+
+    def request(self, path):
+        """发送GET请求，返回 (status, body)"""
+        if self.limiter is not None:
+            ok, wait = self.limiter.acquire(self.max_wait)
+            if not ok:
+                metrics.UPSTREAM_THROTTLED.inc(host=self.host)
+                raise UpstreamThrottled(f"{self.host} 请求过于频繁，已限速", wait)
+        with self._slots, metrics.UPSTREAM_IN_FLIGHT.track(host=self.host), \
+                metrics.UPSTREAM_LATENCY.time(host=self.host):
+            try:
+                conn = self._idle.get_nowait()
+                reused = True
+            except queue.Empty:
+                conn = self._new_connection()
+                reused = False
+
+            try:
+                response, body = self._send(conn, path)
+            except (http.client.HTTPException, OSError) as e:
+                conn.close()
+                if not reused or not isinstance(e, STALE_CONNECTION_ERRORS):
+                    metrics.UPSTREAM_ERRORS.inc(host=self.host, cause=error_cause(e))
+                    raise UpstreamError(f"{self.host} 请求失败: {e}") from e
+                # 复用的连接已被服务端关闭，换新连接重试一次
+                conn = self._new_connection()
+                try:
+                    response, body = self._send(conn, path)
+                except (http.client.HTTPException, OSError) as e:
+                    conn.close()
+                    metrics.UPSTREAM_ERRORS.inc(host=self.host, cause=error_cause(e))
+                    raise UpstreamError(f"{self.host} 请求失败: {e}") from e
+
+            if response.will_close:
+                conn.close()
+            else:
+                self._idle.put(conn)
+            return response.status, body
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+class UpstreamHost:
+    """单个主机的连接池、耗时统计和熔断器"""
+
+    def __init__(self, pool, latency, breaker):
+        self.pool = pool
+        self.latency = latency
+        self.breaker = breaker
+
+
+class UpstreamClient:
+    """按主机管理连接的行情接口客户端
+
+    rate_limit 为每个主机每秒最多发出的请求数（0表示不限），burst 为允许的突发请求数；
+    hedge 为True时，请求超过该主机近期耗时的p95仍未返回就再发一个相同的请求，取先成功的结果；
+    同一主机连续失败 breaker_failures 次后熔断 breaker_reset 秒，期间直接抛出CircuitOpen（0表示不熔断）
+    """
+
+    def __init__(self, pool_size=8, timeout=10, rate_limit=0, burst=None, max_wait=1.0,
+                 hedge=False, breaker_failures=5, breaker_reset=30):
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.rate_limit = rate_limit
+        self.burst = burst
+        self.max_wait = max_wait
+        self.hedge = hedge
+        self.breaker_failures = breaker_failures
+        self.breaker_reset = breaker_reset
+        self._init_state()
+
+    def _init_state(self):
+        self._hosts = {}
+        self._lock = threading.Lock()
+        # 同时进行的对冲请求不超过连接池的一半，上游整体变慢时不会把请求量翻倍
+        self._hedges = threading.BoundedSemaphore(max(1, self.pool_size // 2))
+        self._executor = (ThreadPoolExecutor(max_workers=self.pool_size * 4, thread_name_prefix='upstream')
+                          if self.hedge else None)
+
+    def _host(self, host):
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is None:
+                limiter = TokenBucket(self.rate_limit, self.burst) if self.rate_limit > 0 else None
+                state = UpstreamHost(
+                    HostPool(host, self.pool_size, self.timeout, limiter, self.max_wait),
+                    LatencyTracker(default=min(1.0, self.timeout / 2), ceiling=self.timeout / 2),
+                    CircuitBreaker(host, self.breaker_failures, self.breaker_reset),
+                )
+                self._hosts[host] = state
+            return state
+
+    def get_text(self, host, path, encoding=None):
+        """请求并按主机对应的编码解码响应"""
+        state = self._host(host)
+        if not state.breaker.allow():
+            raise CircuitOpen(f"{host} 连续请求失败，暂停请求中", state.breaker.retry_after())
+        status, body = self._hedged(host, state, lambda: self._request(host, state, path))
+        if status != 200:
+            raise UpstreamError(f"{host} 返回状态码 {status}")
+        encoding = encoding or HOST_ENCODINGS.get(host, 'utf-8')
+        return body.decode(encoding, errors='replace')
+
+    def _request(self, host, state, path):
+        """发送一次请求，记录耗时和成败"""
+        started = time.perf_counter()
+        try:
+            status, body = state.pool.request(path)
+        except UpstreamThrottled:
+            raise
+        except UpstreamError:
+            state.breaker.record_failure()
+            raise
+        if status != 200:
+            metrics.UPSTREAM_ERRORS.inc(host=host, cause='status')
+            if status >= 500:
+                state.breaker.record_failure()
+                raise UpstreamError(f"{host} 返回状态码 {status}")
+            return status, body
+        state.latency.observe(time.perf_counter() - started)
+        state.breaker.record_success()
+        return status, body
+
+    def _hedged(self, host, state, call):
+        """先发出call()，超过对冲延迟仍未返回时再发一次，返回先成功的结果；都失败时抛出第一个请求的错误"""
+        if self._executor is None or state.breaker.state != CLOSED:
+            return call()
+        primary = self._executor.submit(call)
+        try:
+            return primary.result(timeout=state.latency.hedge_delay())
+        except FutureTimeout:
+            pass
+        if not self._hedges.acquire(blocking=False):
+            return primary.result()
+        metrics.UPSTREAM_HEDGED.inc(host=host, result='sent')
+        hedge = self._executor.submit(call)
+        hedge.add_done_callback(lambda _: self._hedges.release())
+        for future in as_completed((primary, hedge)):
+            if future.exception() is None:
+                if future is hedge:
+                    metrics.UPSTREAM_HEDGED.inc(host=host, result='won')
+                return future.result()
+        return primary.result()
+
+    def close(self):
+        with self._lock:
+            hosts = list(self._hosts.values())
+            self._hosts.clear()
+        for state in hosts:
+            state.pool.close()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+    def _reset_after_fork(self):
+        """fork后的子进程不能复用父进程的连接和线程"""
+        self._init_state()
+
+
+class TencentClient(UpstreamClient):
+    """腾讯财经接口客户端，其他参数见 UpstreamClient"""
+
+    def __init__(self, pool_size=8, timeout=10, quote_host=QUOTE_HOST, kline_host=KLINE_HOST, **kwargs):
+        super().__init__(pool_size, timeout, **kwargs)
+        self.quote_host = quote_host
+        self.kline_host = kline_host
+
+    def fetch_quotes(self, symbols):
+        """批量获取实时行情，返回 {symbol: quote}，不存在的代码不在结果中"""
+        quotes = {}
+        for i in range(0, len(symbols), QUOTE_BATCH_SIZE):
+            chunk = symbols[i:i + QUOTE_BATCH_SIZE]
+            content = self.get_text(self.quote_host, f"/q={','.join(chunk)}", HOST_ENCODINGS[QUOTE_HOST])
+            quotes.update(parse_quotes(content))
+        return quotes
+
+    def fetch_kline(self, symbol, count=320, period='day', fq='qfq'):
+        """获取K线原始数据，每行格式: [日期, 开盘, 收盘, 最高, 最低, 成交量, ...]"""
+        path = f"/appstock/app/fqkline/get?param={symbol},{period},,,{count},{fq}"
+        content = self.get_text(self.kline_host, path, HOST_ENCODINGS[KLINE_HOST])
+        try:
+            kline_json = json.loads(content)
+        except ValueError as e:
+            metrics.UPSTREAM_ERRORS.inc(host=self.kline_host, cause='parse')
+            raise UpstreamError(f"{symbol} K线数据解析失败") from e
+
+        data = kline_json.get('data')
+        if not isinstance(data, dict) or not isinstance(data.get(symbol), dict):
+            return []
+        stock_data = data[symbol]
+        return stock_data.get(f'{fq}{period}', stock_data.get(period, []))
+
+
+def parse_quotes(content):
+    """解析腾讯行情数据，返回 {symbol: quote}
+
+    格式: v_sh600519="1~贵州茅台~600519~1856.00~1868.00~...";
+    多只股票时每只一行，不存在的代码和价格无法解析的行没有对应数据
+    """
+    quotes = {}
+    for line in content.split(';'):
+        line = line.strip()
+        if not line.startswith('v_') or '=' not in line:
+            continue
+        key, value = line.split('=', 1)
+        info_parts = value.strip('"').split('~')
+        if len(info_parts) < 5:
+            continue
+
+        name = info_parts[1]
+        try:
+            price = float(info_parts[3])
+            yesterday_close = float(info_parts[4])
+        except ValueError:
+            # 停牌或数据异常的股票价格可能为空，只跳过这一只，不影响同批其他股票
+            continue
+        change = (price - yesterday_close) / yesterday_close * 100 if yesterday_close > 0 else 0
+
+        quotes[key[2:]] = {
+            'name': name,
+            'price': price,
+            'change': round(change, 2)
+        }
+    return quotes
+
+
+_default_client = None
+_default_lock = threading.Lock()
+
+
+def configure(pool_size=8, timeout=10, **kwargs):
+    """替换默认客户端（调整连接池大小、超时等）"""
+    global _default_client
+    with _default_lock:
+        if _default_client is not None:
+            _default_client.close()
+        _default_client = TencentClient(pool_size=pool_size, timeout=timeout, **kwargs)
+        return _default_client
+
+
+def get_client():
+    """获取进程内共享的默认客户端"""
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            _default_client = TencentClient()
+        return _default_client
+
+
+def _after_fork():
+    if _default_client is not None:
+        _default_client._reset_after_fork()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork)
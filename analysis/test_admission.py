@@ -0,0 +1,75 @@
+import pytest
+
+import admission
+from admission import ClientLimiter, TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(admission.time, 'monotonic', clock)
+    return clock
+
+
+def test_bucket_allows_burst_then_refills(clock):
+    bucket = TokenBucket(rate=2, burst=3)
+    assert [bucket.reserve()[0] for _ in range(4)] == [True, True, True, False]
+    ok, wait = bucket.reserve()
+    assert not ok and wait == pytest.approx(0.5)
+    clock.now += 0.5
+    assert bucket.reserve() == (True, 0.0)
+    clock.now += 100
+    assert [bucket.reserve()[0] for _ in range(4)] == [True, True, True, False]  # 最多积攒burst个
+
+
+def test_bucket_reserves_within_max_wait(clock):
+    bucket = TokenBucket(rate=4, burst=1)
+    assert bucket.reserve() == (True, 0.0)
+    ok, wait = bucket.reserve(max_wait=1)
+    assert ok and wait == pytest.approx(0.25)
+    # 上一个令牌已被预定，下一个要再等0.25秒
+    ok, wait = bucket.reserve(max_wait=0.3)
+    assert not ok and wait == pytest.approx(0.5)
+
+
+def test_bucket_burst_defaults_to_rate(clock):
+    bucket = TokenBucket(rate=5)
+    assert sum(bucket.reserve()[0] for _ in range(10)) == 5
+
+
+def test_acquire_sleeps_for_reserved_wait(clock, monkeypatch):
+    slept = []
+    monkeypatch.setattr(admission.time, 'sleep', slept.append)
+    bucket = TokenBucket(rate=10, burst=1)
+    assert bucket.acquire() == (True, 0.0)
+    ok, wait = bucket.acquire(max_wait=1)
+    assert ok and slept == [pytest.approx(0.1)] and wait == pytest.approx(0.1)
+    assert bucket.acquire(max_wait=0)[0] is False
+    assert len(slept) == 1
+
+
+def test_client_limiter_is_per_client(clock):
+    limiter = ClientLimiter(rate=1, burst=2)
+    assert [limiter.check('a') for _ in range(2)] == [0, 0]
+    assert limiter.check('a') == pytest.approx(1.0)
+    assert limiter.check('b') == 0
+    clock.now += 1
+    assert limiter.check('a') == 0
+
+
+def test_client_limiter_forgets_least_recent_clients(clock):
+    limiter = ClientLimiter(rate=1, burst=1, max_clients=2)
+    limiter.check('a')
+    limiter.check('b')
+    limiter.check('a')  # a 刚活跃过，淘汰 b
+    limiter.check('c')
+    assert list(limiter._buckets) == ['a', 'c']
+    assert limiter.check('b') == 0  # 被淘汰的客户端重新获得完整的令牌桶
@@ -0,0 +1,33 @@
+from datetime import date, timedelta
+
+import bar_store
+from bar_store import BarStore
+
+
+def make_rows(days):
+    start = date(2024, 1, 1)
+    return [[(start + timedelta(i)).isoformat(), 10 + i, 10.5 + i, 11 + i, 9 + i, 1000 + i] for i in range(days)]
+
+
+def test_update_with_unchanged_last_bar_appends_in_place(tmp_path, monkeypatch):
+    history = make_rows(100)
+    monkeypatch.setattr(bar_store, 'resolve_symbol', lambda code: (code, '上海'))
+    monkeypatch.setattr(bar_store, 'fetch_rows', lambda symbol, count: history[-count:])
+
+    store = BarStore(tmp_path, writable=True)
+    try:
+        bar_store.update(store, ['sh600000'], workers=1)
+        start, length, capacity = store._state[0]['sh600000']
+        allocated = store.rows
+        assert length == 100
+
+        for days in (101, 102):
+            # 最后一根没变，只多了新的一天
+            history = make_rows(days)
+            bar_store.update(store, ['sh600000'], workers=1)
+            assert store._state[0]['sh600000'] == (start, days, capacity)
+            assert store.rows == allocated
+
+        assert store.last_date('sh600000') == history[-1][0]
+    finally:
+        store.close()
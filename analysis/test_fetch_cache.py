@@ -0,0 +1,106 @@
+from datetime import date, timedelta
+
+import pytest
+
+import fetch_cache
+from fetch_cache import CLOSED_TTL, OPEN_TTL, FetchCache, normalize, range_ttl
+
+
+def test_normalize_dates_and_containers():
+    assert normalize('20240102') == '2024-01-02'
+    assert normalize(' 2024-01-02 ') == '2024-01-02'
+    assert normalize(date(2024, 1, 2)) == '2024-01-02'
+    assert normalize({'start': '20240101', 'codes': ('sh.600000', 1)}) == \
+        {'start': '2024-01-01', 'codes': ['sh.600000', 1]}
+
+
+def test_range_ttl_depends_on_end_date():
+    yesterday = date.today() - timedelta(1)
+    assert range_ttl(yesterday.strftime('%Y%m%d')) == CLOSED_TTL
+    assert range_ttl(yesterday.isoformat()) == CLOSED_TTL
+    assert range_ttl(date.today().isoformat()) == OPEN_TTL
+    assert range_ttl('2099-12-31') == OPEN_TTL
+    assert range_ttl(None) == OPEN_TTL
+    assert range_ttl('') == OPEN_TTL
+
+
+def test_same_request_with_different_date_formats_shares_key():
+    assert FetchCache.make_key('baostock', 'q', {'start': '20240101'})[0] == \
+        FetchCache.make_key('baostock', 'q', {'start': '2024-01-01'})[0]
+    assert FetchCache.make_key('baostock', 'q', {'start': '20240101'})[0] != \
+        FetchCache.make_key('akshare', 'q', {'start': '20240101'})[0]
+
+
+def test_round_trip_and_expiry(tmp_path, monkeypatch):
+    cache = FetchCache(tmp_path / 'cache.sqlite')
+    value = (['date', 'close'], [['2024-01-02', '10.5'], ['2024-01-03', '10.7']], {'nested': {1, 2}})
+    cache.set('baostock', 'q', {'code': 'sh.600000'}, value, ttl=60)
+    assert cache.get('baostock', 'q', {'code': 'sh.600000'}) == value
+    assert cache.get('baostock', 'q', {'code': 'sz.000001'}) is None
+
+    now = fetch_cache.time.time()
+    monkeypatch.setattr(fetch_cache.time, 'time', lambda: now + 61)
+    assert cache.get('baostock', 'q', {'code': 'sh.600000'}) is None
+    assert cache.prune() == 1
+    assert cache.stats()[1] == 0
+
+
+def test_identical_results_are_stored_once(tmp_path):
+    cache = FetchCache(tmp_path / 'cache.sqlite')
+    cache.set('akshare', 'a', {'x': 1}, [1, 2, 3], ttl=60)
+    cache.set('akshare', 'b', {'x': 2}, [1, 2, 3], ttl=60)
+    rows, blobs, _ = cache.stats()
+    assert len(rows) == 2 and blobs == 1
+
+
+@pytest.fixture
+def default_cache(tmp_path, monkeypatch):
+    cache = FetchCache(tmp_path / 'cache.sqlite')
+    monkeypatch.setattr(fetch_cache, '_default_cache', cache)
+    monkeypatch.delenv('FETCH_CACHE', raising=False)
+    monkeypatch.delenv('FETCH_CACHE_REFRESH', raising=False)
+    return cache
+
+
+def test_fetch_uses_ttl_from_end_date(default_cache, monkeypatch):
+    stored = []
+    monkeypatch.setattr(default_cache, 'set', lambda *args: stored.append(args[-1]))
+    fetch_cache.fetch('p', 'e', {}, lambda: [1], end_date='2000-01-01')
+    fetch_cache.fetch('p', 'e', {}, lambda: [1])
+    fetch_cache.fetch('p', 'e', {}, lambda: [1], ttl=fetch_cache.SPOT_TTL, end_date='2000-01-01')
+    assert stored == [CLOSED_TTL, OPEN_TTL, fetch_cache.SPOT_TTL]
+
+
+def test_fetch_caches_non_empty_results(default_cache, monkeypatch):
+    calls = []
+
+    def loader(value):
+        def load():
+            calls.append(value)
+            return value
+        return load
+
+    assert fetch_cache.fetch('p', 'e', {'k': 1}, loader([1, 2])) == [1, 2]
+    assert fetch_cache.fetch('p', 'e', {'k': 1}, loader([3])) == [1, 2]
+    assert fetch_cache.fetch('p', 'e', {'k': 2}, loader([])) == []
+    assert fetch_cache.fetch('p', 'e', {'k': 2}, loader([4])) == [4]  # 空结果不缓存
+    monkeypatch.setenv('FETCH_CACHE_REFRESH', '1')
+    assert fetch_cache.fetch('p', 'e', {'k': 1}, loader([5])) == [5]
+    monkeypatch.delenv('FETCH_CACHE_REFRESH')
+    assert fetch_cache.fetch('p', 'e', {'k': 1}, loader([6])) == [5]
+    monkeypatch.setenv('FETCH_CACHE', '0')
+    assert fetch_cache.fetch('p', 'e', {'k': 1}, loader([7])) == [7]
+    assert calls == [[1, 2], [], [4], [5], [7]]
+
+
+def test_cached_decorator_ignores_parameters(default_cache):
+    calls = []
+
+    @fetch_cache.cached('akshare', 'hist', end='end', ignore=('name',))
+    def hist(code, end, name=''):
+        calls.append(name)
+        return [code, end]
+
+    assert hist('801010', '20240131', name='农林牧渔') == ['801010', '20240131']
+    assert hist('801010', '2024-01-31', name='其他名称') == ['801010', '20240131']
+    assert calls == ['农林牧渔']
@@ -0,0 +1,99 @@
+import email.message
+import gzip
+import io
+from types import SimpleNamespace
+
+import pytest
+
+import http_payload
+from api_server import StockAPIHandler
+from http_payload import EncodedPayload, parse_accept_encoding
+
+BODY = b'{"data": "' + b'x' * 4000 + b'"}'
+
+
+@pytest.fixture
+def fake_brotli(monkeypatch):
+    monkeypatch.setattr(http_payload, 'brotli', SimpleNamespace(compress=lambda body: b'br:' + body[:10]))
+
+
+def test_parse_accept_encoding():
+    assert parse_accept_encoding('gzip, br;q=0, deflate;q=0.5') == {'gzip', 'deflate'}
+    assert parse_accept_encoding('') == set()
+    assert parse_accept_encoding('GZIP;q=bad') == set()
+
+
+def test_choose_encoding(fake_brotli):
+    payload = EncodedPayload(BODY, 'application/json')
+    assert payload.choose_encoding('gzip, br') == 'br'
+    assert payload.choose_encoding('gzip') == 'gzip'
+    assert payload.choose_encoding('identity') is None
+    assert EncodedPayload(b'{}', 'application/json').choose_encoding('gzip, br') is None  # 太小不压缩
+
+
+def test_choose_encoding_without_brotli(monkeypatch):
+    monkeypatch.setattr(http_payload, 'brotli', None)
+    assert EncodedPayload(BODY, 'application/json').choose_encoding('br, gzip') == 'gzip'
+
+
+def test_encoded_is_compressed_once():
+    payload = EncodedPayload(BODY, 'application/json')
+    body = payload.encoded('gzip')
+    assert gzip.decompress(body) == BODY
+    assert payload.encoded('gzip') is body
+
+
+def test_etag_differs_per_encoding_and_content():
+    payload = EncodedPayload(BODY, 'application/json')
+    tags = {payload.etag_for(None), payload.etag_for('gzip'), payload.etag_for('br')}
+    assert len(tags) == 3
+    assert all(tag.startswith('"') and tag.endswith('"') for tag in tags)
+    assert payload.etag_for(None) == EncodedPayload(BODY, 'text/plain').etag
+    assert payload.etag != EncodedPayload(BODY + b' ', 'application/json').etag
+
+
+def test_matches_only_the_same_encoding():
+    payload = EncodedPayload(BODY, 'application/json')
+    gzip_tag = payload.etag_for('gzip')
+    assert payload.matches(gzip_tag, 'gzip')
+    assert payload.matches(f'"other", W/{gzip_tag}', 'gzip')
+    assert payload.matches('*', None)
+    assert not payload.matches(gzip_tag, None)
+    assert not payload.matches(payload.etag, 'gzip')
+    assert not payload.matches('', None)
+
+
+def send(payload, **headers):
+    """用 StockAPIHandler.send_payload 发送，返回 (状态码, 响应头, 响应体)"""
+    handler = StockAPIHandler.__new__(StockAPIHandler)
+    handler.headers = email.message.Message()
+    for name, value in headers.items():
+        handler.headers[name.replace('_', '-')] = value
+    handler.wfile = io.BytesIO()
+    handler.request_version = 'HTTP/1.1'
+    handler.requestline = 'GET / HTTP/1.1'
+    handler.command = 'GET'
+    handler.route = '/api/test'
+    handler.log_request = lambda *args: None
+    handler.send_payload(payload)
+    head, _, body = handler.wfile.getvalue().partition(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    status = int(lines[0].split()[1])
+    response_headers = dict(line.split(': ', 1) for line in lines[1:])
+    return status, response_headers, body
+
+
+def test_send_payload_negotiates_and_revalidates_per_encoding():
+    payload = EncodedPayload(BODY, 'application/json')
+    status, headers, body = send(payload, Accept_Encoding='gzip')
+    assert status == 200 and headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(body) == BODY
+    tag = headers['ETag']
+
+    status, headers, body = send(payload, Accept_Encoding='gzip', If_None_Match=tag)
+    assert status == 304 and headers['ETag'] == tag and body == b''
+
+    # 同一个ETag换成不压缩的请求，字节不同，不能返回304
+    status, headers, body = send(payload, If_None_Match=tag)
+    assert status == 200 and body == BODY and headers['ETag'] == payload.etag
+    assert 'Content-Encoding' not in headers
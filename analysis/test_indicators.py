@@ -0,0 +1,64 @@
+import math
+import random
+from datetime import date, timedelta
+
+from indicators import IndicatorEngine
+
+NAMES = ['ma5', 'ma20', 'ema12', 'vma5', 'macd', 'boll', 'kdj']
+
+
+def make_bars(count, seed=1):
+    rng = random.Random(seed)
+    bars = []
+    close = 10.0
+    for i in range(count):
+        close = max(1.0, close * (1 + rng.uniform(-0.05, 0.05)))
+        bars.append({'date': (date(2020, 1, 1) + timedelta(i)).isoformat(), 'open': close,
+                     'close': round(close, 2), 'high': round(close * 1.02, 2), 'low': round(close * 0.98, 2),
+                     'volume': rng.randint(1000, 5000)})
+    return bars
+
+
+def assert_same(result, expected):
+    assert result['date'] == expected['date']
+    flat = [(result['indicators'], expected['indicators'])]
+    while flat:
+        got, want = flat.pop()
+        if isinstance(want, dict):
+            assert got.keys() == want.keys()
+            flat.extend((got[key], want[key]) for key in want)
+            continue
+        assert len(got) == len(want)
+        for a, b in zip(got, want):
+            assert (a is None and b is None) or math.isclose(a, b, abs_tol=1e-3)
+
+
+def test_sliding_window_matches_fresh_engine():
+    bars = make_bars(420)
+    engine = IndicatorEngine()
+    for shift in range(80):
+        window = bars[shift:shift + 320]
+        result = engine.compute('600519', window, NAMES)
+        assert_same(result, IndicatorEngine().compute('600519', window, NAMES))
+
+
+def test_tail_updates_match_full_recompute():
+    bars = make_bars(330)
+    engine = IndicatorEngine()
+    window = bars[:300]
+    engine.compute('600519', window, NAMES)
+    for end in range(300, 330):
+        # 盘中最后一根变化，然后收盘后多出新的一天
+        intraday = window[:-1] + [dict(window[-1], close=window[-1]['close'] * 1.01)]
+        assert_same(engine.compute('600519', intraday, NAMES), IndicatorEngine().compute('600519', intraday, NAMES))
+        window = bars[:end + 1]
+        assert_same(engine.compute('600519', window, NAMES, count=120),
+                    IndicatorEngine().compute('600519', window, NAMES, count=120))
+
+
+def test_changed_history_recomputes():
+    bars = make_bars(200)
+    engine = IndicatorEngine()
+    engine.compute('600519', bars, NAMES)
+    adjusted = [dict(bar, close=bar['close'] * 0.9) for bar in bars[:100]] + bars[100:]
+    assert_same(engine.compute('600519', adjusted, NAMES), IndicatorEngine().compute('600519', adjusted, NAMES))
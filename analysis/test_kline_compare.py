@@ -0,0 +1,78 @@
+import math
+import random
+
+import numpy as np
+import pytest
+
+from kline_compare import align_closes, compare, rolling_correlation
+
+
+def bars(pairs):
+    return [{'date': day, 'close': close} for day, close in pairs]
+
+
+def test_align_fills_suspended_days_and_leaves_pre_listing_nan():
+    dates, closes = align_closes({
+        'a': bars([('2025-01-02', 10), ('2025-01-03', 11), ('2025-01-06', 12)]),
+        'b': bars([('2025-01-03', 20), ('2025-01-07', 22)]),
+    })
+    assert dates == ['2025-01-02', '2025-01-03', '2025-01-06', '2025-01-07']
+    assert closes[0].tolist() == [10, 11, 12, 12]
+    assert math.isnan(closes[1, 0])
+    assert closes[1, 1:].tolist() == [20, 20, 22]
+
+
+def test_rolling_correlation_matches_corrcoef():
+    rng = np.random.default_rng(5)
+    y = rng.normal(size=60)
+    x = np.vstack([y * 0.5 + rng.normal(size=60), -y, rng.normal(size=60)])
+    x[2, 30] = np.nan
+    window = 10
+    corr = rolling_correlation(x, y, window)
+    for row in range(3):
+        for end in range(60):
+            if end < window - 1 or (row == 2 and end - window < 30 <= end):
+                assert math.isnan(corr[row, end])
+                continue
+            expected = np.corrcoef(x[row, end - window + 1:end + 1], y[end - window + 1:end + 1])[0, 1]
+            assert corr[row, end] == pytest.approx(expected, abs=1e-9)
+    assert np.allclose(corr[1, window - 1:], -1)
+
+
+def test_rolling_correlation_constant_series_is_nan():
+    corr = rolling_correlation(np.ones((1, 20)), np.arange(20.0), 5)
+    assert np.isnan(corr).all()
+
+
+def random_walk(seed, days):
+    rng = random.Random(seed)
+    price = 10.0
+    pairs = []
+    for i in range(days):
+        price *= 1 + rng.uniform(-0.03, 0.03)
+        pairs.append((f'2025-{1 + i // 28:02d}-{1 + i % 28:02d}', price))
+    return bars(pairs)
+
+
+def test_compare_returns_and_relative_strength():
+    series = {'a': random_walk(1, 60), 'b': random_walk(2, 60)}
+    result = compare(series, start='2025-02-01', window=5, benchmark='b')
+    assert result['benchmark'] == 'b'
+    assert result['dates'][0] == '2025-02-01' and len(result['dates']) == 32
+    a_closes = [bar['close'] for bar in series['a'][28:]]
+    b_closes = [bar['close'] for bar in series['b'][28:]]
+    a, b = result['series']['a'], result['series']['b']
+    assert a['return'][0] == 0 and b['relative_strength'] == [1.0] * 32
+    assert a['return'][-1] == round((a_closes[-1] / a_closes[0] - 1) * 100, 2)
+    assert a['relative_strength'][-1] == round((a_closes[-1] / a_closes[0]) / (b_closes[-1] / b_closes[0]), 4)
+    # start 之前的K线用于滚动窗口，区间第一天就有相关系数
+    assert a['correlation'][0] is not None
+    matrix = result['correlation_matrix']
+    assert matrix[0][0] == 1.0 and matrix[0][1] == matrix[1][0]
+
+
+def test_compare_defaults_benchmark_and_rejects_late_start():
+    series = {'a': random_walk(1, 10), 'b': random_walk(2, 10)}
+    assert compare(series, benchmark='x')['benchmark'] == 'a'
+    with pytest.raises(ValueError):
+        compare(series, start='2030-01-01')
@@ -0,0 +1,73 @@
+import pytest
+
+from api_server import parse_date
+from kline_format import (bars_after_cursor, bars_since, from_binary, make_cursor, parse_cursor, to_binary,
+                          to_columnar)
+
+
+def make_bars():
+    return [
+        {'date': '2025-01-02', 'open': 10.0, 'high': 10.5, 'low': 9.5, 'close': 10.25, 'volume': 1000.0},
+        {'date': '2025-01-03', 'open': 10.25, 'high': 11.0, 'low': 10.0, 'close': 10.75, 'volume': 2000.0},
+        {'date': '2025-01-06', 'open': 10.75, 'high': 11.5, 'low': 10.5, 'close': 11.0, 'volume': 1500.0},
+    ]
+
+
+def test_binary_round_trip():
+    bars = make_bars()
+    meta = {'code': '600519', 'name': '贵州茅台', 'price': 11.0}
+    data = to_binary(meta, bars)
+    assert data[:4] == b'KLN1'
+    decoded_meta, columns = from_binary(data)
+    assert decoded_meta == meta
+    assert columns == to_columnar(bars)  # 测试数据在float32下精确可表示
+    assert columns['date'] == [20250102, 20250103, 20250106]
+
+
+def test_binary_round_trip_empty():
+    meta, columns = from_binary(to_binary({'code': '1'}, []))
+    assert meta == {'code': '1'}
+    assert all(values == [] for values in columns.values())
+
+
+def test_from_binary_rejects_other_data():
+    with pytest.raises(ValueError):
+        from_binary(b'{"code": 1}')
+
+
+def test_cursor_returns_bars_after_anchor():
+    bars = make_bars()
+    cursor = make_cursor(bars[:2])
+    assert parse_cursor(cursor) == ('2025-01-02', 10.25)
+    assert bars_after_cursor(bars, cursor) == (bars[1:], False)
+
+
+def test_cursor_resets_when_history_adjusted():
+    bars = make_bars()
+    cursor = make_cursor(bars)
+    adjusted = [dict(bar, close=bar['close'] * 0.9) for bar in bars]
+    assert bars_after_cursor(adjusted, cursor) == (adjusted, True)
+    assert bars_after_cursor(bars[2:], cursor) == (bars[2:], True)  # 锚点已不在返回的K线中
+
+
+def test_cursor_needs_two_bars_and_valid_text():
+    assert make_cursor(make_bars()[:1]) is None
+    with pytest.raises(ValueError):
+        parse_cursor('not a cursor')
+
+
+def test_bars_since():
+    bars = make_bars()
+    assert bars_since(bars, '2025-01-03') == (bars[1:], False)
+    assert bars_since(bars, '2024-12-31') == (bars, True)
+    assert bars_since(bars, '2025-02-01') == ([], False)
+
+
+@pytest.mark.parametrize('value', ['2025-13-45', '2025-02-30', '2025-1-2', '20250102', ''])
+def test_parse_date_rejects_invalid_dates(value):
+    with pytest.raises(ValueError):
+        parse_date(value, 'since')
+
+
+def test_parse_date_accepts_valid_dates():
+    assert parse_date('2024-02-29', 'since') == '2024-02-29'
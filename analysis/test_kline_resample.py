@@ -0,0 +1,143 @@
+from datetime import date, timedelta
+
+import math
+import random
+
+import numpy as np
+import pytest
+
+from kline_resample import downsample, lttb_indices, parse_period, period_name, resample
+
+
+def make_bars(start, days):
+    """从start起的交易日（跳过周末）K线，价格按序号递增"""
+    bars = []
+    day = start
+    while len(bars) < days:
+        if day.weekday() < 5:
+            i = len(bars)
+            bars.append({'date': day.isoformat(), 'open': 10 + i, 'close': 10.5 + i, 'high': 11 + i,
+                         'low': 9 + i, 'volume': 100 + i, 'amount': 0})
+        day += timedelta(1)
+    return bars
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('day', ('day', 1)), ('', ('day', 1)), ('WEEK', ('week', 1)), ('month', ('month', 1)),
+    ('1d', ('day', 1)), ('5d', ('days', 5)), ('250d', ('days', 250)),
+])
+def test_parse_period(text, expected):
+    assert parse_period(text) == expected
+
+
+@pytest.mark.parametrize('text', ['0d', '251d', 'year', '5', 'd'])
+def test_parse_period_rejects(text):
+    with pytest.raises(ValueError):
+        parse_period(text)
+
+
+def test_period_name():
+    assert period_name(('days', 5)) == '5d'
+    assert period_name(('week', 1)) == 'week'
+
+
+def test_week_groups_by_calendar_week():
+    bars = make_bars(date(2025, 1, 1), 8)  # 周三开始: 1/1-1/3, 1/6-1/10
+    weeks = resample(bars, ('week', 1))
+    assert [week['date'] for week in weeks] == ['2025-01-03', '2025-01-10']
+    first = weeks[0]
+    assert (first['open'], first['close'], first['high'], first['low'], first['volume']) == \
+        (bars[0]['open'], bars[2]['close'], bars[2]['high'], bars[0]['low'], 100 + 101 + 102)
+
+
+def test_month_groups_by_calendar_month():
+    bars = make_bars(date(2025, 1, 27), 10)
+    months = resample(bars, ('month', 1))
+    assert [month['date'] for month in months] == ['2025-01-31', '2025-02-07']
+    assert months[1]['open'] == bars[5]['open'] and months[1]['close'] == bars[-1]['close']
+
+
+def test_n_days_end_at_latest_bar():
+    bars = make_bars(date(2025, 1, 1), 12)
+    groups = resample(bars, ('days', 5))
+    # 以最新一根为终点向前每5根一组，最早的一组只有2根
+    assert [group['date'] for group in groups] == [bars[1]['date'], bars[6]['date'], bars[11]['date']]
+    assert groups[0]['volume'] == 100 + 101
+    assert groups[-1]['open'] == bars[7]['open']
+
+
+def test_day_and_empty_are_unchanged():
+    bars = make_bars(date(2025, 1, 1), 3)
+    assert resample(bars, ('day', 1)) is bars
+    assert resample([], ('week', 1)) == []
+    assert len(resample(bars, ('days', 5))) == 1
+
+
+def reference_lttb(values, threshold):
+    """逐点实现的标准LTTB，用于对照"""
+    size = len(values)
+    every = (size - 2) / (threshold - 2)
+    picked = [0]
+    a = 0
+    for i in range(threshold - 2):
+        start, end = math.floor(i * every) + 1, math.floor((i + 1) * every) + 1
+        next_end = min(math.floor((i + 2) * every) + 1, size)
+        avg_x = sum(range(end, next_end)) / (next_end - end)
+        avg_y = sum(values[end:next_end]) / (next_end - end)
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = abs((a - avg_x) * (values[j] - values[a]) - (a - j) * (avg_y - values[a]))
+            if area > best_area:
+                best, best_area = j, area
+        picked.append(best)
+        a = best
+    return picked + [size - 1]
+
+
+def test_lttb_matches_reference():
+    rng = random.Random(3)
+    values = [rng.gauss(0, 1) for _ in range(1000)]
+    for threshold in (3, 10, 97, 500):
+        assert lttb_indices(np.array(values), threshold).tolist() == reference_lttb(values, threshold)
+
+
+def test_lttb_keeps_endpoints_and_spikes():
+    values = np.zeros(500)
+    values[123] = 50
+    values[321] = -50
+    indices = lttb_indices(values, 20).tolist()
+    assert len(indices) == 20 and indices == sorted(set(indices))
+    assert indices[0] == 0 and indices[-1] == 499
+    assert 123 in indices and 321 in indices
+
+
+def test_lttb_small_thresholds():
+    values = np.arange(10.0)
+    assert lttb_indices(values, 10).tolist() == list(range(10))
+    assert lttb_indices(values, 2).tolist() == [0, 9]
+    assert lttb_indices(values, 1).tolist() == [0]
+
+
+def test_downsample_merge_preserves_totals_and_extremes():
+    bars = make_bars(date(2020, 1, 1), 1000)
+    merged = downsample(bars, 100)
+    assert len(merged) == 100
+    assert merged[0]['open'] == bars[0]['open'] and merged[-1]['close'] == bars[-1]['close']
+    assert merged[-1]['date'] == bars[-1]['date']
+    assert sum(bar['volume'] for bar in merged) == sum(bar['volume'] for bar in bars)
+    assert max(bar['high'] for bar in merged) == max(bar['high'] for bar in bars)
+    assert min(bar['low'] for bar in merged) == min(bar['low'] for bar in bars)
+
+
+def test_downsample_lttb_picks_original_bars():
+    bars = make_bars(date(2020, 1, 1), 1000)
+    picked = downsample(bars, 100, 'lttb')
+    assert len(picked) == 100
+    assert picked[0] is bars[0] and picked[-1] is bars[-1]
+    assert all(any(bar is original for original in bars) for bar in picked)
+
+
+def test_downsample_short_history_unchanged():
+    bars = make_bars(date(2020, 1, 1), 50)
+    assert downsample(bars, 50) is bars
+    assert downsample(bars, 100, 'lttb') is bars
@@ -0,0 +1,65 @@
+import pytest
+
+import market_data
+from tencent_client import CircuitOpen, UpstreamError, UpstreamThrottled
+
+
+class FakeClient:
+    def __init__(self, result=None, error=None):
+        self.result = result
+        self.error = error
+        self.calls = 0
+
+    def fetch_quotes(self, symbols):
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+@pytest.fixture
+def sources(monkeypatch):
+    clients = {}
+
+    def install(tencent, eastmoney):
+        clients.update(tencent=tencent, eastmoney=eastmoney)
+        monkeypatch.setattr(market_data, 'SOURCES', {name: (lambda c=c: c) for name, c in clients.items()})
+        monkeypatch.setattr(market_data, '_order', ['tencent', 'eastmoney'])
+        return clients
+
+    return install
+
+
+def test_primary_success(sources):
+    clients = sources(FakeClient({'a': 1}), FakeClient({'b': 2}))
+    assert market_data.fetch('fetch_quotes', ['a']) == ({'a': 1}, 'tencent')
+    assert clients['eastmoney'].calls == 0
+
+
+@pytest.mark.parametrize('error', [UpstreamError('down'), CircuitOpen('open', 5)])
+def test_falls_back_on_upstream_error_and_open_circuit(sources, error):
+    sources(FakeClient(error=error), FakeClient({'b': 2}))
+    assert market_data.fetch('fetch_quotes', ['a']) == ({'b': 2}, 'eastmoney')
+
+
+def test_local_throttling_does_not_fall_back(sources):
+    clients = sources(FakeClient(error=UpstreamThrottled('limited', 1)), FakeClient({'b': 2}))
+    with pytest.raises(UpstreamThrottled):
+        market_data.fetch('fetch_quotes', ['a'])
+    assert clients['eastmoney'].calls == 0
+
+
+def test_all_failing_raises_primary_error(sources):
+    primary = UpstreamError('primary')
+    sources(FakeClient(error=primary), FakeClient(error=UpstreamError('secondary')))
+    with pytest.raises(UpstreamError) as info:
+        market_data.fetch('fetch_quotes', ['a'])
+    assert info.value is primary
+
+
+def test_configured_order(sources, monkeypatch):
+    sources(FakeClient({'a': 1}), FakeClient({'b': 2}))
+    market_data.configure(('eastmoney',))
+    assert market_data.fetch('fetch_quotes', ['a']) == ({'b': 2}, 'eastmoney')
+    with pytest.raises(ValueError):
+        market_data.configure(('sina',))
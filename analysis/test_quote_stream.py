@@ -0,0 +1,104 @@
+import itertools
+import socket
+import threading
+import time
+
+from quote_stream import QuoteStreamHub
+
+
+class BlockedSocket:
+    """不读数据的客户端：sendall一直阻塞到连接关闭"""
+
+    def __init__(self):
+        self.closed = threading.Event()
+        self.sent = []
+
+    def settimeout(self, timeout):
+        pass
+
+    def sendall(self, data):
+        self.sent.append(data)
+        self.closed.wait()
+        raise OSError('closed')
+
+    def shutdown(self, how):
+        pass
+
+    def close(self):
+        self.closed.set()
+
+
+def wait_for(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def read_events(sock, count, timeout=5):
+    sock.settimeout(timeout)
+    buffer = b''
+    while buffer.count(b'\n\n') < count:
+        chunk = sock.recv(65536)
+        assert chunk
+        buffer += chunk
+    return buffer.split(b'\n\n')[:count]
+
+
+def ticking_quotes():
+    ticks = itertools.count()
+
+    def fetch(symbols):
+        price = next(ticks)
+        return {symbol: {'price': price} for symbol in symbols}
+    return fetch
+
+
+def test_snapshot_is_sent_before_updates():
+    hub = QuoteStreamHub(ticking_quotes(), interval=0.01)
+    first, first_peer = socket.socketpair()
+    second, second_peer = socket.socketpair()
+    try:
+        hub.subscribe(first, {'sh600000': '600000'})
+        read_events(first_peer, 2)
+        hub.subscribe(second, {'sh600000': '600000'})
+        events = read_events(second_peer, 3)
+        assert events[0] == b'retry: 5000'
+        assert events[1].startswith(b'event: quotes\ndata: [{"price": ')
+        prices = [int(e.split(b'"price": ')[1].split(b',')[0]) for e in events[1:]]
+        assert prices[0] < prices[1]
+    finally:
+        hub.close()
+        first_peer.close()
+        second_peer.close()
+
+
+def test_slow_subscriber_is_dropped_without_delaying_others():
+    hub = QuoteStreamHub(ticking_quotes(), interval=0.01, send_timeout=60, max_pending=2)
+    slow = BlockedSocket()
+    fast, fast_peer = socket.socketpair()
+    try:
+        hub.subscribe(slow, {'sh600000': '600000'})
+        hub.subscribe(fast, {'sh600000': '600000'})
+        # 慢客户端卡在第一次写入上，快客户端照常每个间隔收到更新
+        started = time.monotonic()
+        read_events(fast_peer, 20)
+        assert time.monotonic() - started < 2
+        wait_for(lambda: slow.closed.is_set())
+        assert len(slow.sent) == 1
+        assert list(hub._subscribers.values())[0].sock is fast
+    finally:
+        hub.close()
+        fast_peer.close()
+
+
+def test_disconnected_subscriber_is_removed():
+    hub = QuoteStreamHub(ticking_quotes(), interval=0.01)
+    sock, peer = socket.socketpair()
+    try:
+        hub.subscribe(sock, {'sh600000': '600000'})
+        read_events(peer, 2)
+        peer.close()
+        wait_for(lambda: not hub._subscribers)
+    finally:
+        hub.close()
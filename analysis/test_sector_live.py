@@ -0,0 +1,64 @@
+import json
+import os
+import random
+import statistics
+
+import pytest
+
+from sector_live import LiveSectors, SectorStats
+
+
+def test_sector_stats_matches_recompute():
+    rng = random.Random(7)
+    stats = SectorStats('银行', 40)
+    current = {}
+    for _ in range(2000):
+        code = f'{rng.randrange(40):06d}'
+        new = rng.randint(-1000, 1000)
+        if code in current:
+            stats.remove(code, current[code])
+        stats.add(code, new)
+        current[code] = new
+
+        values = list(current.values())
+        assert stats.ranked == sorted((change, code) for code, change in current.items())
+        assert stats.total == sum(values)
+        assert stats.up == sum(value > 0 for value in values)
+        assert stats.down == sum(value < 0 for value in values)
+        assert stats.median() == statistics.median(values)
+
+
+def write_members(path, sectors):
+    path.write_text(json.dumps({'sources': {'sw': sectors}}, ensure_ascii=False), encoding='utf-8')
+
+
+class FakeQuotes:
+    def __init__(self, changes):
+        self.changes = changes
+
+    def __call__(self, symbols):
+        return {symbol: {'name': symbol, 'change': self.changes[symbol[2:]]}
+                for symbol in symbols if symbol[2:] in self.changes}
+
+
+def test_members_file_created_and_regenerated(tmp_path):
+    path = tmp_path / 'sector_members.json'
+    quotes = FakeQuotes({'600000': 1.5, '600036': -0.5, '000001': 2.0})
+    live = LiveSectors(quotes, path, interval=0)
+    with pytest.raises(KeyError):
+        live.ranking('sw')
+
+    write_members(path, {'银行': ['600000', '600036']})
+    live.tick()
+    payload = json.loads(live.ranking('sw').body)
+    assert [(row['sector'], row['count'], row['avg_change']) for row in payload['sectors']] == [('银行', 2, 0.5)]
+
+    # 重新生成后立即按已取到的行情计入新板块，不必等下一次轮询
+    write_members(path, {'银行': ['600000', '600036', '000001'], '券商': ['600036']})
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    payload = json.loads(live.ranking('sw').body)
+    assert [(row['sector'], row['members'], row['count']) for row in payload['sectors']] == [('银行', 3, 2), ('券商', 1, 1)]
+    live.tick()
+    payload = json.loads(live.ranking('sw').body)
+    assert (payload['sectors'][0]['count'], payload['sectors'][0]['avg_change']) == (3, 1.0)
@@ -0,0 +1,203 @@
+import os
+import threading
+import time
+
+import pytest
+
+import server_cache
+from server_cache import SharedFileCache, SingleFlight, TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(server_cache.time, 'monotonic', clock)
+    return clock
+
+
+def test_fresh_entry_is_served_without_loading(clock):
+    cache = TTLCache(ttl=10)
+    cache.set('a', 1)
+    clock.now += 10
+    assert cache.get_or_load('a', lambda: pytest.fail('不应加载')) == 1
+    assert cache.get_fresh('a') == 1
+    clock.now += 0.1
+    assert cache.get_fresh('a') is None
+
+
+def test_stale_entry_is_served_and_refreshed_in_background(clock):
+    cache = TTLCache(ttl=10, stale_ttl=60)
+    cache.set('a', 'old')
+    clock.now += 30
+    loaded = threading.Event()
+    release = threading.Event()
+
+    def loader():
+        release.wait(5)
+        loaded.set()
+        return 'new'
+
+    assert cache.get_or_load('a', loader) == 'old'
+    # 刷新进行中再次访问仍返回旧值，且不重复发起刷新
+    assert cache.get_or_load('a', lambda: pytest.fail('不应重复刷新')) == 'old'
+    release.set()
+    assert loaded.wait(5)
+    for _ in range(100):
+        if cache.get('a')[0] == 'new':
+            break
+        time.sleep(0.01)
+    assert cache.get_fresh('a') == 'new'
+
+
+def test_expired_entry_is_loaded_synchronously(clock):
+    cache = TTLCache(ttl=10, stale_ttl=60)
+    cache.set('a', 'old')
+    clock.now += 71
+    assert cache.get_or_load('a', lambda: 'new') == 'new'
+    assert cache.get_fresh('a') == 'new'
+
+
+def test_failed_background_refresh_keeps_stale_value(clock):
+    cache = TTLCache(ttl=10, stale_ttl=60)
+    cache.set('a', 'old')
+    clock.now += 30
+    done = threading.Event()
+
+    def loader():
+        done.set()
+        raise RuntimeError('upstream down')
+
+    assert cache.get_or_load('a', loader) == 'old'
+    assert done.wait(5)
+    assert cache.get('a')[0] == 'old'
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = TTLCache(ttl=10, max_entries=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')  # a 变为最近使用
+    cache.set('c', 3)
+    assert cache.get('b') is None
+    assert cache.get('a')[0] == 1 and cache.get('c')[0] == 3
+    assert len(cache) == 2
+
+
+def test_snapshot_restore_keeps_age(clock):
+    cache = TTLCache(ttl=10, stale_ttl=20)
+    cache.set('a', 1)
+    clock.now += 5
+    cache.set('b', 2)
+    items = cache.snapshot()
+
+    restored = TTLCache(ttl=10, stale_ttl=20)
+    assert restored.restore(items, elapsed=12) == 2
+    assert restored.get('a')[1] == pytest.approx(17)
+    assert restored.get_fresh('b') is None and restored.get('b') is not None
+    # 超出过期窗口的条目丢弃
+    assert TTLCache(ttl=10, stale_ttl=20).restore(items, elapsed=26) == 1
+
+
+def run_concurrently(flight, key, fn, count):
+    results = []
+    errors = []
+    lock = threading.Lock()
+
+    def call():
+        try:
+            value = flight.do(key, fn)
+            with lock:
+                results.append(value)
+        except Exception as e:
+            with lock:
+                errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, results, errors
+
+
+def test_single_flight_shares_one_call():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return 'value'
+
+    leader, results, errors = run_concurrently(flight, 'k', fn, 1)
+    assert started.wait(5)
+    threads, more, _ = run_concurrently(flight, 'k', fn, 8)
+    time.sleep(0.1)  # 等其他调用者进入等待
+    release.set()
+    for thread in leader + threads:
+        thread.join(5)
+    assert calls == [1]
+    assert results + more == ['value'] * 9
+    assert not errors
+
+
+def test_single_flight_shares_exception_and_forgets_key():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def fail():
+        release.wait(5)
+        raise ValueError('boom')
+
+    threads, results, errors = run_concurrently(flight, 'k', fail, 4)
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert not results
+    assert len(errors) == 4 and all(str(e) == 'boom' for e in errors)
+    # 失败后不保留结果，下一次调用重新执行
+    assert flight.do('k', lambda: 'ok') == 'ok'
+
+
+def test_single_flight_keys_are_independent():
+    flight = SingleFlight()
+    assert flight.do('a', lambda: 1) == 1
+    assert flight.do('b', lambda: 2) == 2
+
+
+def test_shared_cache_prunes_expired_entries_on_write(tmp_path, monkeypatch):
+    now = [10000.0]
+    monkeypatch.setattr(server_cache.time, 'time', lambda: now[0])
+    cache = SharedFileCache(tmp_path, max_age=100, prune_interval=60)
+    cache.set('quote:sh600000', {'price': 1})
+    cache.set('quote:sz000001', {'price': 2})
+    old = cache._path('quote:sh600000')
+    os.utime(old, (now[0] - 200, now[0] - 200))
+    snapshot = tmp_path / 'snapshot-0.json'
+    snapshot.write_text('{}')
+    os.utime(snapshot, (now[0] - 200, now[0] - 200))
+    leftover = tmp_path / 'abc.tmp'
+    leftover.write_text('')
+    os.utime(leftover, (now[0] - 200, now[0] - 200))
+
+    # 未到清理间隔，不扫描目录
+    now[0] += 30
+    cache.set('quote:sh600036', {'price': 3})
+    assert old.exists()
+
+    now[0] += 31
+    cache.set('quote:sh600036', {'price': 3})
+    assert not old.exists() and not leftover.exists()
+    assert snapshot.exists()
+    assert cache.get('quote:sz000001', 1000) == {'price': 2}
+    assert cache.get('quote:sh600036', 1000) == {'price': 3}
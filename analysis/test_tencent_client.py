@@ -0,0 +1,100 @@
+import threading
+import time
+
+import pytest
+
+from tencent_client import UpstreamClient, UpstreamError, parse_quotes
+from upstream_guard import OPEN
+
+
+class Calls:
+    """按调用顺序执行 behaviours 中的函数，记录调用次数"""
+
+    def __init__(self, *behaviours):
+        self.behaviours = behaviours
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def __call__(self):
+        with self.lock:
+            index = self.count
+            self.count += 1
+        return self.behaviours[min(index, len(self.behaviours) - 1)]()
+
+
+def slow(value, seconds=0.5):
+    def run():
+        time.sleep(seconds)
+        return value
+    return run
+
+
+def fail():
+    raise UpstreamError('boom')
+
+
+@pytest.fixture
+def hedged():
+    client = UpstreamClient(pool_size=4, hedge=True)
+    state = client._host('example.com')
+    for _ in range(state.latency.min_samples):
+        state.latency.observe(0.01)  # 对冲延迟取下限 0.05 秒
+    yield client, state
+    client.close()
+
+
+def test_fast_primary_sends_no_hedge(hedged):
+    client, state = hedged
+    calls = Calls(lambda: 'primary')
+    assert client._hedged('example.com', state, calls) == 'primary'
+    assert calls.count == 1
+
+
+def test_slow_primary_is_hedged(hedged):
+    client, state = hedged
+    calls = Calls(slow('primary'), lambda: 'hedge')
+    assert client._hedged('example.com', state, calls) == 'hedge'
+    assert calls.count == 2
+
+
+def test_failed_hedge_falls_back_to_primary(hedged):
+    client, state = hedged
+    calls = Calls(slow('primary', 0.2), fail)
+    assert client._hedged('example.com', state, calls) == 'primary'
+    assert calls.count == 2
+
+
+def test_both_failing_raises_primary_error(hedged):
+    client, state = hedged
+
+    def primary_fail():
+        time.sleep(0.2)
+        raise UpstreamError('primary')
+
+    calls = Calls(primary_fail, fail)
+    with pytest.raises(UpstreamError, match='primary'):
+        client._hedged('example.com', state, calls)
+
+
+def test_no_hedge_unless_breaker_closed(hedged):
+    client, state = hedged
+    state.breaker.state = OPEN
+    calls = Calls(slow('primary', 0.2), lambda: 'hedge')
+    assert client._hedged('example.com', state, calls) == 'primary'
+    assert calls.count == 1
+
+
+def test_hedging_off_calls_inline():
+    client = UpstreamClient()
+    state = client._host('example.com')
+    thread = []
+    assert client._hedged('example.com', state, lambda: thread.append(threading.current_thread()) or 'ok') == 'ok'
+    assert thread == [threading.current_thread()]
+    client.close()
+
+
+def test_parse_quotes_skips_bad_lines():
+    content = ('v_sh600000="1~浦发银行~600000~~10.00~";\n'
+               'v_sh600519="1~贵州茅台~600519~1856.00~1868.00~";\n'
+               'v_sz000001="1~平安银行";\n')
+    assert parse_quotes(content) == {'sh600519': {'name': '贵州茅台', 'price': 1856.0, 'change': -0.64}}
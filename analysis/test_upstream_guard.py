@@ -0,0 +1,84 @@
+import upstream_guard
+from upstream_guard import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, LatencyTracker
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_breaker(monkeypatch, threshold=3, reset=30):
+    clock = FakeClock()
+    monkeypatch.setattr(upstream_guard.time, 'monotonic', clock)
+    return CircuitBreaker('test-host', threshold, reset), clock
+
+
+def test_breaker_opens_after_consecutive_failures(monkeypatch):
+    breaker, _ = make_breaker(monkeypatch)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()  # 成功后重新计数
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CLOSED and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+    assert breaker.retry_after() == 30
+
+
+def test_breaker_half_open_probe_success_closes(monkeypatch):
+    breaker, clock = make_breaker(monkeypatch, threshold=1)
+    breaker.record_failure()
+    clock.now += 29
+    assert not breaker.allow()
+    clock.now += 1
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow()  # 同时只放行一个探测请求
+    breaker.record_success()
+    assert breaker.state == CLOSED and breaker.allow()
+
+
+def test_breaker_half_open_probe_failure_reopens(monkeypatch):
+    breaker, clock = make_breaker(monkeypatch, threshold=1)
+    breaker.record_failure()
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+    clock.now += 30
+    assert breaker.allow()
+
+
+def test_breaker_disabled(monkeypatch):
+    breaker, _ = make_breaker(monkeypatch, threshold=0)
+    for _ in range(10):
+        breaker.record_failure()
+    assert breaker.state == CLOSED and breaker.allow()
+
+
+def test_hedge_delay_uses_default_until_enough_samples():
+    tracker = LatencyTracker(min_samples=5, default=0.8, floor=0.05, ceiling=2.0)
+    for _ in range(4):
+        tracker.observe(0.1)
+    assert tracker.hedge_delay() == 0.8
+    tracker.observe(0.1)
+    assert tracker.hedge_delay() == 0.1
+
+
+def test_hedge_delay_quantile_and_bounds():
+    tracker = LatencyTracker(window=100, quantile=0.95, min_samples=1, floor=0.05, ceiling=2.0)
+    for i in range(100):
+        tracker.observe(i / 100)
+    assert tracker.hedge_delay() == 0.95
+    low = LatencyTracker(min_samples=1, floor=0.05)
+    low.observe(0.001)
+    assert low.hedge_delay() == 0.05
+    high = LatencyTracker(min_samples=1, ceiling=2.0)
+    high.observe(10)
+    assert high.hedge_delay() == 2.0
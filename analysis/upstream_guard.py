@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+上游请求的延迟统计和熔断
+LatencyTracker 按最近的请求耗时估算对冲请求的发出时机，
+CircuitBreaker 在主机连续失败后暂停请求，过一段时间放行一个探测请求。
+"""
+
+import threading
+import time
+from collections import deque
+
+import metrics
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class LatencyTracker:
+    """最近window次成功请求的耗时，用于计算对冲延迟"""
+
+    def __init__(self, window=200, quantile=0.95, min_samples=20, default=1.0, floor=0.05, ceiling=5.0):
+        self.quantile = quantile
+        self.min_samples = min_samples
+        self.default = default
+        self.floor = floor
+        self.ceiling = ceiling
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def hedge_delay(self):
+        """等待多久后发出对冲请求：最近耗时的quantile分位数，限制在 [floor, ceiling] 内"""
+        with self._lock:
+            samples = sorted(self._samples)
+        if len(samples) < self.min_samples:
+            value = self.default
+        else:
+            value = samples[min(len(samples) - 1, int(len(samples) * self.quantile))]
+        return min(max(value, self.floor), self.ceiling)
+
+
+class CircuitBreaker:
+    """连续失败failure_threshold次后熔断reset_timeout秒
+
+    熔断期间allow()返回False；到期后进入半开状态，只放行一个探测请求，
+    探测成功则恢复，失败则重新熔断
+    """
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        if self.failure_threshold <= 0:
+            return True
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            now = time.monotonic()
+            if now - self._opened_at < self.reset_timeout:
+                return False
+            # 熔断到期（或上一个探测请求迟迟没有结果），放行一个探测请求
+            self.state = HALF_OPEN
+            self._opened_at = now
+            return True
+
+    def retry_after(self):
+        """熔断剩余的秒数"""
+        with self._lock:
+            if self.state == CLOSED:
+                return 0.0
+            return max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            if self.state != CLOSED:
+                self.state = CLOSED
+                metrics.UPSTREAM_BREAKER_OPEN.set(0, host=self.name)
+                print(f"[熔断] {self.name} 已恢复")
+
+    def record_failure(self):
+        if self.failure_threshold <= 0:
+            return
+        with self._lock:
+            self._failures += 1
+            if self.state == HALF_OPEN or (self.state == CLOSED and self._failures >= self.failure_threshold):
+                self.state = OPEN
+                self._opened_at = time.monotonic()
+                metrics.UPSTREAM_BREAKER_OPEN.set(1, host=self.name)
+                print(f"[熔断] {self.name} 连续失败 {self._failures} 次，暂停请求 {self.reset_timeout:g} 秒")